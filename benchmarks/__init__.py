@@ -0,0 +1 @@
+"""Benchmarks for the IBM QRadar MCP server"""
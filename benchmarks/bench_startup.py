@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""Startup benchmark for the IBM QRadar MCP server
+
+Measures how long it takes to import ``src.server`` and how long a freshly
+spawned ``python -m src`` process takes to answer its first ``tools/list``
+request over stdio. MCP hosts start one server process per session, so both
+numbers are paid by every user on every session.
+
+Usage:
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --runs 10 --max-import-ms 1500 --max-list-tools-ms 2500
+
+Exits non-zero when a median exceeds its budget so it can guard CI.
+
+Author: Ram Krishna Katakwar
+License: MIT
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Heavy modules that must not be imported until the first tool call
+DEFERRED_MODULES = ["requests", "urllib3", "src.qradar_client"]
+
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import src.server
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "import_ms": elapsed * 1000,
+    "loaded": [m for m in %r if m in sys.modules],
+}))
+"""
+
+
+def _bench_env() -> Dict[str, str]:
+    """Environment for the server under test (no real console is contacted)"""
+    env = dict(os.environ)
+    env.setdefault("QRADAR_HOST", "127.0.0.1:9")
+    env.setdefault("QRADAR_API_TOKEN", "benchmark-token")
+    env["QRADAR_WARMUP"] = "false"
+    return env
+
+
+def measure_import() -> Dict:
+    """Import src.server in a fresh interpreter and time it"""
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE % DEFERRED_MODULES],
+        cwd=REPO_ROOT,
+        env=_bench_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _send(proc: subprocess.Popen, message: Dict) -> None:
+    proc.stdin.write(json.dumps(message) + "\n")
+    proc.stdin.flush()
+
+
+def _read_response(proc: subprocess.Popen, request_id: int) -> Dict:
+    while True:
+        line = proc.stdout.readline()
+        if not line:
+            raise RuntimeError("Server exited before responding")
+        message = json.loads(line)
+        if message.get("id") == request_id:
+            return message
+
+
+def measure_first_list_tools() -> Dict:
+    """Spawn the server and time spawn -> initialize -> first tools/list response"""
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "src"],
+        cwd=REPO_ROOT,
+        env=_bench_env(),
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    try:
+        _send(proc, {
+            "jsonrpc": "2.0",
+            "id": 1,
+            "method": "initialize",
+            "params": {
+                "protocolVersion": "2024-11-05",
+                "capabilities": {},
+                "clientInfo": {"name": "bench-startup", "version": "1.0"},
+            },
+        })
+        _read_response(proc, 1)
+        initialized = time.perf_counter()
+
+        _send(proc, {"jsonrpc": "2.0", "method": "notifications/initialized"})
+        _send(proc, {"jsonrpc": "2.0", "id": 2, "method": "tools/list"})
+        response = _read_response(proc, 2)
+        done = time.perf_counter()
+    finally:
+        proc.stdin.close()
+        proc.terminate()
+        proc.wait(timeout=10)
+
+    return {
+        "initialize_ms": (initialized - start) * 1000,
+        "list_tools_ms": (done - start) * 1000,
+        "tool_count": len(response.get("result", {}).get("tools", [])),
+    }
+
+
+def _summary(samples: List[float]) -> Dict[str, float]:
+    return {
+        "median": round(statistics.median(samples), 1),
+        "min": round(min(samples), 1),
+        "max": round(max(samples), 1),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark MCP server startup")
+    parser.add_argument("--runs", type=int, default=5, help="Samples per measurement")
+    parser.add_argument("--max-import-ms", type=float, default=None,
+                        help="Fail if median import time exceeds this budget")
+    parser.add_argument("--max-list-tools-ms", type=float, default=None,
+                        help="Fail if median time to first tools/list exceeds this budget")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    imports = [measure_import() for _ in range(args.runs)]
+    spawns = [measure_first_list_tools() for _ in range(args.runs)]
+
+    results = {
+        "benchmark": "startup",
+        "runs": args.runs,
+        "import_ms": _summary([r["import_ms"] for r in imports]),
+        "initialize_ms": _summary([r["initialize_ms"] for r in spawns]),
+        "first_list_tools_ms": _summary([r["list_tools_ms"] for r in spawns]),
+        "tool_count": spawns[-1]["tool_count"],
+        "eagerly_loaded": imports[-1]["loaded"],
+    }
+    print(json.dumps(results, indent=2))
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+    failures = []
+    if results["eagerly_loaded"]:
+        failures.append(f"modules imported at startup: {', '.join(results['eagerly_loaded'])}")
+    if args.max_import_ms is not None and results["import_ms"]["median"] > args.max_import_ms:
+        failures.append(
+            f"import took {results['import_ms']['median']}ms (budget {args.max_import_ms}ms)"
+        )
+    if (args.max_list_tools_ms is not None
+            and results["first_list_tools_ms"]["median"] > args.max_list_tools_ms):
+        failures.append(
+            f"first tools/list took {results['first_list_tools_ms']['median']}ms "
+            f"(budget {args.max_list_tools_ms}ms)"
+        )
+
+    for failure in failures:
+        print(f"❌ {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""End-to-end benchmark suite for QRadarClient and the MCP server
+
+Runs against the local QRadar stand-in (benchmarks/mock_qradar.py) and
+measures:
+
+- per-tool latency through ``call_tool`` (p50/p95/mean)
+- Ariel search overhead (wall time beyond the server-side search time)
+- list-endpoint throughput at 1k/10k/100k objects
+- peak RSS of a client process fetching and formatting large result sets
+- ``format_response`` encode time
+
+Results are written as JSON so runs can be compared across commits:
+
+    python -m benchmarks.bench_suite --output bench-main.json
+    python -m benchmarks.bench_suite --compare bench-main.json --threshold 0.15
+
+Author: Ram Krishna Katakwar
+License: MIT
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks.mock_qradar import MockConfig, MockQRadarServer  # noqa: E402
+
+TOKEN = "benchmark-token"
+
+# Tool calls timed through call_tool: (tool name, arguments)
+TOOL_CASES: List[Tuple[str, Dict[str, Any]]] = [
+    ("qradar_get_system_info", {}),
+    ("qradar_get_offenses", {"filter": "status=OPEN", "range": "0-49"}),
+    ("qradar_get_offense_by_id", {"offense_id": 7}),
+    ("qradar_get_offense_notes", {"offense_id": 7}),
+    ("qradar_get_log_sources", {}),
+    ("qradar_get_log_source_by_id", {"log_source_id": 3}),
+    ("qradar_get_assets", {}),
+    ("qradar_search_assets_by_ip", {"ip_address": "10.2.14.20"}),
+    ("qradar_get_rules", {"filter": "enabled=true"}),
+    ("qradar_get_reference_sets", {}),
+    ("qradar_get_reference_set_data", {"ref_set_name": "Malicious IPs"}),
+    ("qradar_get_network_hierarchy", {}),
+    ("qradar_get_ariel_fields", {"database_name": "events"}),
+    ("qradar_search_event_categories", {"search_term": "auth"}),
+    ("qradar_get_users", {}),
+]
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def _stats_ms(samples: List[float]) -> Dict[str, float]:
+    ms = [s * 1000 for s in samples]
+    return {
+        "p50_ms": round(_percentile(ms, 0.50), 3),
+        "p95_ms": round(_percentile(ms, 0.95), 3),
+        "mean_ms": round(statistics.fmean(ms), 3),
+        "samples": len(ms),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def _fresh_server_module(url: str):
+    """Import src.server pointed at the stand-in, with a fresh client"""
+    os.environ["QRADAR_HOST"] = url
+    os.environ["QRADAR_API_TOKEN"] = TOKEN
+    os.environ["QRADAR_WARMUP"] = "false"
+    from src import server
+    server._qradar_client = None
+    return server
+
+
+# ==================== Benchmarks ====================
+
+def bench_tools(iterations: int, latency_ms: float) -> Dict[str, Any]:
+    """Latency of each tool through call_tool"""
+    config = MockConfig(latency_ms=latency_ms, search_run_seconds=0.0)
+    results: Dict[str, Any] = {}
+    with MockQRadarServer(config) as mock:
+        server = _fresh_server_module(mock.url)
+
+        async def run() -> None:
+            for name, arguments in TOOL_CASES:
+                samples = []
+                for _ in range(iterations):
+                    start = time.perf_counter()
+                    response = await server.call_tool(name, dict(arguments))
+                    samples.append(time.perf_counter() - start)
+                    if not json.loads(response[0].text)["success"]:
+                        raise RuntimeError(f"{name} failed: {response[0].text[:300]}")
+                results[name] = _stats_ms(samples)
+
+        asyncio.run(run())
+    return results
+
+
+def bench_ariel(iterations: int, run_seconds: float) -> Dict[str, Any]:
+    """Wall time of search_events compared to the server-side search time"""
+    from src.qradar_client import QRadarClient
+
+    config = MockConfig(search_run_seconds=run_seconds, events=5000)
+    results: Dict[str, Any] = {}
+    with MockQRadarServer(config) as mock:
+        client = QRadarClient(mock.url, TOKEN)
+        for limit in (100, 5000):
+            samples = []
+            for _ in range(iterations):
+                start = time.perf_counter()
+                client.search_events(f"SELECT sourceip, destinationip, qid FROM events LIMIT {limit}")
+                samples.append(time.perf_counter() - start)
+            stats = _stats_ms(samples)
+            stats["server_search_ms"] = run_seconds * 1000
+            stats["overhead_ms"] = round(stats["p50_ms"] - run_seconds * 1000, 3)
+            results[f"limit_{limit}"] = stats
+    return results
+
+
+def bench_list_throughput(scales: List[int], iterations: int) -> Dict[str, Any]:
+    """Objects per second for full offense list downloads at each scale"""
+    from src.qradar_client import QRadarClient
+
+    results: Dict[str, Any] = {}
+    for scale in scales:
+        config = _scale_config(scale)
+        with MockQRadarServer(config) as mock:
+            client = QRadarClient(mock.url, TOKEN)
+            samples = []
+            count = 0
+            for _ in range(iterations):
+                start = time.perf_counter()
+                count = len(client.get_offenses())
+                samples.append(time.perf_counter() - start)
+            stats = _stats_ms(samples)
+            stats["objects"] = count
+            stats["objects_per_second"] = round(count / statistics.median(samples), 1)
+            results[str(scale)] = stats
+    return results
+
+
+def bench_peak_rss(scales: List[int]) -> Dict[str, Any]:
+    """Peak RSS of a fresh client process fetching and formatting each result set"""
+    results: Dict[str, Any] = {}
+    for scale in scales:
+        with MockQRadarServer(_scale_config(scale)) as mock:
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_suite", "--rss-probe", mock.url],
+                cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+            ).stdout
+        results[str(scale)] = json.loads(output.strip().splitlines()[-1])
+    return results
+
+
+def _rss_probe(url: str) -> None:
+    """Child process body for bench_peak_rss"""
+    server = _fresh_server_module(url)
+    baseline = _max_rss_mb()
+    client = server.get_client()
+    start = time.perf_counter()
+    offenses = client.get_offenses()
+    text = server.format_response(offenses)[0].text
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        "objects": len(offenses),
+        "response_bytes": len(text),
+        "baseline_rss_mb": round(baseline, 1),
+        "peak_rss_mb": round(_max_rss_mb(), 1),
+        "peak_delta_mb": round(_max_rss_mb() - baseline, 1),
+        "elapsed_ms": round(elapsed * 1000, 1),
+    }))
+
+
+def _max_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def bench_format_response(scales: List[int], iterations: int) -> Dict[str, Any]:
+    """Encode time of format_response for offense lists of each size"""
+    from benchmarks.mock_qradar import MockData
+    server = _fresh_server_module("http://127.0.0.1:9")
+
+    results: Dict[str, Any] = {}
+    offenses = MockData(_scale_config(max(scales))).offenses
+    for scale in scales:
+        data = offenses[:scale]
+        samples = []
+        size = 0
+        for _ in range(iterations):
+            start = time.perf_counter()
+            size = len(server.format_response(data)[0].text)
+            samples.append(time.perf_counter() - start)
+        stats = _stats_ms(samples)
+        stats["bytes"] = size
+        stats["mb_per_second"] = round(size / statistics.median(samples) / 1e6, 1)
+        results[str(scale)] = stats
+    return results
+
+
+def _scale_config(offenses: int) -> MockConfig:
+    # Only the offense collection grows; everything else stays small
+    return MockConfig(
+        offenses=offenses, log_sources=50, assets=50, events=10, flows=10,
+        rules=50, building_blocks=10, reference_set_size=10,
+    )
+
+
+# ==================== Comparison ====================
+
+def _flatten(results: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(_flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+# Metrics where a larger number is worse; throughput metrics are the inverse
+_LOWER_IS_BETTER = ("_ms", "_mb")
+_HIGHER_IS_BETTER = ("per_second",)
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    List metrics that regressed by more than threshold (fraction) against a baseline
+
+    Only latency (*_ms), memory (*_mb) and throughput (*per_second) values are compared.
+    """
+    now = _flatten(current["results"])
+    before = _flatten(baseline["results"])
+    regressions = []
+    for key, old in before.items():
+        new = now.get(key)
+        if new is None or not old:
+            continue
+        if key.endswith(_LOWER_IS_BETTER) and new > old * (1 + threshold):
+            regressions.append(f"{key}: {old} -> {new} (+{(new / old - 1) * 100:.0f}%)")
+        elif key.endswith(_HIGHER_IS_BETTER) and new < old * (1 - threshold):
+            regressions.append(f"{key}: {old} -> {new} ({(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="QRadar MCP end-to-end benchmarks")
+    parser.add_argument("--scales", default="1000,10000,100000",
+                        help="Comma-separated object counts for list/RSS/encode benchmarks")
+    parser.add_argument("--iterations", type=int, default=20, help="Samples per tool case")
+    parser.add_argument("--latency-ms", type=float, default=0.0,
+                        help="Simulated QRadar latency for the tool benchmark")
+    parser.add_argument("--ariel-run-seconds", type=float, default=0.5,
+                        help="Server-side Ariel search time")
+    parser.add_argument("--only", help="Comma-separated subset: tools,ariel,list,rss,encode")
+    parser.add_argument("--output", help="Write results JSON to this file")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="Allowed regression before --compare fails (default: 0.15)")
+    parser.add_argument("--rss-probe", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.rss_probe:
+        _rss_probe(args.rss_probe)
+        return 0
+
+    import logging
+    logging.disable(logging.INFO)
+
+    scales = [int(s) for s in args.scales.split(",") if s]
+    selected = set(args.only.split(",")) if args.only else {"tools", "ariel", "list", "rss", "encode"}
+    suites: List[Tuple[str, Callable[[], Dict[str, Any]]]] = [
+        ("tools", lambda: bench_tools(args.iterations, args.latency_ms)),
+        ("ariel", lambda: bench_ariel(max(3, args.iterations // 5), args.ariel_run_seconds)),
+        ("list", lambda: bench_list_throughput(scales, 3)),
+        ("rss", lambda: bench_peak_rss(scales)),
+        ("encode", lambda: bench_format_response(scales, 5)),
+    ]
+
+    results: Dict[str, Any] = {}
+    for name, run in suites:
+        if name not in selected:
+            continue
+        print(f"Running {name} benchmarks...", file=sys.stderr)
+        results[name] = run()
+
+    report = {
+        "benchmark": "suite",
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {
+            "scales": scales,
+            "iterations": args.iterations,
+            "latency_ms": args.latency_ms,
+            "ariel_run_seconds": args.ariel_run_seconds,
+        },
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        regressions = compare(report, baseline, args.threshold)
+        for line in regressions:
+            print(f"❌ regression {line}", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"✅ no regressions beyond {args.threshold:.0%} vs {baseline.get('commit')}",
+              file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""Concurrent load generator for the IBM QRadar MCP server
+
+Drives N concurrent MCP sessions with a weighted mix of tool calls and
+reports throughput, latency percentiles and error rates. By default each
+session spawns its own ``python -m src`` and speaks MCP over stdio, the way
+desktop hosts do; ``--in-process`` instead connects every session to one
+shared ``app`` in this process, which is how several agents behind one
+server behave.
+
+The QRadar side is the local stand-in (benchmarks/mock_qradar.py), started
+in-process unless ``--qradar-url`` points at one that is already running.
+
+Usage:
+    python -m benchmarks.load_test --sessions 8 --duration 30
+    python -m benchmarks.load_test --sessions 1,2,4,8,16 --duration 15 --in-process
+    python -m benchmarks.load_test --mix qradar_get_offenses:5,qradar_get_offense_by_id:10
+    python -m benchmarks.load_test --mix-file mix.json --latency-ms 25 --output load.json
+
+A mix file is a JSON list of {"tool": ..., "arguments": {...}, "weight": n}.
+
+Author: Ram Krishna Katakwar
+License: MIT
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks.mock_qradar import MockConfig, MockQRadarServer  # noqa: E402
+
+TOKEN = "load-test-token"
+
+# Default arguments for tools named in --mix
+DEFAULT_ARGUMENTS: Dict[str, Dict[str, Any]] = {
+    "qradar_get_offenses": {"filter": "status=OPEN", "range": "0-49"},
+    "qradar_get_offense_by_id": {"offense_id": 7},
+    "qradar_get_offense_notes": {"offense_id": 7},
+    "qradar_get_log_source_by_id": {"log_source_id": 3},
+    "qradar_search_assets_by_ip": {"ip_address": "10.2.14.20"},
+    "qradar_get_rules": {"filter": "enabled=true"},
+    "qradar_get_rule_by_id": {"rule_id": 100001},
+    "qradar_get_reference_set_data": {"ref_set_name": "Malicious IPs"},
+    "qradar_get_ariel_fields": {"database_name": "events"},
+    "qradar_search_event_categories": {"search_term": "auth"},
+    "qradar_search_events": {"query": "SELECT sourceip, destinationip FROM events LIMIT 50"},
+    "qradar_get_user_by_id": {"user_id": 3},
+}
+
+DEFAULT_MIX = (
+    "qradar_get_offenses:4,qradar_get_offense_by_id:6,qradar_get_offense_notes:3,"
+    "qradar_get_log_source_by_id:2,qradar_search_assets_by_ip:2,qradar_get_rules:1,"
+    "qradar_get_ariel_fields:2,qradar_get_system_info:1"
+)
+
+
+def parse_mix(mix: Optional[str], mix_file: Optional[str]) -> List[Dict[str, Any]]:
+    """Build the weighted list of calls from --mix or --mix-file"""
+    if mix_file:
+        entries = json.loads(Path(mix_file).read_text())
+        return [
+            {"tool": e["tool"], "arguments": e.get("arguments", {}), "weight": e.get("weight", 1)}
+            for e in entries
+        ]
+    entries = []
+    for item in (mix or DEFAULT_MIX).split(","):
+        tool, _, weight = item.strip().partition(":")
+        entries.append({
+            "tool": tool,
+            "arguments": DEFAULT_ARGUMENTS.get(tool, {}),
+            "weight": float(weight or 1),
+        })
+    return entries
+
+
+def _server_env(qradar_url: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        "QRADAR_HOST": qradar_url,
+        "QRADAR_API_TOKEN": TOKEN,
+        "QRADAR_WARMUP": "false",
+    })
+    return env
+
+
+@asynccontextmanager
+async def stdio_session(qradar_url: str) -> AsyncIterator[Any]:
+    """MCP session with a freshly spawned `python -m src` over stdio"""
+    from mcp import ClientSession, StdioServerParameters
+    from mcp.client.stdio import stdio_client
+
+    params = StdioServerParameters(
+        command=sys.executable,
+        args=["-m", "src"],
+        env=_server_env(qradar_url),
+        cwd=str(REPO_ROOT),
+    )
+    with open(os.devnull, "w") as devnull:
+        async with stdio_client(params, errlog=devnull) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                yield session
+
+
+@asynccontextmanager
+async def in_process_session(qradar_url: str) -> AsyncIterator[Any]:
+    """MCP session connected in memory to the shared `app` in this process"""
+    from mcp.shared.memory import create_connected_server_and_client_session
+
+    os.environ.update(_server_env(qradar_url))
+    from src.server import app
+    async with create_connected_server_and_client_session(app) as session:
+        yield session
+
+
+class Recorder:
+    """Collects per-call outcomes and holds sessions until all are connected"""
+
+    def __init__(self, sessions: int, duration: float):
+        self.calls: List[Dict[str, Any]] = []
+        self.pending = sessions
+        self.duration = duration
+        self.ready = asyncio.Event()
+        self.start = 0.0
+        self.deadline = 0.0
+
+    def arrive(self) -> None:
+        """Count a session as connected (or failed) and open the window on the last one"""
+        self.pending -= 1
+        if self.pending == 0:
+            self.start = time.perf_counter()
+            self.deadline = self.start + self.duration
+            self.ready.set()
+
+    def add(self, tool: str, latency: float, ok: bool, error: Optional[str] = None) -> None:
+        self.calls.append({"tool": tool, "latency": latency, "ok": ok, "error": error})
+
+
+async def run_session(
+    index: int,
+    qradar_url: str,
+    mix: List[Dict[str, Any]],
+    in_process: bool,
+    recorder: Recorder,
+    seed: int
+) -> None:
+    rnd = random.Random(seed + index)
+    weights = [e["weight"] for e in mix]
+    connect = in_process_session if in_process else stdio_session
+    arrived = False
+    try:
+        async with connect(qradar_url) as session:
+            recorder.arrive()
+            arrived = True
+            await recorder.ready.wait()
+            await _drive(session, rnd, mix, weights, recorder)
+    finally:
+        if not arrived:
+            recorder.arrive()
+
+
+async def _drive(
+    session: Any,
+    rnd: random.Random,
+    mix: List[Dict[str, Any]],
+    weights: List[float],
+    recorder: Recorder
+) -> None:
+    while time.perf_counter() < recorder.deadline:
+        entry = rnd.choices(mix, weights)[0]
+        start = time.perf_counter()
+        try:
+            result = await session.call_tool(entry["tool"], dict(entry["arguments"]))
+            latency = time.perf_counter() - start
+            text = result.content[0].text if result.content else ""
+            ok = not result.isError and json.loads(text).get("success", False)
+            recorder.add(entry["tool"], latency, ok, None if ok else text[:200])
+        except Exception as e:
+            recorder.add(entry["tool"], time.perf_counter() - start, False, str(e)[:200])
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def summarize(calls: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    def block(subset: List[Dict[str, Any]]) -> Dict[str, Any]:
+        latencies = [c["latency"] * 1000 for c in subset]
+        errors = sum(1 for c in subset if not c["ok"])
+        return {
+            "calls": len(subset),
+            "throughput_per_second": round(len(subset) / elapsed, 2) if elapsed else 0,
+            "p50_ms": round(_percentile(latencies, 0.50), 2),
+            "p95_ms": round(_percentile(latencies, 0.95), 2),
+            "p99_ms": round(_percentile(latencies, 0.99), 2),
+            "error_rate": round(errors / len(subset), 4) if subset else 0,
+        }
+
+    tools = sorted({c["tool"] for c in calls})
+    summary = block(calls)
+    summary["per_tool"] = {t: block([c for c in calls if c["tool"] == t]) for t in tools}
+    errors = [c["error"] for c in calls if c["error"]]
+    summary["sample_errors"] = sorted(set(errors))[:5]
+    return summary
+
+
+async def run_level(
+    sessions: int,
+    qradar_url: str,
+    mix: List[Dict[str, Any]],
+    duration: float,
+    in_process: bool,
+    seed: int
+) -> Dict[str, Any]:
+    recorder = Recorder(sessions, duration)
+    # Sessions connect first; the measured window starts once they are all up
+    await asyncio.gather(*(
+        run_session(i, qradar_url, mix, in_process, recorder, seed)
+        for i in range(sessions)
+    ))
+    elapsed = time.perf_counter() - recorder.start
+    result = summarize(recorder.calls, elapsed)
+    result["sessions"] = sessions
+    result["elapsed_seconds"] = round(elapsed, 2)
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Concurrent MCP load generator")
+    parser.add_argument("--sessions", default="4",
+                        help="Concurrent sessions, or a comma-separated sweep (1,2,4,8)")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds per level")
+    parser.add_argument("--mix", help="tool:weight,... (default: offense triage mix)")
+    parser.add_argument("--mix-file", help="JSON list of {tool, arguments, weight}")
+    parser.add_argument("--in-process", action="store_true",
+                        help="Share one in-process server instead of spawning python -m src")
+    parser.add_argument("--qradar-url", help="Use a running stand-in instead of starting one")
+    parser.add_argument("--latency-ms", type=float, default=10.0, help="Stand-in base latency")
+    parser.add_argument("--jitter-ms", type=float, default=5.0, help="Stand-in latency jitter")
+    parser.add_argument("--rate-limit", type=float, default=0.0,
+                        help="Stand-in requests/second before 429 (0 = unlimited)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Write results JSON to this file")
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.INFO)
+
+    mix = parse_mix(args.mix, args.mix_file)
+    levels = [int(s) for s in args.sessions.split(",") if s]
+
+    mock = None
+    qradar_url = args.qradar_url
+    if not qradar_url:
+        mock = MockQRadarServer(MockConfig(
+            latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, rate_limit=args.rate_limit,
+            search_run_seconds=0.0,
+        )).start()
+        qradar_url = mock.url
+
+    results = []
+    try:
+        for sessions in levels:
+            print(f"Running {sessions} session(s) for {args.duration:.0f}s...", file=sys.stderr)
+            results.append(asyncio.run(
+                run_level(sessions, qradar_url, mix, args.duration, args.in_process, args.seed)
+            ))
+    finally:
+        if mock:
+            mock.stop()
+
+    print(f"\n{'sessions':>8} {'calls/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>8}")
+    for r in results:
+        print(f"{r['sessions']:>8} {r['throughput_per_second']:>9} {r['p50_ms']:>9} "
+              f"{r['p95_ms']:>9} {r['p99_ms']:>9} {r['error_rate']:>8.2%}")
+
+    report = {
+        "benchmark": "load",
+        "mode": "in-process" if args.in_process else "stdio",
+        "duration_seconds": args.duration,
+        "mix": mix,
+        "levels": results,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
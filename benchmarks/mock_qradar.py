@@ -0,0 +1,1315 @@
+#!/usr/bin/env python3
+"""Local QRadar REST API stand-in for offline benchmarking
+
+Serves the endpoints ``QRadarClient`` uses from synthetic, seeded data:
+offenses, log sources, assets, rules, reference sets, network hierarchy,
+users and Ariel searches (WAIT -> EXECUTE -> COMPLETED), plus reference set
+bulk loads and rule dependents tasks. It follows the
+QRadar conventions the client depends on:
+
+- ``SEC`` token authentication (401 without it)
+- ``filter`` expressions (``status=OPEN``, ``id in (1,2)``, ``and``/``or``,
+  ``contains``, ``ILIKE``, ``is null``, ``between``)
+- ``fields`` selection of top-level fields
+- ``Range: items=x-y`` requests answered with ``Content-Range: items x-y/total``
+- 429 throttling with ``Retry-After`` when a request rate limit is set
+- injected server errors (``error_rate``) to exercise failure handling
+- optional ``ETag`` / ``If-None-Match`` revalidation (304); off by default
+  because QRadar itself does not send validators
+
+Latency is configurable (base, jitter, per returned item and an occasional
+slow tail) so client-side performance features can be measured on a laptop.
+
+Usage:
+    python -m benchmarks.mock_qradar --port 8080 --offenses 5000 --latency-ms 20
+
+    QRADAR_HOST=http://127.0.0.1:8080 QRADAR_API_TOKEN=mock python -m src
+
+In-process:
+    with MockQRadarServer(MockConfig(offenses=1000)) as mock:
+        client = QRadarClient(mock.url, "mock-token")
+
+Author: Ram Krishna Katakwar
+License: MIT
+"""
+import argparse
+import hashlib
+import ipaddress
+import json
+import random
+import re
+import socket
+import sys
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+
+# Fixed "now" keeps generated timestamps reproducible for a given seed
+EPOCH_MS = 1760000000000
+HOUR_MS = 3600 * 1000
+
+
+@dataclass
+class MockConfig:
+    """Scale and behaviour of the stand-in"""
+
+    seed: int = 42
+    offenses: int = 500
+    log_sources: int = 300
+    assets: int = 1000
+    events: int = 10000
+    flows: int = 5000
+    rules: int = 400
+    building_blocks: int = 200
+    users: int = 25
+    networks: int = 50
+    reference_sets: int = 5
+    reference_set_size: int = 2000
+    saved_searches: int = 15
+
+    # Latency model
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    per_item_us: float = 0.0
+    tail_probability: float = 0.0
+    tail_ms: float = 0.0
+
+    # Ariel search lifecycle (seconds spent in WAIT, then EXECUTE)
+    search_queue_seconds: float = 0.0
+    search_run_seconds: float = 0.5
+
+    # Rule dependents task lifecycle (seconds before COMPLETED)
+    dependents_task_seconds: float = 0.05
+
+    # Requests per second before answering 429 (0 disables throttling)
+    rate_limit: float = 0.0
+    retry_after: int = 1
+
+    # Fraction of requests answered with error_status (can be changed while running)
+    error_rate: float = 0.0
+    error_status: int = 500
+
+    # Send ETags on GET responses and answer If-None-Match with 304
+    etags: bool = False
+
+    token: Optional[str] = None
+
+
+# ==================== Filter Expressions ====================
+
+_TOKEN_RE = re.compile(
+    r"""\s*(?:
+        (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+      | (?P<number>-?\d+(?:\.\d+)?)
+      | (?P<op>>=|<=|!=|=|>|<)
+      | (?P<punct>[(),])
+      | (?P<word>[A-Za-z_][A-Za-z0-9_.]*)
+    )""",
+    re.VERBOSE,
+)
+
+
+def _tokenize(text: str) -> List[Tuple[str, Any]]:
+    tokens = []
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if not match or match.end() == pos:
+            raise ValueError(f"Invalid filter near: {text[pos:pos + 20]!r}")
+        pos = match.end()
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "string":
+            value = re.sub(r"\\(.)", r"\1", value[1:-1])
+        elif kind == "number":
+            value = float(value) if "." in value else int(value)
+        elif kind == "word" and value.lower() in ("true", "false"):
+            kind, value = "bool", value.lower() == "true"
+        tokens.append((kind, value))
+    return tokens
+
+
+class FilterParser:
+    """Parses a QRadar filter string into a predicate over dicts"""
+
+    def __init__(self, text: str):
+        self.tokens = _tokenize(text)
+        self.pos = 0
+
+    def parse(self) -> Callable[[Dict], bool]:
+        predicate = self._expr()
+        if self.pos != len(self.tokens):
+            raise ValueError(f"Unexpected token in filter: {self.tokens[self.pos][1]!r}")
+        return predicate
+
+    def _peek(self) -> Optional[Tuple[str, Any]]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def _next(self) -> Tuple[str, Any]:
+        token = self._peek()
+        if token is None:
+            raise ValueError("Unexpected end of filter")
+        self.pos += 1
+        return token
+
+    def _keyword(self, word: str) -> bool:
+        token = self._peek()
+        if token and token[0] == "word" and str(token[1]).lower() == word:
+            self.pos += 1
+            return True
+        return False
+
+    def _expr(self) -> Callable[[Dict], bool]:
+        terms = [self._term()]
+        while self._keyword("or"):
+            terms.append(self._term())
+        return terms[0] if len(terms) == 1 else (lambda o: any(t(o) for t in terms))
+
+    def _term(self) -> Callable[[Dict], bool]:
+        factors = [self._factor()]
+        while self._keyword("and"):
+            factors.append(self._factor())
+        return factors[0] if len(factors) == 1 else (lambda o: all(f(o) for f in factors))
+
+    def _factor(self) -> Callable[[Dict], bool]:
+        if self._keyword("not"):
+            inner = self._factor()
+            return lambda o: not inner(o)
+        token = self._peek()
+        if token == ("punct", "("):
+            self._next()
+            inner = self._expr()
+            self._expect(")")
+            return inner
+        return self._comparison()
+
+    def _expect(self, punct: str) -> None:
+        token = self._next()
+        if token != ("punct", punct):
+            raise ValueError(f"Expected {punct!r} in filter")
+
+    def _literal(self) -> Any:
+        kind, value = self._next()
+        if kind not in ("string", "number", "bool", "word"):
+            raise ValueError(f"Expected a value in filter, got {value!r}")
+        return value
+
+    def _comparison(self) -> Callable[[Dict], bool]:
+        kind, path = self._next()
+        if kind != "word":
+            raise ValueError(f"Expected a field name in filter, got {path!r}")
+
+        if self._keyword("in"):
+            self._expect("(")
+            values = [self._literal()]
+            while self._peek() == ("punct", ","):
+                self._next()
+                values.append(self._literal())
+            self._expect(")")
+            if all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+                # ID lists ("id in (...)") are common and long; match them with a set
+                wanted = set(values)
+                return lambda o: (
+                    _get(o, path) in wanted if type(_get(o, path)) is int
+                    else any(_equals(_get(o, path), v) for v in values)
+                )
+            return lambda o: any(_equals(_get(o, path), v) for v in values)
+
+        if self._keyword("contains"):
+            token = self._peek()
+            after = self.tokens[self.pos + 1] if self.pos + 1 < len(self.tokens) else None
+            if token and token[0] == "word" and after and (
+                after[0] == "op" or str(after[1]).lower() in ("contains", "in", "ilike", "like")
+            ):
+                inner = self._comparison()
+                return lambda o: any(
+                    isinstance(item, dict) and inner(item) for item in (_get(o, path) or [])
+                )
+            value = self._literal()
+            return lambda o: any(_equals(item, value) for item in (_get(o, path) or []))
+
+        if self._keyword("is"):
+            negate = self._keyword("not")
+            if not self._keyword("null"):
+                raise ValueError("Expected NULL after IS in filter")
+            return lambda o: (_get(o, path) is None) != negate
+
+        if self._keyword("between"):
+            low = self._literal()
+            if not self._keyword("and"):
+                raise ValueError("Expected AND in BETWEEN filter")
+            high = self._literal()
+            return lambda o: _compare(_get(o, path), ">=", low) and _compare(_get(o, path), "<=", high)
+
+        for word in ("ilike", "like"):
+            if self._keyword(word):
+                pattern = _like_to_regex(str(self._literal()), word == "ilike")
+                return lambda o: isinstance(_get(o, path), str) and bool(pattern.match(_get(o, path)))
+
+        kind, op = self._next()
+        if kind != "op":
+            raise ValueError(f"Expected an operator after {path!r} in filter")
+        value = self._literal()
+        return lambda o: _compare(_get(o, path), op, value)
+
+
+def _like_to_regex(pattern: str, ignore_case: bool) -> "re.Pattern":
+    # A backslash makes the next character (e.g. % or _) match itself
+    regex = "".join(
+        re.escape(escaped) if escaped else ".*" if c == "%" else "." if c == "_" else re.escape(c)
+        for escaped, c in re.findall(r"\\(.)|(.)", pattern, re.DOTALL)
+    )
+    return re.compile(f"^{regex}$", (re.IGNORECASE if ignore_case else 0) | re.DOTALL)
+
+
+def _get(obj: Any, path: str) -> Any:
+    for part in path.split("."):
+        if not isinstance(obj, dict):
+            return None
+        obj = obj.get(part)
+    return obj
+
+
+def _coerce(left: Any, right: Any) -> Tuple[Any, Any]:
+    if isinstance(left, bool) or isinstance(right, bool):
+        return str(left).lower(), str(right).lower()
+    if isinstance(left, (int, float)) and isinstance(right, str):
+        try:
+            return left, float(right)
+        except ValueError:
+            return str(left), right
+    if isinstance(left, str) and isinstance(right, (int, float)):
+        try:
+            return float(left), right
+        except ValueError:
+            return left, str(right)
+    return left, right
+
+
+def _equals(left: Any, right: Any) -> bool:
+    if left is None:
+        return False
+    left, right = _coerce(left, right)
+    return left == right
+
+
+def _compare(left: Any, op: str, right: Any) -> bool:
+    if left is None:
+        return op == "!="
+    left, right = _coerce(left, right)
+    try:
+        if op == "=":
+            return left == right
+        if op == "!=":
+            return left != right
+        if op == ">":
+            return left > right
+        if op == "<":
+            return left < right
+        if op == ">=":
+            return left >= right
+        if op == "<=":
+            return left <= right
+    except TypeError:
+        return False
+    raise ValueError(f"Unknown operator {op!r}")
+
+
+def apply_filter(items: List[Dict], filter_query: Optional[str]) -> List[Dict]:
+    """Return the items matching a QRadar filter expression"""
+    if not filter_query:
+        return items
+    predicate = FilterParser(filter_query).parse()
+    return [item for item in items if predicate(item)]
+
+
+def select_fields(items: List[Dict], fields: Optional[str]) -> List[Dict]:
+    """Keep only the requested top-level fields (nested selections keep the whole field)"""
+    if not fields:
+        return items
+    names, depth, current = [], 0, ""
+    for char in fields:
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            names.append(current.strip())
+            current = ""
+            continue
+        if depth == 0 and char != ")":
+            current += char
+    names.append(current.strip())
+    names = [n for n in names if n]
+    return [{n: item.get(n) for n in names if n in item} for item in items]
+
+
+def parse_range(header: Optional[str]) -> Optional[Tuple[int, int]]:
+    """Parse 'items=x-y' into an inclusive (x, y) range"""
+    if not header:
+        return None
+    match = re.match(r"\s*items\s*=\s*(\d+)\s*-\s*(\d+)\s*$", header)
+    if not match:
+        raise ValueError(f"Invalid Range header: {header}")
+    return int(match.group(1)), int(match.group(2))
+
+
+# ==================== Synthetic Data ====================
+
+class MockData:
+    """Seeded synthetic QRadar objects"""
+
+    STATUSES = ["OPEN", "OPEN", "OPEN", "HIDDEN", "CLOSED"]
+    LOG_SOURCE_TYPES = [
+        (12, "Microsoft Windows Security Event Log"), (11, "Linux OS"),
+        (18, "Cisco ASA"), (46, "Palo Alto PA Series"), (67, "Blue Coat SG"),
+        (105, "Microsoft IIS"), (338, "AWS CloudTrail"), (382, "Microsoft 365 Defender"),
+    ]
+    CATEGORIES = [
+        "Authentication", "Suspicious Activity", "Access", "Exploit", "Malware",
+        "Policy", "Recon", "DoS", "Application", "Audit",
+    ]
+
+    def __init__(self, config: MockConfig):
+        self.config = config
+        rnd = random.Random(config.seed)
+        self.rnd = rnd
+
+        self.domains = [
+            {"id": 0, "name": "Default Domain", "description": "", "deleted": False,
+             "log_source_ids": [], "asset_scanner_ids": [], "event_collector_ids": []},
+            {"id": 1, "name": "Finance", "description": "Finance business unit", "deleted": False,
+             "log_source_ids": [], "asset_scanner_ids": [], "event_collector_ids": []},
+            {"id": 2, "name": "Engineering", "description": "Engineering business unit",
+             "deleted": False, "log_source_ids": [], "asset_scanner_ids": [],
+             "event_collector_ids": []},
+        ]
+        self.users = [
+            {"id": i, "username": f"analyst{i}", "email": f"analyst{i}@example.com",
+             "description": "", "user_role_id": 1 + i % 3, "security_profile_id": 1,
+             "locale": "en", "deleted": False}
+            for i in range(1, config.users + 1)
+        ]
+        self.networks = self._networks()
+        self.log_source_types = [
+            {"id": tid, "name": name, "custom": False, "internal": False,
+             "protocol_types": [{"protocol_id": 0, "documented": True}]}
+            for tid, name in self.LOG_SOURCE_TYPES
+        ]
+        self.log_sources = self._log_sources()
+        for source in self.log_sources:
+            self.domains[source["domain_id"]]["log_source_ids"].append(source["id"])
+        self.assets = self._assets()
+        self.qid_records = [
+            {"id": i, "qid": 5000000 + i, "name": f"{rnd.choice(self.CATEGORIES)} Event {i}",
+             "description": "", "severity": rnd.randint(1, 10), "low_level_category_id": 1000 + i % 50,
+             "log_source_type_id": rnd.choice(self.LOG_SOURCE_TYPES)[0]}
+            for i in range(1, 501)
+        ]
+        self.rules, self.building_blocks = self._rules()
+        self.offense_types = [
+            {"id": 0, "name": "Source IP", "property_name": "sourceIP", "database_type": "COMMON",
+             "custom": False},
+            {"id": 1, "name": "Destination IP", "property_name": "destinationIP",
+             "database_type": "COMMON", "custom": False},
+            {"id": 3, "name": "Username", "property_name": "userName", "database_type": "COMMON",
+             "custom": False},
+            {"id": 4, "name": "Source MAC Address", "property_name": "sourceMAC",
+             "database_type": "COMMON", "custom": False},
+            {"id": 7, "name": "Log Source", "property_name": "deviceId", "database_type": "COMMON",
+             "custom": False},
+        ]
+        self.source_addresses: List[Dict] = []
+        self.local_destination_addresses: List[Dict] = []
+        self.offenses = self._offenses()
+        self.notes: Dict[int, List[Dict]] = {}
+        self.closing_reasons = [
+            {"id": 1, "text": "False-Positive, Tuned", "is_reserved": False, "is_deleted": False},
+            {"id": 2, "text": "Non-Issue", "is_reserved": False, "is_deleted": False},
+            {"id": 3, "text": "Policy Violation", "is_reserved": False, "is_deleted": False},
+        ]
+        self.reference_sets = self._reference_sets()
+        self.events = self._ariel_rows(config.events, flows=False)
+        self.flows = self._ariel_rows(config.flows, flows=True)
+        self.saved_searches = [
+            {"id": i, "name": f"Morning check {i}", "database": "EVENTS", "owner": "admin",
+             "is_shared": True, "is_quick_search": False, "is_aggregate": False,
+             "aql": f"SELECT sourceip, destinationip, username, qid FROM events "
+                    f"WHERE magnitude > {i % 10} LAST 24 HOURS"}
+            for i in range(1, config.saved_searches + 1)
+        ]
+        self.custom_properties = [
+            {"id": i, "regex_property_identifier": str(uuid.UUID(int=i)), "enabled": True,
+             "regex": r"user=(\S+)", "capture_group": 1, "identifier": str(uuid.UUID(int=i + 99)),
+             "log_source_type_id": rnd.choice(self.LOG_SOURCE_TYPES)[0],
+             "creation_date": EPOCH_MS - 30 * 24 * HOUR_MS, "modification_date": EPOCH_MS}
+            for i in range(1, 21)
+        ]
+        self.servers = [
+            {"server_id": 1, "hostname": "qradar-console", "private_ip": "10.0.0.5",
+             "status": "ACTIVE", "managed_host_id": 53},
+            {"server_id": 2, "hostname": "qradar-ep01", "private_ip": "10.0.0.6",
+             "status": "ACTIVE", "managed_host_id": 54},
+        ]
+        self.applications = [
+            {"application_state": {"application_id": str(100 + i), "status": "RUNNING"},
+             "manifest": {"name": name, "version": "1.0.0"}}
+            for i, name in enumerate(["User Behavior Analytics", "Pulse", "Use Case Manager"])
+        ]
+        self.ariel_fields = {
+            "events": [
+                {"name": name, "argument_type": kind, "indexable": True}
+                for name, kind in [
+                    ("sourceip", "IP"), ("destinationip", "IP"), ("sourceport", "NUMERIC"),
+                    ("destinationport", "NUMERIC"), ("username", "TEXT"), ("qid", "NUMERIC"),
+                    ("category", "NUMERIC"), ("magnitude", "NUMERIC"), ("starttime", "TIMESTAMP"),
+                    ("logsourceid", "NUMERIC"), ("eventcount", "NUMERIC"),
+                ]
+            ],
+            "flows": [
+                {"name": name, "argument_type": kind, "indexable": True}
+                for name, kind in [
+                    ("sourceip", "IP"), ("destinationip", "IP"), ("sourceport", "NUMERIC"),
+                    ("destinationport", "NUMERIC"), ("protocolid", "NUMERIC"),
+                    ("sourcebytes", "NUMERIC"), ("destinationbytes", "NUMERIC"),
+                    ("starttime", "TIMESTAMP"),
+                ]
+            ],
+        }
+
+    def _ip(self, local: bool) -> str:
+        if local and self.networks:
+            network = ipaddress.ip_network(self.rnd.choice(self.networks)["cidr"])
+            return str(network.network_address + self.rnd.randrange(1, max(2, network.num_addresses - 1)))
+        return f"{self.rnd.randint(11, 223)}.{self.rnd.randint(0, 255)}." \
+               f"{self.rnd.randint(0, 255)}.{self.rnd.randint(1, 254)}"
+
+    def _networks(self) -> List[Dict]:
+        groups = ["DMZ", "Servers", "Workstations", "Finance", "Engineering", "VPN"]
+        networks = [
+            {"id": 1, "name": "corp", "group": "CORP", "cidr": "10.0.0.0/8",
+             "description": "Corporate", "domain_id": 0, "location": {}},
+        ]
+        for i in range(2, self.config.networks + 1):
+            networks.append({
+                "id": i,
+                "name": f"net_{i}",
+                "group": f"CORP.{groups[i % len(groups)]}",
+                "cidr": f"10.{i % 256}.{(i * 7) % 256}.0/24",
+                "description": "",
+                "domain_id": i % 3,
+                "location": {},
+            })
+        return networks
+
+    def _log_sources(self) -> List[Dict]:
+        sources = []
+        for i in range(1, self.config.log_sources + 1):
+            type_id, type_name = self.rnd.choice(self.LOG_SOURCE_TYPES)
+            # Most sources are chatty, a few have gone quiet for hours or days
+            quiet_hours = self.rnd.choice([0, 0, 0, 0, 0, 1, 6, 30, 200])
+            created = EPOCH_MS - self.rnd.randint(30, 900) * 24 * HOUR_MS
+            sources.append({
+                "id": i,
+                "name": f"{type_name} @ host{i:05d}",
+                "description": "",
+                "type_id": type_id,
+                "protocol_type_id": 0,
+                "enabled": self.rnd.random() > 0.05,
+                "gateway": False,
+                "internal": False,
+                "target_event_collector_id": 7,
+                "status": {"status": "SUCCESS" if quiet_hours < 24 else "WARN",
+                           "last_updated": EPOCH_MS, "messages": []},
+                "last_event_time": EPOCH_MS - quiet_hours * HOUR_MS - self.rnd.randint(0, 600000),
+                "creation_date": created,
+                "modified_date": created + self.rnd.randint(0, 20) * 24 * HOUR_MS,
+                "average_eps": self.rnd.randint(0, 500),
+                "domain_id": i % 3,
+                "protocol_parameters": [
+                    {"id": 0, "name": "identifier", "value": f"10.1.{i // 256}.{i % 256}"},
+                ],
+            })
+        return sources
+
+    def _assets(self) -> List[Dict]:
+        assets = []
+        for i in range(1, self.config.assets + 1):
+            ips = [self._ip(local=True) for _ in range(self.rnd.choice([1, 1, 1, 2]))]
+            assets.append({
+                "id": i,
+                "domain_id": i % 3,
+                "risk_score_sum": round(self.rnd.random() * 10, 2),
+                "vulnerability_count": self.rnd.randint(0, 40),
+                "interfaces": [{
+                    "id": i * 10,
+                    "mac_address": ":".join(f"{self.rnd.randint(0, 255):02x}" for _ in range(6)),
+                    "created": EPOCH_MS - 90 * 24 * HOUR_MS,
+                    "ip_addresses": [
+                        {"id": i * 100 + n, "value": ip, "type": "IPV4",
+                         "created": EPOCH_MS - 90 * 24 * HOUR_MS}
+                        for n, ip in enumerate(ips)
+                    ],
+                }],
+                "properties": [
+                    {"id": i * 1000, "name": "Given Name", "value": f"host{i:05d}"},
+                    {"id": i * 1000 + 1, "name": "Unified Name", "value": f"host{i:05d}.corp"},
+                ],
+                "hostnames": [{"id": i, "name": f"host{i:05d}.corp", "type": "DNS"}],
+                "users": [],
+                "products": [],
+            })
+        return assets
+
+    def _rules(self) -> Tuple[List[Dict], List[Dict]]:
+        blocks = []
+        for i in range(1, self.config.building_blocks + 1):
+            blocks.append({
+                "id": 200000 + i,
+                "name": f"BB:Category Definition: {self.rnd.choice(self.CATEGORIES)} {i}",
+                "type": "EVENT",
+                "enabled": True,
+                "building_block": True,
+                "owner": "admin",
+                "origin": "SYSTEM",
+                "creation_date": EPOCH_MS - 400 * 24 * HOUR_MS,
+                "modification_date": EPOCH_MS - self.rnd.randint(0, 300) * 24 * HOUR_MS,
+                "identifier": str(uuid.UUID(int=200000 + i)),
+                "linked_rule_identifier": None,
+                "base_capacity": 1,
+                "base_host_id": 53,
+                "capacity_timestamp": EPOCH_MS,
+                "average_capacity": 1,
+            })
+        rules = []
+        for i in range(1, self.config.rules + 1):
+            rules.append({
+                "id": 100000 + i,
+                "name": f"{self.rnd.choice(self.CATEGORIES)} rule {i}",
+                "type": self.rnd.choice(["EVENT", "EVENT", "FLOW", "COMMON", "OFFENSE"]),
+                "enabled": self.rnd.random() > 0.2,
+                "owner": "admin",
+                "origin": self.rnd.choice(["SYSTEM", "USER", "OVERRIDE"]),
+                "creation_date": EPOCH_MS - 400 * 24 * HOUR_MS,
+                "modification_date": EPOCH_MS - self.rnd.randint(0, 300) * 24 * HOUR_MS,
+                "identifier": str(uuid.UUID(int=100000 + i)),
+                "linked_rule_identifier": None,
+                "base_capacity": self.rnd.randint(1, 50),
+                "base_host_id": 53,
+                "capacity_timestamp": EPOCH_MS,
+                "average_capacity": self.rnd.randint(1, 50),
+            })
+
+        # Rule tests are not exposed by the API; only dependents tasks reveal them.
+        # A separate generator keeps the rest of the data unchanged.
+        rnd = random.Random(self.config.seed + 2)
+        self.rule_uses: Dict[int, List[int]] = {}
+        block_ids = [b["id"] for b in blocks]
+        for i, block in enumerate(blocks):
+            if i and rnd.random() < 0.3:
+                self.rule_uses[block["id"]] = rnd.sample(block_ids[:i], min(i, rnd.randint(1, 2)))
+        for i, rule in enumerate(rules):
+            uses = rnd.sample(block_ids, min(len(block_ids), rnd.randint(0, 3)))
+            if i and rnd.random() < 0.1:
+                uses.append(rules[rnd.randrange(i)]["id"])
+            if uses:
+                self.rule_uses[rule["id"]] = uses
+        return rules, blocks
+
+    def _offenses(self) -> List[Dict]:
+        offenses = []
+        address_ids: Dict[Tuple[str, str], int] = {}
+
+        def address(kind: str, ip: str, offense_id: int) -> int:
+            key = (kind, ip)
+            table = self.source_addresses if kind == "source" else self.local_destination_addresses
+            if key not in address_ids:
+                address_ids[key] = len(table) + 1
+                entry = {
+                    "id": address_ids[key],
+                    "offense_ids": [],
+                    "first_event_flow_seen": EPOCH_MS - 48 * HOUR_MS,
+                    "last_event_flow_seen": EPOCH_MS,
+                    "magnitude": self.rnd.randint(1, 10),
+                    "network": "CORP.Servers",
+                    "event_flow_count": self.rnd.randint(1, 5000),
+                    "domain_id": 0,
+                }
+                entry["source_ip" if kind == "source" else "local_destination_ip"] = ip
+                table.append(entry)
+            table[address_ids[key] - 1]["offense_ids"].append(offense_id)
+            return address_ids[key]
+
+        for i in range(1, self.config.offenses + 1):
+            source_ip = self._ip(local=self.rnd.random() < 0.6)
+            dest_ips = [self._ip(local=True) for _ in range(self.rnd.randint(1, 3))]
+            sources = self.rnd.sample(self.log_sources, min(len(self.log_sources), self.rnd.randint(1, 3)))
+            rules = self.rnd.sample(self.rules, min(len(self.rules), self.rnd.randint(1, 2)))
+            start = EPOCH_MS - self.rnd.randint(1, 24 * 30) * HOUR_MS
+            status = self.rnd.choice(self.STATUSES)
+            offenses.append({
+                "id": i,
+                "description": f"{self.rnd.choice(self.CATEGORIES)} activity from {source_ip}\n",
+                "status": status,
+                "severity": self.rnd.randint(1, 10),
+                "magnitude": self.rnd.randint(1, 10),
+                "credibility": self.rnd.randint(1, 10),
+                "relevance": self.rnd.randint(1, 10),
+                "offense_type": 0,
+                "offense_source": source_ip,
+                "source_network": "other" if not source_ip.startswith("10.") else "CORP.Servers",
+                "destination_networks": ["CORP.Servers"],
+                "source_address_ids": [address("source", source_ip, i)],
+                "local_destination_address_ids": [address("destination", ip, i) for ip in dest_ips],
+                "remote_destination_count": self.rnd.randint(0, 3),
+                "log_sources": [
+                    {"id": s["id"], "name": s["name"], "type_id": s["type_id"],
+                     "type_name": dict(self.LOG_SOURCE_TYPES)[s["type_id"]]}
+                    for s in sources
+                ],
+                "rules": [{"id": r["id"], "type": "CRE_RULE"} for r in rules],
+                "categories": self.rnd.sample(self.CATEGORIES, 2),
+                "event_count": self.rnd.randint(1, 100000),
+                "flow_count": self.rnd.randint(0, 1000),
+                "device_count": len(sources),
+                "category_count": 2,
+                "policy_category_count": 0,
+                "security_category_count": 2,
+                "username_count": self.rnd.randint(0, 5),
+                "start_time": start,
+                "last_updated_time": start + self.rnd.randint(0, 48) * HOUR_MS,
+                "last_persisted_time": start + self.rnd.randint(0, 48) * HOUR_MS,
+                "first_persisted_time": start,
+                "close_time": EPOCH_MS if status == "CLOSED" else None,
+                "closing_user": "admin" if status == "CLOSED" else None,
+                "closing_reason_id": 1 if status == "CLOSED" else None,
+                "assigned_to": self.rnd.choice([None, None] + [u["username"] for u in self.users[:5]]),
+                "follow_up": False,
+                "protected": False,
+                "inactive": False,
+                "domain_id": self.rnd.randint(0, 2),
+            })
+        return offenses
+
+    def _reference_sets(self) -> Dict[str, Dict]:
+        sets = {}
+        for i in range(1, self.config.reference_sets + 1):
+            name = ["Malicious IPs", "Phishing Domains", "Bad Hashes", "Watchlist Users",
+                    "Tor Exit Nodes"][(i - 1) % 5] + ("" if i <= 5 else f" {i}")
+            element_type = "IP" if "IP" in name or "Tor" in name else "ALNIC"
+            data = []
+            for n in range(self.config.reference_set_size):
+                if element_type == "IP":
+                    value = f"{self.rnd.randint(11, 223)}.{self.rnd.randint(0, 255)}." \
+                            f"{self.rnd.randint(0, 255)}.{self.rnd.randint(1, 254)}"
+                else:
+                    value = f"ioc-{i}-{n:07d}"
+                seen = EPOCH_MS - self.rnd.randint(0, 90 * 24) * HOUR_MS
+                data.append({"value": value, "source": "threat-feed",
+                             "first_seen": seen, "last_seen": seen})
+            sets[name] = {
+                "name": name,
+                "element_type": element_type,
+                "timeout_type": "LAST_SEEN",
+                "number_of_elements": len(data),
+                "creation_time": EPOCH_MS - 365 * 24 * HOUR_MS,
+                "data": data,
+            }
+        return sets
+
+    def _ariel_rows(self, count: int, flows: bool) -> List[Dict]:
+        rows = []
+        for i in range(count):
+            row = {
+                "sourceip": self._ip(local=self.rnd.random() < 0.5),
+                "destinationip": self._ip(local=self.rnd.random() < 0.7),
+                "sourceport": self.rnd.randint(1024, 65535),
+                "destinationport": self.rnd.choice([22, 53, 80, 443, 445, 3389]),
+                "starttime": EPOCH_MS - i * 1000,
+            }
+            if flows:
+                row.update({
+                    "protocolid": self.rnd.choice([6, 17]),
+                    "sourcebytes": self.rnd.randint(40, 10 ** 6),
+                    "destinationbytes": self.rnd.randint(40, 10 ** 6),
+                })
+            else:
+                row.update({
+                    "username": self.rnd.choice([None, "alice", "bob", "svc_backup", "root"]),
+                    "qid": self.rnd.choice(self.qid_records)["qid"],
+                    "category": self.rnd.randint(1000, 1050),
+                    "magnitude": self.rnd.randint(1, 10),
+                    "logsourceid": self.rnd.randint(1, max(1, len(self.log_sources))),
+                    "eventcount": 1,
+                })
+            rows.append(row)
+        return rows
+
+
+# ==================== HTTP Server ====================
+
+class MockError(Exception):
+    def __init__(self, status: int, message: str, headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+class _RateLimiter:
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class MockQRadar:
+    """Request routing and state for the stand-in (independent of the HTTP layer)"""
+
+    def __init__(self, config: MockConfig):
+        self.config = config
+        self.data = MockData(config)
+        self.searches: Dict[str, Dict] = {}
+        self.dependents_tasks: Dict[int, Dict] = {}
+        self.reference_values: Dict[str, Dict[str, Dict]] = {}  # set -> value -> element
+        self.lock = threading.Lock()
+        self.limiter = _RateLimiter(config.rate_limit) if config.rate_limit else None
+        self.latency_rnd = random.Random(config.seed + 1)
+        self.request_counts: Dict[str, int] = {}
+        self.throttled = 0
+        self.routes: List[Tuple[str, "re.Pattern", Callable]] = []
+        self._register_routes()
+
+    # ---------- routing ----------
+
+    def route(self, method: str, pattern: str):
+        def decorator(func):
+            self.routes.append((method, re.compile(f"^{pattern}$"), func))
+            return func
+        return decorator
+
+    def _register_routes(self) -> None:
+        d = self.data
+        lists = {
+            "/siem/offenses": lambda: d.offenses,
+            "/siem/source_addresses": lambda: d.source_addresses,
+            "/siem/local_destination_addresses": lambda: d.local_destination_addresses,
+            "/siem/offense_types": lambda: d.offense_types,
+            "/siem/offense_closing_reasons": lambda: d.closing_reasons,
+            "/config/event_sources/log_source_management/log_sources": lambda: d.log_sources,
+            "/config/event_sources/log_source_management/log_source_types":
+                lambda: d.log_source_types,
+            "/asset_model/assets": lambda: d.assets,
+            "/reference_data/sets": lambda: [
+                {k: v for k, v in s.items() if k != "data"} for s in d.reference_sets.values()
+            ],
+            "/system/servers": lambda: d.servers,
+            "/analytics/rules": lambda: d.rules,
+            "/analytics/building_blocks": lambda: d.building_blocks,
+            "/ariel/saved_searches": lambda: d.saved_searches,
+            "/ariel/databases": lambda: ["events", "flows"],
+            "/config/event_sources/custom_properties/property_expressions":
+                lambda: d.custom_properties,
+            "/config/domain_management/domains": lambda: d.domains,
+            "/config/network_hierarchy/networks": lambda: d.networks,
+            "/data_classification/qid_records": lambda: d.qid_records,
+            "/config/access/users": lambda: d.users,
+            "/gui_app_framework/applications": lambda: d.applications,
+        }
+        for path, source in lists.items():
+            self.routes.append(("GET", re.compile(f"^{re.escape(path)}$"),
+                                lambda req, m, source=source: self._list(req, source())))
+
+        by_id = {
+            "/siem/offenses": lambda: d.offenses,
+            "/siem/source_addresses": lambda: d.source_addresses,
+            "/siem/local_destination_addresses": lambda: d.local_destination_addresses,
+            "/siem/offense_types": lambda: d.offense_types,
+            "/config/event_sources/log_source_management/log_sources": lambda: d.log_sources,
+            "/asset_model/assets": lambda: d.assets,
+            "/analytics/rules": lambda: d.rules,
+            "/analytics/building_blocks": lambda: d.building_blocks,
+            "/ariel/saved_searches": lambda: d.saved_searches,
+            "/config/event_sources/custom_properties/property_expressions":
+                lambda: d.custom_properties,
+            "/config/domain_management/domains": lambda: d.domains,
+            "/config/access/users": lambda: d.users,
+        }
+        for path, source in by_id.items():
+            self.routes.append(("GET", re.compile(f"^{re.escape(path)}/(\\d+)$"),
+                                lambda req, m, source=source: self._by_id(req, source(), m)))
+
+        self.route("GET", "/system/about")(lambda req, m: (200, {
+            "release_name": "7.5.0 UpdatePackage 9", "build_version": "2024.9.0.20240815",
+            "fips_enabled": False, "external_version": "7.5.0", "console_hostname": "qradar-mock",
+        }))
+        self.route("GET", r"/ariel/databases/(events|flows)/fields")(
+            lambda req, m: self._list(req, d.ariel_fields[m.group(1)]))
+        self.route("GET", r"/reference_data/sets/([^/]+)")(self._reference_set)
+        self.route("POST", r"/reference_data/sets/bulk_load/([^/]+)")(self._bulk_load)
+        self.route("GET", r"/siem/offenses/(\d+)/notes")(self._get_notes)
+        self.route("POST", r"/siem/offenses/(\d+)/notes")(self._add_note)
+        self.route("POST", r"/siem/offenses/(\d+)")(self._update_offense)
+        self.route("POST", r"/ariel/searches")(self._create_search)
+        self.route("GET", r"/ariel/searches/([^/]+)")(self._search_status)
+        self.route("GET", r"/ariel/searches/([^/]+)/results")(self._search_results)
+        self.route("DELETE", r"/ariel/searches/([^/]+)")(self._delete_search)
+        self.route("POST", r"/analytics/(rules|building_blocks)/(\d+)/dependents")(
+            self._create_dependents_task)
+        self.route("GET", r"/analytics/dependent_tasks/(\d+)")(self._dependents_task_status)
+        self.route("GET", r"/analytics/dependent_tasks/(\d+)/results")(
+            self._dependents_task_results)
+
+    def handle(self, method: str, path: str, query: Dict[str, str], headers: Dict[str, str],
+               body: bytes) -> Tuple[int, Any, Dict[str, str]]:
+        """
+        Serve one API request
+
+        Returns:
+            Tuple of (status, JSON-serializable body, extra headers)
+        """
+        if self.config.token and headers.get("sec") != self.config.token:
+            raise MockError(401, "Invalid or missing SEC token")
+        if not headers.get("sec"):
+            raise MockError(401, "Missing SEC token")
+        if self.limiter and not self.limiter.allow():
+            with self.lock:
+                self.throttled += 1
+            raise MockError(429, "Too many requests",
+                            {"Retry-After": str(self.config.retry_after)})
+        if self.config.error_rate and self.latency_rnd.random() < self.config.error_rate:
+            raise MockError(self.config.error_status, "Injected failure")
+
+        request = {"method": method, "path": path, "query": query, "headers": headers, "body": body}
+        for route_method, pattern, handler in self.routes:
+            match = pattern.match(path)
+            if route_method == method and match:
+                key = f"{method} {pattern.pattern}"
+                with self.lock:
+                    self.request_counts[key] = self.request_counts.get(key, 0) + 1
+                result = handler(request, match)
+                status, payload = result[0], result[1]
+                extra = result[2] if len(result) > 2 else {}
+                self._delay(payload)
+                return status, payload, extra
+        raise MockError(404, f"No mock endpoint for {method} {path}")
+
+    def _delay(self, payload: Any) -> None:
+        cfg = self.config
+        delay = cfg.latency_ms / 1000.0
+        if cfg.jitter_ms:
+            delay += self.latency_rnd.random() * cfg.jitter_ms / 1000.0
+        if cfg.per_item_us and isinstance(payload, list):
+            delay += len(payload) * cfg.per_item_us / 1e6
+        if cfg.tail_probability and self.latency_rnd.random() < cfg.tail_probability:
+            delay += cfg.tail_ms / 1000.0
+        if delay > 0:
+            time.sleep(delay)
+
+    # ---------- generic collections ----------
+
+    def _list(self, req: Dict, items: List[Dict]) -> Tuple[int, List[Dict], Dict[str, str]]:
+        try:
+            items = apply_filter(items, req["query"].get("filter"))
+            rng = parse_range(req["headers"].get("range"))
+        except ValueError as e:
+            raise MockError(422, str(e))
+        total = len(items)
+        headers = {}
+        if rng is not None:
+            start, end = rng
+            items = items[start:end + 1]
+            last = start + len(items) - 1 if items else start
+            headers["Content-Range"] = f"items {start}-{last}/{total}"
+        return 200, select_fields(items, req["query"].get("fields")), headers
+
+    def _by_id(self, req: Dict, items: List[Dict], match: "re.Match") -> Tuple[int, Dict]:
+        wanted = int(match.group(1))
+        for item in items:
+            if item.get("id") == wanted:
+                return 200, select_fields([item], req["query"].get("fields"))[0]
+        raise MockError(404, f"Object {wanted} does not exist")
+
+    # ---------- offenses ----------
+
+    def _offense(self, offense_id: int) -> Dict:
+        for offense in self.data.offenses:
+            if offense["id"] == offense_id:
+                return offense
+        raise MockError(404, f"Offense {offense_id} does not exist")
+
+    def _get_notes(self, req: Dict, match: "re.Match") -> Tuple[int, List[Dict], Dict[str, str]]:
+        offense_id = int(match.group(1))
+        self._offense(offense_id)
+        return self._list(req, self.data.notes.get(offense_id, []))
+
+    def _add_note(self, req: Dict, match: "re.Match") -> Tuple[int, Dict]:
+        offense_id = int(match.group(1))
+        self._offense(offense_id)
+        text = req["query"].get("note_text")
+        if not text:
+            raise MockError(422, "note_text is required")
+        with self.lock:
+            notes = self.data.notes.setdefault(offense_id, [])
+            note = {"id": offense_id * 1000 + len(notes) + 1, "note_text": text,
+                    "create_time": int(time.time() * 1000), "username": "API_token: mock"}
+            notes.append(note)
+        return 201, note
+
+    def _update_offense(self, req: Dict, match: "re.Match") -> Tuple[int, Dict]:
+        offense = self._offense(int(match.group(1)))
+        query = req["query"]
+        status = query.get("status")
+        if status and status not in ("OPEN", "HIDDEN", "CLOSED"):
+            raise MockError(422, f"Invalid status {status}")
+        if status == "CLOSED" and not query.get("closing_reason_id"):
+            raise MockError(422, "closing_reason_id is required to close an offense")
+        with self.lock:
+            if status:
+                offense["status"] = status
+                if status == "CLOSED":
+                    offense["closing_reason_id"] = int(query["closing_reason_id"])
+                    offense["close_time"] = int(time.time() * 1000)
+            if "assigned_to" in query:
+                offense["assigned_to"] = query["assigned_to"]
+            offense["last_updated_time"] = int(time.time() * 1000)
+        return 200, offense
+
+    # ---------- reference data ----------
+
+    def _reference_set(self, req: Dict, match: "re.Match") -> Tuple[int, Dict, Dict[str, str]]:
+        name = unquote(match.group(1))
+        ref_set = self.data.reference_sets.get(name)
+        if ref_set is None:
+            raise MockError(404, f"Reference set {name} does not exist")
+        try:
+            data = apply_filter(ref_set["data"], req["query"].get("filter"))
+            rng = parse_range(req["headers"].get("range"))
+        except ValueError as e:
+            raise MockError(422, str(e))
+        headers = {}
+        if rng is not None:
+            start, end = rng
+            total = len(data)
+            data = data[start:end + 1]
+            last = start + len(data) - 1 if data else start
+            headers["Content-Range"] = f"items {start}-{last}/{total}"
+        body = {k: v for k, v in ref_set.items() if k != "data"}
+        body["data"] = data
+        return 200, select_fields([body], req["query"].get("fields"))[0], headers
+
+    def _bulk_load(self, req: Dict, match: "re.Match") -> Tuple[int, Dict]:
+        name = unquote(match.group(1))
+        ref_set = self.data.reference_sets.get(name)
+        if ref_set is None:
+            raise MockError(404, f"Reference set {name} does not exist")
+        try:
+            values = json.loads(req["body"] or b"null")
+        except ValueError:
+            raise MockError(422, "Body must be a JSON array of values")
+        if not isinstance(values, list):
+            raise MockError(422, "Body must be a JSON array of values")
+        if ref_set["element_type"] == "IP":
+            for value in values:
+                try:
+                    ipaddress.ip_address(str(value))
+                except ValueError:
+                    raise MockError(422, f"{value} is not a valid IP address")
+        now = int(time.time() * 1000)
+        with self.lock:
+            existing = self.reference_values.get(name)
+            if existing is None:
+                existing = self.reference_values[name] = {e["value"]: e for e in ref_set["data"]}
+            for value in values:
+                element = existing.get(str(value))
+                if element is None:
+                    element = existing[str(value)] = {
+                        "value": str(value), "source": "reference data api", "first_seen": now,
+                    }
+                    ref_set["data"].append(element)
+                element["last_seen"] = now
+            ref_set["number_of_elements"] = len(ref_set["data"])
+        return 200, {k: v for k, v in ref_set.items() if k != "data"}
+
+    # ---------- Ariel ----------
+
+    def _create_search(self, req: Dict, match: "re.Match") -> Tuple[int, Dict]:
+        query = req["query"].get("query_expression")
+        if not query:
+            raise MockError(422, "query_expression is required")
+        database = "flows" if re.search(r"\bfrom\s+flows\b", query, re.IGNORECASE) else "events"
+        rows = self.data.flows if database == "flows" else self.data.events
+
+        columns = None
+        select = re.search(r"select\s+(.*?)\s+from\s", query, re.IGNORECASE | re.DOTALL)
+        if select and select.group(1).strip() != "*":
+            columns = [
+                re.split(r"\s+as\s+", c.strip(), flags=re.IGNORECASE)[-1].strip()
+                for c in select.group(1).split(",")
+            ]
+        limit = re.search(r"\blimit\s+(\d+)", query, re.IGNORECASE)
+        count = min(len(rows), int(limit.group(1))) if limit else len(rows)
+
+        search_id = str(uuid.uuid4())
+        with self.lock:
+            self.searches[search_id] = {
+                "search_id": search_id,
+                "database": database,
+                "columns": columns,
+                "count": count,
+                "created": time.monotonic(),
+                "query": query,
+            }
+        return 201, self._search_body(self.searches[search_id])
+
+    def _search_body(self, search: Dict) -> Dict:
+        elapsed = time.monotonic() - search["created"]
+        queue_s = self.config.search_queue_seconds
+        run_s = self.config.search_run_seconds
+        if search.get("canceled"):
+            status, progress = "CANCELED", 0
+        elif elapsed < queue_s:
+            status, progress = "WAIT", 0
+        elif elapsed < queue_s + run_s:
+            status = "EXECUTE"
+            progress = int((elapsed - queue_s) / run_s * 100) if run_s else 100
+        else:
+            status, progress = "COMPLETED", 100
+        return {
+            "search_id": search["search_id"],
+            "status": status,
+            "progress": progress,
+            "record_count": search["count"] if status == "COMPLETED" else 0,
+            "completed": status == "COMPLETED",
+            "query_execution_time": int(min(elapsed, queue_s + run_s) * 1000),
+            "error_messages": [],
+        }
+
+    def _search(self, search_id: str) -> Dict:
+        search = self.searches.get(search_id)
+        if search is None:
+            raise MockError(404, f"Search {search_id} does not exist")
+        return search
+
+    def _search_status(self, req: Dict, match: "re.Match") -> Tuple[int, Dict]:
+        return 200, self._search_body(self._search(match.group(1)))
+
+    def _search_results(self, req: Dict, match: "re.Match") -> Tuple[int, Dict, Dict[str, str]]:
+        search = self._search(match.group(1))
+        if self._search_body(search)["status"] != "COMPLETED":
+            raise MockError(404, "Search results are not ready")
+        rows = (self.data.flows if search["database"] == "flows" else self.data.events)
+        start, end = 0, search["count"] - 1
+        headers = {}
+        rng = parse_range(req["headers"].get("range"))
+        if rng is not None:
+            start, end = rng[0], min(rng[1], search["count"] - 1)
+            headers["Content-Range"] = f"items {start}-{max(start, end)}/{search['count']}"
+        selected = rows[start:end + 1]
+        if search["columns"]:
+            selected = [{c: row.get(c) for c in search["columns"]} for row in selected]
+        return 200, {search["database"]: selected}, headers
+
+    def _delete_search(self, req: Dict, match: "re.Match") -> Tuple[int, Dict]:
+        search = self._search(match.group(1))
+        with self.lock:
+            search["canceled"] = True
+        return 202, self._search_body(search)
+
+    # ---------- rule dependents tasks ----------
+
+    def _create_dependents_task(self, req: Dict, match: "re.Match") -> Tuple[int, Dict]:
+        d = self.data
+        items = d.rules if match.group(1) == "rules" else d.building_blocks
+        rule_id = int(match.group(2))
+        if not any(item["id"] == rule_id for item in items):
+            raise MockError(404, f"{match.group(1)} {rule_id} does not exist")
+        names = {item["id"]: (item["name"], "RULE") for item in d.rules}
+        names.update({item["id"]: (item["name"], "BUILDING_BLOCK") for item in d.building_blocks})
+        dependents = [
+            {"id": user, "name": names[user][0], "dependent_type": names[user][1]}
+            for user, uses in d.rule_uses.items() if rule_id in uses
+        ]
+        with self.lock:
+            task_id = len(self.dependents_tasks) + 1
+            self.dependents_tasks[task_id] = {
+                "id": task_id, "created": time.monotonic(), "dependents": dependents,
+            }
+        return 201, self._dependents_task_body(self.dependents_tasks[task_id])
+
+    def _dependents_task_body(self, task: Dict) -> Dict:
+        done = time.monotonic() - task["created"] >= self.config.dependents_task_seconds
+        return {
+            "id": task["id"],
+            "status": "COMPLETED" if done else "PROCESSING",
+            "number_of_dependents": len(task["dependents"]) if done else None,
+        }
+
+    def _dependents_task(self, task_id: str) -> Dict:
+        task = self.dependents_tasks.get(int(task_id))
+        if task is None:
+            raise MockError(404, f"Dependents task {task_id} does not exist")
+        return task
+
+    def _dependents_task_status(self, req: Dict, match: "re.Match") -> Tuple[int, Dict]:
+        return 200, self._dependents_task_body(self._dependents_task(match.group(1)))
+
+    def _dependents_task_results(self, req: Dict, match: "re.Match") -> Tuple[int, Any]:
+        task = self._dependents_task(match.group(1))
+        if self._dependents_task_body(task)["status"] != "COMPLETED":
+            raise MockError(409, f"Dependents task {task['id']} has not completed")
+        return 200, task["dependents"]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    mock: MockQRadar = None  # set per server class
+
+    def setup(self):
+        super().setup()
+        # Headers and body go out in separate writes; without this Nagle's
+        # algorithm and delayed ACKs add ~40ms to every keep-alive response
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def _serve(self, method: str) -> None:
+        parsed = urlparse(self.path)
+        path = parsed.path
+        if path.startswith("/api"):
+            path = path[len("/api"):]
+        query = {k: v[-1] for k, v in parse_qs(parsed.query, keep_blank_values=True).items()}
+        headers = {k.lower(): v for k, v in self.headers.items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+
+        try:
+            status, payload, extra = self.mock.handle(method, path, query, headers, body)
+        except MockError as e:
+            status, extra = e.status, e.headers
+            payload = {"http_response": {"code": e.status, "message": e.message},
+                       "code": e.status, "message": e.message, "description": ""}
+        except Exception as e:
+            status, extra = 500, {}
+            payload = {"code": 500, "message": f"Mock server error: {e}"}
+
+        data = json.dumps(payload).encode("utf-8")
+        if self.mock.config.etags and method == "GET" and status in (200, 206):
+            etag = '"' + hashlib.sha1(data).hexdigest()[:16] + '"'
+            extra = dict(extra, ETag=etag)
+            if headers.get("if-none-match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in extra.items():
+            self.send_header(key, value)
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up (timeout or a hedged request that lost the race)
+            self.close_connection = True
+
+    def do_GET(self):
+        self._serve("GET")
+
+    def do_POST(self):
+        self._serve("POST")
+
+    def do_DELETE(self):
+        self._serve("DELETE")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients closing idle keep-alive connections are routine, not errors
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            return
+        super().handle_error(request, client_address)
+
+
+class MockQRadarServer:
+    """Runs a MockQRadar behind a threaded HTTP server"""
+
+    def __init__(self, config: Optional[MockConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or MockConfig()
+        self.mock = MockQRadar(self.config)
+        handler = type("MockHandler", (_Handler,), {"mock": self.mock})
+        self.httpd = _QuietHTTPServer((host, port), handler)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockQRadarServer":
+        self._thread = threading.Thread(
+            target=self.httpd.serve_forever, name="mock-qradar", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "MockQRadarServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local QRadar REST API stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    defaults = MockConfig()
+    for name, value in vars(defaults).items():
+        if name == "token":
+            continue
+        if isinstance(value, bool):
+            parser.add_argument(f"--{name.replace('_', '-')}", action="store_true")
+            continue
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=value)
+    parser.add_argument("--token", default=None, help="Require this SEC token (default: any)")
+    args = parser.parse_args()
+
+    config = MockConfig(**{k: v for k, v in vars(args).items() if k in vars(defaults)})
+    server = MockQRadarServer(config, args.host, args.port)
+    print(f"Mock QRadar listening on {server.url} "
+          f"({config.offenses} offenses, {config.events} events, {config.assets} assets)")
+    print(f"  QRADAR_HOST={server.url} QRADAR_API_TOKEN={config.token or 'mock'} python -m src")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""Chunked bulk loading of values into reference sets
+
+``/reference_data/sets/bulk_load/{name}`` adds a JSON array of values in one
+request. Feeding it a large IOC list means splitting the list: one huge
+request runs into body size limits and timeouts, while tiny requests spend
+all their time on round trips. The loader cuts the input (a list, or a file
+with one value per line) into chunks capped by value count and by encoded
+size, keeps a bounded number of chunks in flight, and retries a chunk that
+failed because QRadar was unhealthy. Adding a value that is already in a set
+only refreshes its ``last_seen``, so a retried chunk cannot duplicate
+anything.
+
+Values are trimmed, de-duplicated and, for IP sets, validated and put in
+canonical form before anything is sent; invalid addresses are reported
+instead of failing a whole chunk.
+
+Files are only read from inside ``QRADAR_BULK_LOAD_DIR`` (after resolving
+symlinks and ``..``); with no directory set, loading from a file is off.
+
+    QRADAR_BULK_CHUNK_SIZE     Most values per request (default: 10000)
+    QRADAR_BULK_CHUNK_KB       Largest request body in KiB (default: 1024)
+    QRADAR_BULK_CONCURRENCY    Chunks in flight at once (default: 4)
+    QRADAR_BULK_RETRIES        Retries of a chunk QRadar failed to take (default: 3)
+    QRADAR_BULK_LOAD_DIR       Directory file_path may point into (default: unset, files off)
+
+Author: Ram Krishna Katakwar
+Version: 0.2.0
+License: MIT
+"""
+import contextvars
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+from . import circuit, ip_index, refset_index, tracing
+
+logger = logging.getLogger("qradar-mcp.bulk_load")
+
+# Invalid values listed in a load summary (the rest are only counted)
+MAX_REPORTED_REJECTS = 100
+
+
+def read_values(path: str) -> Iterator[str]:
+    """Values from a text file, one per line (blank lines and # comments skipped)"""
+    with open(os.path.expanduser(path), encoding="utf-8") as f:
+        for line in f:
+            value = line.strip()
+            if value and not value.startswith("#"):
+                yield value
+
+
+def chunk_values(values: Iterable[str], max_items: int, max_bytes: int) -> Iterator[List[str]]:
+    """
+    Split values into lists small enough for one bulk_load request
+
+    Args:
+        values: Values to send
+        max_items: Most values per chunk
+        max_bytes: Approximate cap on a chunk's JSON encoding
+
+    Yields:
+        Non-empty lists of values
+    """
+    chunk: List[str] = []
+    size = 2  # "[]"
+    for value in values:
+        # Quotes and separator; escapes are rare enough to ignore
+        encoded = len(value.encode("utf-8")) + 3
+        if chunk and (len(chunk) >= max_items or size + encoded > max_bytes):
+            yield chunk
+            chunk, size = [], 2
+        chunk.append(value)
+        size += encoded
+    if chunk:
+        yield chunk
+
+
+class BulkLoader:
+    """Loads large value lists into reference sets through a QRadarClient"""
+
+    def __init__(
+        self,
+        client: Any,
+        chunk_size: int = 10000,
+        chunk_bytes: int = 1024 * 1024,
+        concurrency: int = 4,
+        retries: int = 3,
+        file_dir: Optional[str] = None
+    ):
+        self.client = client
+        self.chunk_size = max(1, chunk_size)
+        self.chunk_bytes = max(1024, chunk_bytes)
+        self.concurrency = max(1, concurrency)
+        self.retries = max(0, retries)
+        self.file_dir = os.path.realpath(os.path.expanduser(file_dir)) if file_dir else None
+
+    def _send_chunk(self, name: str, chunk: List[str]) -> int:
+        """Send one chunk, retrying while QRadar is unhealthy. Returns the retries used"""
+        attempt = 0
+        while True:
+            try:
+                with tracing.span("refset.bulk_load_chunk", reference_set=name, values=len(chunk)):
+                    self.client.bulk_load_reference_set(name, chunk)
+                return attempt
+            except circuit.UpstreamError as e:
+                # 4xx answers are not retried: sending the same body again cannot help
+                if attempt >= self.retries:
+                    raise
+                delay = self.client.limiter.backoff(attempt, None)
+                logger.warning(
+                    f"Bulk load chunk for '{name}' failed ({e}); retrying in {delay:.1f}s"
+                )
+                attempt += 1
+                time.sleep(delay)
+
+    def load(self, name: str, values: Iterable[Any]) -> Dict[str, Any]:
+        """
+        Add values to a reference set in chunks
+
+        Args:
+            name: Reference set name (must already exist)
+            values: Values to add (any iterable, e.g. read_values(path))
+
+        Returns:
+            Summary with counts, failed chunks, element counts before and
+            after, and throughput
+        """
+        start = time.perf_counter()
+        info = self.client.get_reference_set_data(
+            name, fields="name,element_type,number_of_elements"
+        )
+        element_type = info.get("element_type", "ALNIC")
+
+        rejected: List[str] = []
+        counts = {"submitted": 0, "duplicates": 0, "rejected": 0}
+
+        def prepared() -> Iterator[str]:
+            seen: Set[str] = set()
+            for raw in values:
+                counts["submitted"] += 1
+                value = refset_index.normalize(raw, element_type)
+                if not value or (element_type == "IP" and ip_index.ip_to_int(value) is None):
+                    counts["rejected"] += 1
+                    if len(rejected) < MAX_REPORTED_REJECTS:
+                        rejected.append(str(raw))
+                    continue
+                if value in seen:
+                    counts["duplicates"] += 1
+                    continue
+                seen.add(value)
+                yield value
+
+        pool = self.client._get_pool("bulk", self.concurrency)
+        in_flight: Dict[Future, List[str]] = {}
+        chunks = loaded = retries = 0
+        failed: List[Dict[str, Any]] = []
+
+        def collect(done: Iterable[Future]) -> None:
+            nonlocal loaded, retries
+            for future in done:
+                chunk = in_flight.pop(future)
+                try:
+                    retries += future.result()
+                    loaded += len(chunk)
+                except Exception as e:
+                    failed.append({
+                        "first_value": chunk[0],
+                        "values": len(chunk),
+                        "error": str(e),
+                    })
+
+        with tracing.span("refset.bulk_load", reference_set=name) as span:
+            for chunk in chunk_values(prepared(), self.chunk_size, self.chunk_bytes):
+                if len(in_flight) >= self.concurrency:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done)
+                future = pool.submit(contextvars.copy_context().run, self._send_chunk, name, chunk)
+                in_flight[future] = chunk
+                chunks += 1
+            collect(wait(in_flight).done)
+            span.set_attribute("values_loaded", loaded)
+
+        # New values are newer than anything indexed; sync them on the next check
+        self.client.refset_index.invalidate(name)
+        after: Optional[int] = None
+        try:
+            after = self.client.get_reference_set_data(
+                name, fields="number_of_elements"
+            ).get("number_of_elements")
+        except Exception as e:
+            logger.warning(f"Could not read element count of '{name}' after bulk load: {e}")
+
+        seconds = time.perf_counter() - start
+        logger.info(
+            f"Bulk loaded {loaded} values into '{name}' in {chunks} chunks ({seconds:.1f}s)"
+        )
+        return {
+            "reference_set": name,
+            "element_type": element_type,
+            "submitted": counts["submitted"],
+            "duplicates": counts["duplicates"],
+            "rejected": counts["rejected"],
+            "rejected_values": rejected,
+            "loaded": loaded,
+            "chunks": chunks,
+            "chunk_retries": retries,
+            "failed_chunks": failed,
+            "elements_before": info.get("number_of_elements"),
+            "elements_after": after,
+            "seconds": round(seconds, 3),
+            "values_per_second": round(loaded / seconds) if seconds > 0 else None,
+        }
+
+    def resolve_file(self, path: str) -> str:
+        """
+        The real path of a file inside the bulk load directory
+
+        Raises:
+            ValueError: Files are off, or the path is outside the directory or missing
+        """
+        if self.file_dir is None:
+            raise ValueError("Loading from a file is disabled (QRADAR_BULK_LOAD_DIR is not set)")
+        resolved = os.path.realpath(os.path.join(self.file_dir, os.path.expanduser(path)))
+        if not resolved.startswith(self.file_dir.rstrip(os.sep) + os.sep):
+            raise ValueError(f"File is outside the bulk load directory: {path}")
+        if not os.path.isfile(resolved):
+            raise ValueError(f"File not found: {path}")
+        return resolved
+
+    def load_file(self, name: str, path: str) -> Dict[str, Any]:
+        """Add the values in a text file (one per line) inside the bulk load directory"""
+        return self.load(name, read_values(self.resolve_file(path)))
+
+
+def settings_from_env() -> Dict[str, Any]:
+    """Read QRADAR_BULK_* into QRadarClient keyword arguments"""
+    return {
+        "bulk_chunk_size": int(os.getenv("QRADAR_BULK_CHUNK_SIZE", "10000")),
+        "bulk_chunk_bytes": int(os.getenv("QRADAR_BULK_CHUNK_KB", "1024")) * 1024,
+        "bulk_concurrency": int(os.getenv("QRADAR_BULK_CONCURRENCY", "4")),
+        "bulk_retries": int(os.getenv("QRADAR_BULK_RETRIES", "3")),
+        "bulk_load_dir": os.getenv("QRADAR_BULK_LOAD_DIR") or None,
+    }
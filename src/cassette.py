@@ -0,0 +1,228 @@
+"""Record/replay HTTP cassettes for the QRadar client
+
+In ``record`` mode every request the client makes goes to the real console
+as usual, and the request/response pair is appended to a gzip-compressed
+JSON-lines cassette together with its wall time. In ``replay`` mode no
+network is touched: requests are matched against the cassette and answered
+with the recorded status, headers and body after the recorded latency
+(optionally scaled).
+
+What is stored is scrubbed: the host is dropped (paths are kept relative to
+``/api``), request headers other than ``Range`` are not written, only a
+small set of response headers is kept, and any occurrence of the API token
+is replaced.
+
+Configured through the environment:
+
+    QRADAR_CASSETTE_MODE            record or replay (unset: off)
+    QRADAR_CASSETTE_PATH            Cassette file (default: qradar-cassette.jsonl.gz)
+    QRADAR_CASSETTE_LATENCY_SCALE   Replay latency multiplier (default: 1.0, 0 = instant)
+
+Author: Ram Krishna Katakwar
+Version: 0.2.0
+License: MIT
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from http.client import responses as http_reasons
+from typing import Any, Deque, Dict, Iterator, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger("qradar-mcp.cassette")
+
+DEFAULT_PATH = "qradar-cassette.jsonl.gz"
+SCRUBBED = "<scrubbed>"
+MODES = ("record", "replay")
+
+# Response headers worth keeping; everything else (cookies, server banners) is dropped
+KEPT_RESPONSE_HEADERS = (
+    "Content-Type", "Content-Range", "Retry-After", "ETag", "Last-Modified",
+)
+
+InteractionKey = Tuple[str, str, str, str, str]
+
+
+def _split_path(url: str) -> Tuple[str, str]:
+    """Path relative to /api and the query string with parameters sorted"""
+    parts = urlsplit(url)
+    path = parts.path
+    if "/api/" in path:
+        path = path[path.index("/api/") + 4:]
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return path, query
+
+
+def _body_bytes(body: Any) -> bytes:
+    if body is None:
+        return b""
+    if isinstance(body, str):
+        return body.encode("utf-8")
+    return bytes(body)
+
+
+def _interaction_key(
+    method: str,
+    path: str,
+    query: str,
+    range_header: str,
+    body: str
+) -> InteractionKey:
+    digest = hashlib.sha1(body.encode("utf-8")).hexdigest() if body else ""
+    return (method.upper(), path, query, range_header, digest)
+
+
+def read_cassette(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield the interactions stored in a cassette file"""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+class RecordingAdapter(HTTPAdapter):
+    """HTTPAdapter that appends each request/response pair to a cassette"""
+
+    def __init__(self, path: str, api_token: str, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self._secrets = [s for s in (api_token,) if s]
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        start = time.perf_counter()
+        response = super().send(request, **kwargs)
+        elapsed = time.perf_counter() - start
+        try:
+            self._append(request, response, elapsed)
+        except Exception as e:
+            logger.warning(f"Failed to record interaction: {str(e)}")
+        return response
+
+    def _scrub(self, text: str) -> str:
+        for secret in self._secrets:
+            text = text.replace(secret, SCRUBBED)
+        return text
+
+    def _append(
+        self,
+        request: requests.PreparedRequest,
+        response: requests.Response,
+        elapsed: float
+    ) -> None:
+        path, query = _split_path(request.url)
+        content = response.content
+        interaction = {
+            "method": request.method,
+            "path": path,
+            "query": self._scrub(query),
+            "range": request.headers.get("Range", ""),
+            "request_body": self._scrub(_body_bytes(request.body).decode("utf-8", "replace")),
+            "status": response.status_code,
+            "headers": {
+                name: response.headers[name]
+                for name in KEPT_RESPONSE_HEADERS if name in response.headers
+            },
+            "body": self._scrub(content.decode(response.encoding or "utf-8", "replace")),
+            "elapsed_ms": round(elapsed * 1000, 3),
+            "recorded_at": time.time(),
+        }
+        line = json.dumps(interaction, separators=(",", ":")) + "\n"
+        # One gzip member per interaction keeps the file readable if the process is killed
+        with self._lock:
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                f.write(line)
+
+
+class ReplayAdapter(BaseAdapter):
+    """Transport adapter that answers requests from a cassette"""
+
+    def __init__(self, path: str, latency_scale: float = 1.0):
+        super().__init__()
+        self.path = path
+        self.latency_scale = latency_scale
+        self._interactions: Dict[InteractionKey, Deque[Dict[str, Any]]] = {}
+        self._last: Dict[InteractionKey, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+        count = 0
+        for interaction in read_cassette(path):
+            key = _interaction_key(
+                interaction["method"], interaction["path"], interaction["query"],
+                interaction.get("range", ""), interaction.get("request_body", ""),
+            )
+            self._interactions.setdefault(key, deque()).append(interaction)
+            count += 1
+        logger.info(f"Loaded {count} recorded interactions from {path}")
+
+    def _next(self, key: InteractionKey) -> Optional[Dict[str, Any]]:
+        """Recorded interactions for a key are served in order, then the last one repeats"""
+        with self._lock:
+            queue = self._interactions.get(key)
+            if queue:
+                self._last[key] = queue.popleft()
+            return self._last.get(key)
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        path, query = _split_path(request.url)
+        body = _body_bytes(request.body).decode("utf-8", "replace")
+        key = _interaction_key(request.method, path, query, request.headers.get("Range", ""), body)
+        interaction = self._next(key)
+        if interaction is None:
+            raise requests.exceptions.ConnectionError(
+                f"No recorded interaction for {request.method} {path}"
+                + (f"?{query}" if query else ""),
+                request=request,
+            )
+
+        delay = interaction["elapsed_ms"] / 1000 * self.latency_scale
+        if delay > 0:
+            time.sleep(delay)
+
+        response = requests.Response()
+        response.status_code = interaction["status"]
+        response.reason = http_reasons.get(response.status_code, "")
+        response.headers = CaseInsensitiveDict(interaction["headers"])
+        response._content = interaction["body"].encode("utf-8")
+        # The body is already in memory; close() and iter_content() must not look for a stream
+        response._content_consumed = True
+        response.raw = None
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self) -> None:
+        pass
+
+
+def settings_from_env() -> Dict[str, Any]:
+    """
+    Read QRADAR_CASSETTE_* into QRadarClient keyword arguments
+
+    Returns:
+        cassette_mode (None when off), cassette_path and cassette_latency_scale
+    """
+    mode = os.getenv("QRADAR_CASSETTE_MODE", "").strip().lower()
+    if mode in ("", "off", "none"):
+        mode = None
+    elif mode not in MODES:
+        raise ValueError(f"QRADAR_CASSETTE_MODE must be one of: {', '.join(MODES)}")
+    return {
+        "cassette_mode": mode,
+        "cassette_path": os.getenv("QRADAR_CASSETTE_PATH", DEFAULT_PATH),
+        "cassette_latency_scale": float(os.getenv("QRADAR_CASSETTE_LATENCY_SCALE", "1.0")),
+    }
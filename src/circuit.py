@@ -0,0 +1,211 @@
+"""Per-endpoint circuit breakers and stale-result bookkeeping
+
+When the console is overloaded every call would otherwise wait through its
+retries before failing, while agents keep adding calls. A breaker per
+endpoint template watches a rolling window of outcomes:
+
+- closed: requests flow; once enough requests have been seen and the
+  failure ratio crosses the threshold, the circuit opens
+- open: requests fail immediately with CircuitOpenError for open_seconds
+- half-open: a single probe is let through, then twice as many after each
+  success, until enough consecutive successes close the circuit; any
+  failure reopens it
+
+Only server-side trouble counts as failure (5xx, throttling that outlasted
+retries, timeouts, connection errors); 4xx answers mean the console is
+healthy.
+
+While a request cannot be served, the client falls back to the last good
+result it has for that request (metadata and list endpoints) and records it
+here so the tool response can say which data is stale and how old it is.
+
+    QRADAR_CIRCUIT_FAILURE_RATIO   Failure ratio that opens the circuit (default: 0.5)
+    QRADAR_CIRCUIT_MIN_REQUESTS    Requests in the window before it can open (default: 5)
+    QRADAR_CIRCUIT_WINDOW          Rolling window in seconds (default: 30)
+    QRADAR_CIRCUIT_OPEN_SECONDS    Time before the first half-open probe (default: 15)
+    QRADAR_STALE_MAX_AGE           Oldest result served stale, in seconds (default: 3600)
+
+Author: Ram Krishna Katakwar
+Version: 0.2.0
+License: MIT
+"""
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from . import metrics
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+# Stale results used while handling the current tool call. The list is created
+# once per call (reset_stale_results) so worker threads running in copied
+# contexts append to the same list
+_stale_results: contextvars.ContextVar[Optional[List[Dict[str, Any]]]] = contextvars.ContextVar(
+    "qradar_stale_results", default=None
+)
+
+
+class UpstreamError(Exception):
+    """A request failed because QRadar is unhealthy (5xx, throttled, timeout, unreachable)"""
+
+
+class CircuitOpenError(UpstreamError):
+    """Raised instead of sending a request while its circuit is open"""
+
+
+class CircuitBreaker:
+    """Rolling-window circuit breaker for one endpoint template"""
+
+    def __init__(
+        self,
+        name: str,
+        failure_ratio: float = 0.5,
+        min_requests: int = 5,
+        window: float = 30.0,
+        open_seconds: float = 15.0,
+        close_after: int = 5
+    ):
+        self.name = name
+        self.failure_ratio = failure_ratio
+        self.min_requests = min_requests
+        self.window = window
+        self.open_seconds = open_seconds
+        self.close_after = close_after
+        self.state = CLOSED
+        self._events: Deque[Tuple[float, bool]] = deque()
+        self._opened_at = 0.0
+        self._probe_quota = 0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+        self._publish()
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now (reserves a probe slot when half-open)"""
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    return False
+                self._transition(HALF_OPEN)
+                self._probe_quota = 1
+                self._probe_successes = 0
+            if self.state == HALF_OPEN:
+                if self._probes_in_flight >= self._probe_quota:
+                    return False
+                self._probes_in_flight += 1
+            return True
+
+    def retry_in(self) -> float:
+        """Seconds until the next half-open probe"""
+        with self._lock:
+            return max(0.0, self.open_seconds - (time.monotonic() - self._opened_at))
+
+    def record(self, success: bool) -> None:
+        """Report the outcome of a request that allow() let through"""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if not success:
+                    self._open(now)
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.close_after:
+                    self._events.clear()
+                    self._transition(CLOSED)
+                else:
+                    # Restore traffic gradually: double the probes allowed in flight
+                    self._probe_quota = min(self._probe_quota * 2, self.close_after)
+                return
+
+            self._events.append((now, success))
+            while self._events and now - self._events[0][0] > self.window:
+                self._events.popleft()
+            if self.state == CLOSED and len(self._events) >= self.min_requests:
+                failures = sum(1 for _, ok in self._events if not ok)
+                if failures / len(self._events) >= self.failure_ratio:
+                    self._open(now)
+
+    def _open(self, now: float) -> None:
+        self._opened_at = now
+        self._probes_in_flight = 0
+        self._transition(OPEN)
+
+    def _transition(self, state: str) -> None:
+        self.state = state
+        self._publish()
+
+    def _publish(self) -> None:
+        metrics.CIRCUIT_STATE.set(_STATE_VALUES[self.state], endpoint=self.name)
+
+
+class CircuitBreakers:
+    """Lazily created breakers keyed by endpoint template"""
+
+    def __init__(
+        self,
+        failure_ratio: float = 0.5,
+        min_requests: int = 5,
+        window: float = 30.0,
+        open_seconds: float = 15.0
+    ):
+        self.options = {
+            "failure_ratio": failure_ratio,
+            "min_requests": min_requests,
+            "window": window,
+            "open_seconds": open_seconds,
+        }
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def breaker_for(self, template: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(template)
+            if breaker is None:
+                breaker = self._breakers[template] = CircuitBreaker(template, **self.options)
+            return breaker
+
+    def states(self) -> Dict[str, str]:
+        with self._lock:
+            return {name: breaker.state for name, breaker in self._breakers.items()}
+
+
+def reset_stale_results() -> None:
+    """Start collecting stale results for a new tool call (before work is handed to threads)"""
+    _stale_results.set([])
+
+
+def note_stale(endpoint: str, age_seconds: float, reason: str) -> None:
+    """Record that a stale result was served for the current tool call"""
+    metrics.STALE_SERVED.inc(endpoint=endpoint)
+    results = _stale_results.get()
+    if results is None:
+        results = []
+        _stale_results.set(results)
+    results.append({
+        "endpoint": endpoint,
+        "age_seconds": round(age_seconds, 1),
+        "reason": reason,
+    })
+
+
+def stale_results() -> List[Dict[str, Any]]:
+    """Stale results served so far in the current tool call"""
+    return list(_stale_results.get() or [])
+
+
+def settings_from_env() -> Dict[str, Any]:
+    """Read QRADAR_CIRCUIT_* / QRADAR_STALE_MAX_AGE into QRadarClient keyword arguments"""
+    return {
+        "circuit_failure_ratio": float(os.getenv("QRADAR_CIRCUIT_FAILURE_RATIO", "0.5")),
+        "circuit_min_requests": int(os.getenv("QRADAR_CIRCUIT_MIN_REQUESTS", "5")),
+        "circuit_window": float(os.getenv("QRADAR_CIRCUIT_WINDOW", "30")),
+        "circuit_open_seconds": float(os.getenv("QRADAR_CIRCUIT_OPEN_SECONDS", "15")),
+        "stale_max_age": float(os.getenv("QRADAR_STALE_MAX_AGE", "3600")),
+    }
@@ -0,0 +1,370 @@
+"""Persistent on-disk cache for QRadar catalog GETs
+
+Every MCP process starts cold, so each desktop session used to download the
+same catalogs again (Ariel fields, QID records, log source types, rules).
+``CachingAdapter`` sits in front of the client's transport and keeps GET
+responses for selected endpoint templates in a SQLite database (WAL mode,
+so several server processes can share it), zlib-compressed.
+
+A cached response is served without touching the network while it is fresh.
+After that it is revalidated:
+
+- with ``If-None-Match`` / ``If-Modified-Since`` when the console sent an
+  ``ETag`` or ``Last-Modified`` (a 304 keeps the cached body);
+- otherwise, for list endpoints, with a count probe (``Range: items=0-0``)
+  whose ``Content-Range`` total must match the cached list (a console that
+  ignores ``Range`` sends the whole list without ``Content-Range``, which is
+  used as is);
+
+and it is downloaded again once it reaches its maximum age. Entries are keyed
+by console, a hash of the API token, path, sorted query and ``Range``, so
+users with different permissions never share entries.
+
+    QRADAR_DISK_CACHE                 true to enable (default: false)
+    QRADAR_DISK_CACHE_PATH            Database file
+                                      (default: ~/.cache/qradar-mcp/http-cache.sqlite3)
+    QRADAR_DISK_CACHE_FRESH_SECONDS   Serve without revalidating for this long (default: 300)
+    QRADAR_DISK_CACHE_MAX_AGE         Full refresh after this many seconds (default: 3600)
+    QRADAR_DISK_CACHE_MAX_MB          Size cap; least recently validated entries go first
+                                      (default: 256)
+    QRADAR_DISK_CACHE_ENDPOINTS       Comma-separated endpoint templates (default: catalogs below)
+
+Author: Ram Krishna Katakwar
+Version: 0.2.0
+License: MIT
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from http.client import responses as http_reasons
+from typing import Any, Dict, Iterable, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from . import metrics
+
+logger = logging.getLogger("qradar-mcp.disk_cache")
+
+# Slow-changing catalogs worth keeping between sessions
+DEFAULT_ENDPOINTS = frozenset({
+    "/system/about",
+    "/ariel/databases",
+    "/ariel/databases/{name}/fields",
+    "/data_classification/qid_records",
+    "/config/event_sources/log_source_management/log_source_types",
+    "/config/event_sources/custom_properties/property_expressions",
+    "/config/network_hierarchy/networks",
+    "/config/domain_management/domains",
+    "/analytics/rules",
+    "/analytics/building_blocks",
+    "/siem/offense_closing_reasons",
+})
+
+# Response headers stored with the body
+STORED_HEADERS = ("Content-Type", "Content-Range", "ETag", "Last-Modified")
+
+CACHE_HEADER = "X-QRadar-MCP-Cache"
+
+_CONTENT_RANGE_RE = re.compile(r"items\s+\d+-\d+/(\d+)")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    total INTEGER,
+    stored_at REAL NOT NULL,
+    validated_at REAL NOT NULL,
+    size INTEGER NOT NULL
+)
+"""
+
+
+def default_path() -> str:
+    base = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "qradar-mcp", "http-cache.sqlite3")
+
+
+def _total_from_content_range(value: Optional[str]) -> Optional[int]:
+    match = _CONTENT_RANGE_RE.search(value or "")
+    return int(match.group(1)) if match else None
+
+
+class DiskCache:
+    """SQLite-backed response store shared between processes"""
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._writes = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connect().execute(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; WAL lets readers and a writer in other processes coexist
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            "SELECT url, headers, body, etag, last_modified, total, stored_at, validated_at "
+            "FROM responses WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "url": row[0],
+            "headers": json.loads(row[1]),
+            "body": row[2],
+            "etag": row[3],
+            "last_modified": row[4],
+            "total": row[5],
+            "stored_at": row[6],
+            "validated_at": row[7],
+        }
+
+    def put(
+        self,
+        key: str,
+        url: str,
+        headers: Dict[str, str],
+        content: bytes,
+        total: Optional[int]
+    ) -> None:
+        body = zlib.compress(content, 6)
+        now = time.time()
+        self._connect().execute(
+            "INSERT OR REPLACE INTO responses "
+            "(key, url, headers, body, etag, last_modified, total, stored_at, validated_at, size) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, url, json.dumps(headers), body, headers.get("ETag"),
+             headers.get("Last-Modified"), total, now, now, len(body)),
+        )
+        self._writes += 1
+        if self._writes % 50 == 1:
+            self.prune()
+
+    def touch(self, key: str) -> None:
+        """Mark an entry as revalidated now"""
+        self._connect().execute(
+            "UPDATE responses SET validated_at = ? WHERE key = ?", (time.time(), key)
+        )
+
+    def prune(self) -> None:
+        """Drop least recently validated entries until the store fits max_bytes"""
+        conn = self._connect()
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in conn.execute(
+            "SELECT key, size FROM responses ORDER BY validated_at"
+        ).fetchall():
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self) -> None:
+        self._connect().execute("DELETE FROM responses")
+
+
+class CachingAdapter(BaseAdapter):
+    """Transport adapter that serves and revalidates catalog GETs from a DiskCache"""
+
+    def __init__(
+        self,
+        inner: BaseAdapter,
+        cache: DiskCache,
+        api_token: str,
+        endpoints: Optional[Iterable[str]] = None,
+        fresh_seconds: float = 300.0,
+        max_age: float = 3600.0
+    ):
+        super().__init__()
+        self.inner = inner
+        self.cache = cache
+        self.endpoints = frozenset(endpoints) if endpoints else DEFAULT_ENDPOINTS
+        self.fresh_seconds = fresh_seconds
+        self.max_age = max_age
+        self._scope = hashlib.sha256(api_token.encode("utf-8")).hexdigest()[:16]
+
+    def _key(self, request: requests.PreparedRequest) -> str:
+        parts = urlsplit(request.url)
+        query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+        raw = "\n".join([
+            self._scope, parts.netloc, parts.path, query, request.headers.get("Range", ""),
+        ])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _template(self, request: requests.PreparedRequest) -> str:
+        path = urlsplit(request.url).path
+        if "/api/" in path:
+            path = path[path.index("/api/") + 4:]
+        return metrics.endpoint_template(path)
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        if request.method != "GET":
+            return self.inner.send(request, **kwargs)
+        template = self._template(request)
+        if template not in self.endpoints:
+            return self.inner.send(request, **kwargs)
+
+        key = self._key(request)
+        try:
+            entry = self.cache.get(key)
+        except sqlite3.Error as e:
+            logger.warning(f"Disk cache read failed: {str(e)}")
+            return self.inner.send(request, **kwargs)
+
+        now = time.time()
+        if entry is not None and now - entry["stored_at"] < self.max_age:
+            if now - entry["validated_at"] < self.fresh_seconds:
+                metrics.CACHE_REQUESTS.inc(cache="disk", result="hit")
+                return self._from_cache(request, entry, "hit")
+            response = self._revalidate(request, key, entry, kwargs)
+            if response is not None:
+                return response
+
+        metrics.CACHE_REQUESTS.inc(cache="disk", result="miss")
+        response = self.inner.send(request, **kwargs)
+        if response.status_code == 200:
+            self._store(request, key, response)
+        return response
+
+    def _revalidate(
+        self,
+        request: requests.PreparedRequest,
+        key: str,
+        entry: Dict[str, Any],
+        send_kwargs: Dict[str, Any]
+    ) -> Optional[requests.Response]:
+        """Cheaply confirm a cached entry; None means download it again"""
+        if entry["etag"] or entry["last_modified"]:
+            conditional = request.copy()
+            if entry["etag"]:
+                conditional.headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                conditional.headers["If-Modified-Since"] = entry["last_modified"]
+            response = self.inner.send(conditional, **send_kwargs)
+            if response.status_code == 304:
+                return self._confirmed(request, key, entry)
+            metrics.CACHE_REQUESTS.inc(cache="disk", result="miss")
+            if response.status_code == 200:
+                self._store(request, key, response)
+            return response
+
+        if entry["total"] is not None and "Range" not in request.headers:
+            probe = request.copy()
+            probe.headers["Range"] = "items=0-0"
+            response = self.inner.send(probe, **send_kwargs)
+            content_range = response.headers.get("Content-Range")
+            if response.status_code == 200 and not content_range:
+                # Range was ignored, so the probe already is the full list
+                metrics.CACHE_REQUESTS.inc(cache="disk", result="miss")
+                self._store(request, key, response)
+                return response
+            # QRadar answers a honoured Range with 200 or 206; only the total matters
+            total = _total_from_content_range(content_range)
+            response.close()
+            if response.status_code in (200, 206) and total == entry["total"]:
+                return self._confirmed(request, key, entry)
+        return None
+
+    def _confirmed(
+        self,
+        request: requests.PreparedRequest,
+        key: str,
+        entry: Dict[str, Any]
+    ) -> requests.Response:
+        metrics.CACHE_REQUESTS.inc(cache="disk", result="revalidated")
+        try:
+            self.cache.touch(key)
+        except sqlite3.Error as e:
+            logger.warning(f"Disk cache write failed: {str(e)}")
+        return self._from_cache(request, entry, "revalidated")
+
+    def _store(
+        self, request: requests.PreparedRequest, key: str, response: requests.Response
+    ) -> None:
+        headers = {
+            name: response.headers[name] for name in STORED_HEADERS if name in response.headers
+        }
+        total = _total_from_content_range(headers.get("Content-Range"))
+        if total is None and "Range" not in request.headers:
+            try:
+                data = response.json()
+                total = len(data) if isinstance(data, list) else None
+            except ValueError:
+                total = None
+        try:
+            self.cache.put(key, request.url, headers, response.content, total)
+        except sqlite3.Error as e:
+            logger.warning(f"Disk cache write failed: {str(e)}")
+
+    def _from_cache(
+        self,
+        request: requests.PreparedRequest,
+        entry: Dict[str, Any],
+        result: str
+    ) -> requests.Response:
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = http_reasons[200]
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response.headers[CACHE_HEADER] = result
+        response._content = zlib.decompress(entry["body"])
+        # The body is already in memory; close() and iter_content() must not look for a stream
+        response._content_consumed = True
+        response.raw = None
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self) -> None:
+        self.inner.close()
+
+
+def open_cache(path: str, max_bytes: int) -> Optional[DiskCache]:
+    """The cache database at path, or None (logged) when it cannot be opened"""
+    try:
+        return DiskCache(path, max_bytes=max_bytes)
+    except (OSError, sqlite3.Error) as e:
+        logger.warning(f"Disk cache disabled, could not open {path}: {str(e)}")
+        return None
+
+
+def settings_from_env() -> Dict[str, Any]:
+    """Read QRADAR_DISK_CACHE_* into QRadarClient keyword arguments"""
+    endpoints = [
+        e.strip() for e in os.getenv("QRADAR_DISK_CACHE_ENDPOINTS", "").split(",") if e.strip()
+    ]
+    return {
+        "disk_cache_enabled": os.getenv("QRADAR_DISK_CACHE", "false").lower() == "true",
+        "disk_cache_path": os.getenv("QRADAR_DISK_CACHE_PATH") or default_path(),
+        "disk_cache_fresh_seconds": float(os.getenv("QRADAR_DISK_CACHE_FRESH_SECONDS", "300")),
+        "disk_cache_max_age": float(os.getenv("QRADAR_DISK_CACHE_MAX_AGE", "3600")),
+        "disk_cache_max_mb": float(os.getenv("QRADAR_DISK_CACHE_MAX_MB", "256")),
+        "disk_cache_endpoints": endpoints or None,
+    }
@@ -0,0 +1,118 @@
+"""Per-endpoint timeouts and hedged requests for idempotent GETs
+
+A hedged GET is sent once; if it has not answered after the endpoint's
+recent p95 latency (from ``qradar_api_request_duration_seconds``), a second
+identical request is sent and whichever answers first wins. A budget caps
+hedges to a fraction of eligible requests so a slow console is not handed
+twice the load.
+
+Hedging is opt-in per endpoint template and timeouts can be set per template
+or per endpoint class (first path segment):
+
+    QRADAR_TIMEOUT               Default request timeout in seconds (default: 30)
+    QRADAR_ENDPOINT_TIMEOUTS     e.g. "/siem/offenses/{id}=10,ariel=120"
+    QRADAR_HEDGE_ENDPOINTS       e.g. "/siem/offenses/{id},/asset_model/assets" (* for all GETs)
+    QRADAR_HEDGE_QUANTILE        Latency quantile that triggers the hedge (default: 0.95)
+    QRADAR_HEDGE_BUDGET          Max fraction of eligible requests hedged (default: 0.1)
+    QRADAR_HEDGE_MIN_DELAY_MS    Never hedge sooner than this (default: 50)
+
+Author: Ram Krishna Katakwar
+Version: 0.2.0
+License: MIT
+"""
+import os
+import threading
+from typing import Any, Dict, Iterable, Optional
+
+from . import metrics, ratelimit
+
+# Delay used before an endpoint has latency history
+DEFAULT_HEDGE_DELAY = 1.0
+
+
+def parse_mapping(value: str) -> Dict[str, float]:
+    """Parse "key=seconds,key=seconds" into a dict"""
+    mapping = {}
+    for item in value.split(","):
+        key, sep, seconds = item.strip().rpartition("=")
+        if not sep or not key:
+            continue
+        mapping[key.strip()] = float(seconds)
+    return mapping
+
+
+class TimeoutPolicy:
+    """Request timeout by endpoint template, then endpoint class, then default"""
+
+    def __init__(self, default: float = 30.0, overrides: Optional[Dict[str, float]] = None):
+        self.default = default
+        self.overrides = dict(overrides or {})
+
+    def timeout_for(self, endpoint: str) -> float:
+        template = metrics.endpoint_template(endpoint)
+        if template in self.overrides:
+            return self.overrides[template]
+        return self.overrides.get(ratelimit.endpoint_class(endpoint), self.default)
+
+
+class HedgePolicy:
+    """Decides which GETs are hedged, after how long, and enforces the budget"""
+
+    def __init__(
+        self,
+        endpoints: Optional[Iterable[str]] = None,
+        quantile: float = 0.95,
+        budget: float = 0.1,
+        min_delay: float = 0.05
+    ):
+        self.endpoints = frozenset(endpoints or ())
+        self.all_endpoints = "*" in self.endpoints
+        self.quantile = quantile
+        self.budget = budget
+        self.min_delay = min_delay
+        self._eligible = 0
+        self._hedged = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.endpoints) and self.budget > 0
+
+    def applies_to(self, method: str, template: str) -> bool:
+        if method != "GET" or not self.enabled:
+            return False
+        return self.all_endpoints or template in self.endpoints
+
+    def delay_for(self, template: str) -> float:
+        """Seconds to wait for the first attempt before hedging"""
+        observed = metrics.HTTP_LATENCY.quantile(self.quantile, method="GET", endpoint=template)
+        if observed is None:
+            observed = DEFAULT_HEDGE_DELAY
+        return max(self.min_delay, observed)
+
+    def count_eligible(self) -> None:
+        with self._lock:
+            self._eligible += 1
+
+    def try_spend(self) -> bool:
+        """Reserve a hedge if it keeps hedges within budget * eligible requests"""
+        with self._lock:
+            if self._hedged + 1 > self.budget * self._eligible:
+                return False
+            self._hedged += 1
+            return True
+
+
+def settings_from_env() -> Dict[str, Any]:
+    """Read QRADAR_TIMEOUT / QRADAR_ENDPOINT_TIMEOUTS / QRADAR_HEDGE_* into QRadarClient kwargs"""
+    endpoints = [
+        e.strip() for e in os.getenv("QRADAR_HEDGE_ENDPOINTS", "").split(",") if e.strip()
+    ]
+    return {
+        "timeout": float(os.getenv("QRADAR_TIMEOUT", "30")),
+        "endpoint_timeouts": parse_mapping(os.getenv("QRADAR_ENDPOINT_TIMEOUTS", "")),
+        "hedge_endpoints": endpoints,
+        "hedge_quantile": float(os.getenv("QRADAR_HEDGE_QUANTILE", "0.95")),
+        "hedge_budget": float(os.getenv("QRADAR_HEDGE_BUDGET", "0.1")),
+        "hedge_min_delay": float(os.getenv("QRADAR_HEDGE_MIN_DELAY_MS", "50")) / 1000,
+    }
@@ -0,0 +1,412 @@
+"""Local IP index over the network hierarchy and asset interfaces
+
+Answering "which network is this IP in" or "which asset owns this IP" used
+to take a QRadar request per IP (a nested ``interfaces contains ip_addresses
+contains value=...`` filter for assets) or leave the model to reason over raw
+CIDR lists. This module downloads both once and answers from memory:
+
+- network hierarchy CIDRs are flattened into disjoint integer ranges, each
+  labelled with its most specific network, and searched with bisect
+  (longest-prefix match in O(log n));
+- asset interface IPs go into a dict of IP -> asset IDs.
+
+Search results can be classified in bulk (``classify_rows``): each distinct
+IP is converted to an integer once and all of them are matched against the
+ranges in one pass, with NumPy ``searchsorted`` when NumPy is installed and
+``bisect`` otherwise.
+
+Each index is built on first use and rebuilt in the background once it is
+older than the refresh interval; lookups keep using the previous index while
+that happens.
+
+    QRADAR_IP_INDEX_REFRESH   Seconds before an index is rebuilt (default: 900)
+
+Author: Ram Krishna Katakwar
+Version: 0.2.0
+License: MIT
+"""
+import ipaddress
+import logging
+import os
+import socket
+import threading
+import time
+from bisect import bisect_right
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from . import tracing
+
+try:
+    import numpy as np
+except ImportError:  # optional: classification falls back to bisect
+    np = None
+
+logger = logging.getLogger("qradar-mcp.ip_index")
+
+# Asset fields needed to index interfaces and label the result
+ASSET_FIELDS = "id,domain_id,risk_score_sum,interfaces(ip_addresses(value)),properties(name,value)"
+ASSET_NAME_PROPERTIES = ("Unified Name", "Given Name", "Host Name")
+# Network fields returned by lookups
+NETWORK_FIELDS = ("id", "name", "group", "cidr", "domain_id")
+# Wait before retrying a rebuild that failed
+RETRY_SECONDS = 60.0
+
+# Search result columns classified by default
+DEFAULT_IP_FIELDS = ("sourceip", "destinationip")
+
+IPAddress = Union[ipaddress.IPv4Address, ipaddress.IPv6Address]
+
+
+def parse_ip(value: Any) -> Optional[IPAddress]:
+    """Parse an IPv4/IPv6 address, or None if value is not one"""
+    try:
+        return ipaddress.ip_address(str(value).strip())
+    except ValueError:
+        return None
+
+
+def ip_to_int(value: Any) -> Optional[Tuple[int, int]]:
+    """(IP version, integer value) for an address string, or None if it is not one"""
+    text = str(value).strip()
+    try:
+        return 4, int.from_bytes(socket.inet_pton(socket.AF_INET, text), "big")
+    except OSError:
+        pass
+    try:
+        return 6, int.from_bytes(socket.inet_pton(socket.AF_INET6, text), "big")
+    except OSError:
+        return None
+
+
+class NetworkIndex:
+    """Longest-prefix match over network hierarchy CIDRs"""
+
+    def __init__(self, networks: Iterable[Dict[str, Any]]):
+        # Per IP version: sorted range starts, range ends and the owning network
+        self._ranges: Dict[int, Tuple[List[int], List[int], List[Dict[str, Any]]]] = {}
+        self.size = 0
+        by_version: Dict[int, List[Tuple[int, int, Dict[str, Any]]]] = {4: [], 6: []}
+        for network in networks:
+            try:
+                cidr = ipaddress.ip_network(str(network.get("cidr", "")).strip(), strict=False)
+            except ValueError:
+                continue
+            summary = {key: network.get(key) for key in NETWORK_FIELDS}
+            by_version[cidr.version].append(
+                (int(cidr.network_address), int(cidr.broadcast_address), summary)
+            )
+            self.size += 1
+        for version, intervals in by_version.items():
+            self._ranges[version] = self._flatten(intervals)
+        # IPv4 ranges as arrays for vectorized lookups (IPv6 does not fit in int64)
+        self._v4_arrays = None
+        if np is not None:
+            starts, ends, _ = self._ranges[4]
+            self._v4_arrays = (np.array(starts, dtype=np.int64), np.array(ends, dtype=np.int64))
+
+    @staticmethod
+    def _flatten(
+        intervals: List[Tuple[int, int, Dict[str, Any]]]
+    ) -> Tuple[List[int], List[int], List[Dict[str, Any]]]:
+        """
+        Turn nested CIDR ranges into disjoint ranges owned by the innermost network
+
+        CIDRs either nest or are disjoint, so a sweep in start order with a stack
+        of enclosing ranges gives every address its most specific network.
+        """
+        starts: List[int] = []
+        ends: List[int] = []
+        owners: List[Dict[str, Any]] = []
+
+        def emit(start: int, end: int, owner: Dict[str, Any]) -> None:
+            if start <= end:
+                starts.append(start)
+                ends.append(end)
+                owners.append(owner)
+
+        stack: List[Tuple[int, int, Dict[str, Any]]] = []
+        position = 0
+        for start, end, network in sorted(intervals, key=lambda r: (r[0], -r[1])):
+            while stack and stack[-1][1] < start:
+                _, top_end, top = stack.pop()
+                emit(position, top_end, top)
+                position = top_end + 1
+            if stack:
+                emit(position, start - 1, stack[-1][2])
+            stack.append((start, end, network))
+            position = start
+        while stack:
+            _, top_end, top = stack.pop()
+            emit(position, top_end, top)
+            position = top_end + 1
+        return starts, ends, owners
+
+    def lookup(self, ip: IPAddress) -> Optional[Dict[str, Any]]:
+        """Most specific network containing ip, or None"""
+        return self._find(ip.version, int(ip))
+
+    def _find(self, version: int, value: int) -> Optional[Dict[str, Any]]:
+        starts, ends, owners = self._ranges[version]
+        i = bisect_right(starts, value) - 1
+        if i >= 0 and value <= ends[i]:
+            return owners[i]
+        return None
+
+    def classify(self, values: Sequence[Any]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Most specific network for each of many IP strings
+
+        Each distinct value is parsed once; IPv4 addresses are matched together
+        with NumPy when it is available.
+
+        Args:
+            values: IP address strings (invalid or empty values map to None)
+
+        Returns:
+            Network or None per value, in order
+        """
+        found: Dict[Any, Optional[Dict[str, Any]]] = {}
+        v4_values: List[Any] = []
+        v4_ints: List[int] = []
+        for value in dict.fromkeys(values):
+            parsed = ip_to_int(value) if value else None
+            if parsed is None:
+                found[value] = None
+            elif parsed[0] == 4 and self._v4_arrays is not None:
+                v4_values.append(value)
+                v4_ints.append(parsed[1])
+            else:
+                found[value] = self._find(*parsed)
+
+        if v4_ints:
+            starts, ends = self._v4_arrays
+            owners = self._ranges[4][2]
+            ints = np.array(v4_ints, dtype=np.int64)
+            positions = np.searchsorted(starts, ints, side="right") - 1
+            inside = positions >= 0
+            inside[inside] &= ints[inside] <= ends[positions[inside]]
+            for value, position, hit in zip(v4_values, positions.tolist(), inside.tolist()):
+                found[value] = owners[position] if hit else None
+        return list(map(found.__getitem__, values))
+
+    def classify_rows(
+        self,
+        rows: List[Dict[str, Any]],
+        fields: Sequence[str] = DEFAULT_IP_FIELDS
+    ) -> List[str]:
+        """
+        Tag IP columns of search result rows with their network, in place
+
+        For each IP column present, adds ``<field>_network`` (network name),
+        ``<field>_network_group`` and ``<field>_local`` (whether the IP is in
+        the network hierarchy).
+
+        Args:
+            rows: Event or flow rows from an Ariel search
+            fields: IP columns to classify (those missing from the rows are skipped)
+
+        Returns:
+            Columns that were classified
+        """
+        present = [f for f in fields if rows and f in rows[0]]
+        # One classify call for all columns: source and destination IPs repeat across both
+        networks = self.classify([row.get(f) for f in present for row in rows])
+        for column, field in enumerate(present):
+            name_key, group_key, local_key = (
+                f"{field}_network", f"{field}_network_group", f"{field}_local"
+            )
+            offset = column * len(rows)
+            for row, network in zip(rows, networks[offset:offset + len(rows)]):
+                if network is None:
+                    row[name_key] = None
+                    row[group_key] = None
+                    row[local_key] = False
+                else:
+                    row[name_key] = network["name"]
+                    row[group_key] = network["group"]
+                    row[local_key] = True
+        return present
+
+
+class AssetIndex:
+    """Map of interface IP -> assets"""
+
+    def __init__(self, assets: Iterable[Dict[str, Any]]):
+        self.assets: Dict[Any, Dict[str, Any]] = {}
+        self._by_ip: Dict[str, List[Any]] = {}
+        for asset in assets:
+            asset_id = asset.get("id")
+            properties = {p.get("name"): p.get("value") for p in asset.get("properties") or []}
+            self.assets[asset_id] = {
+                "id": asset_id,
+                "name": next(
+                    (properties[n] for n in ASSET_NAME_PROPERTIES if properties.get(n)), None
+                ),
+                "domain_id": asset.get("domain_id"),
+                "risk_score_sum": asset.get("risk_score_sum"),
+            }
+            for interface in asset.get("interfaces") or []:
+                for address in interface.get("ip_addresses") or []:
+                    ip = parse_ip(address.get("value"))
+                    if ip is not None:
+                        owners = self._by_ip.setdefault(str(ip), [])
+                        if asset_id not in owners:
+                            owners.append(asset_id)
+
+    @property
+    def size(self) -> int:
+        return len(self._by_ip)
+
+    def lookup(self, ip: IPAddress) -> List[Dict[str, Any]]:
+        """Assets with an interface on ip"""
+        return [self.assets[a] for a in self._by_ip.get(str(ip), ())]
+
+
+class _Refreshing:
+    """A value built on first use and rebuilt in the background once it is too old"""
+
+    def __init__(self, name: str, build: Callable[[], Any], refresh_seconds: float):
+        self.name = name
+        self.build = build
+        self.refresh_seconds = refresh_seconds
+        self._value: Any = None
+        self._built_at = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    def get(self) -> Tuple[Any, float]:
+        """The current value and its age in seconds"""
+        with self._lock:
+            value, built_at = self._value, self._built_at
+            stale = value is not None and time.monotonic() - built_at >= self.refresh_seconds
+            if stale and not self._refreshing:
+                self._refreshing = True
+                threading.Thread(
+                    target=self._rebuild, name=f"qradar-index-{self.name}", daemon=True
+                ).start()
+        if value is None:
+            # First use: build in the caller, once, however many callers are waiting
+            with self._build_lock:
+                with self._lock:
+                    value, built_at = self._value, self._built_at
+                if value is None:
+                    value = self._run_build()
+                    built_at = time.monotonic()
+                    with self._lock:
+                        self._value, self._built_at = value, built_at
+        return value, time.monotonic() - built_at
+
+    def _run_build(self) -> Any:
+        start = time.perf_counter()
+        with tracing.span("build_ip_index", index=self.name) as span:
+            value = self.build()
+            span.set_attribute("entries", value.size)
+        logger.info(
+            f"Built {self.name} index with {value.size} entries "
+            f"in {time.perf_counter() - start:.2f}s"
+        )
+        return value
+
+    def _rebuild(self) -> None:
+        try:
+            value = self._run_build()
+            with self._lock:
+                self._value, self._built_at = value, time.monotonic()
+        except Exception as e:
+            logger.warning(f"Failed to rebuild {self.name} index: {str(e)}")
+            with self._lock:
+                # Keep serving the old index; try again in a minute
+                self._built_at = time.monotonic() - self.refresh_seconds + RETRY_SECONDS
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+
+class IPIndex:
+    """Network and asset indexes for a QRadarClient"""
+
+    def __init__(self, client: Any, refresh_seconds: float = 900.0, page_size: int = 2000):
+        self.client = client
+        self.page_size = page_size
+        self._networks = _Refreshing("networks", self._build_networks, refresh_seconds)
+        self._assets = _Refreshing("assets", self._build_assets, refresh_seconds)
+
+    def _build_networks(self) -> NetworkIndex:
+        return NetworkIndex(self.client.get_network_hierarchy())
+
+    def _build_assets(self) -> AssetIndex:
+        assets: List[Dict[str, Any]] = []
+        while True:
+            page = self.client.get_assets(
+                fields=ASSET_FIELDS,
+                range_header=f"{len(assets)}-{len(assets) + self.page_size - 1}"
+            )
+            assets.extend(page)
+            if len(page) < self.page_size:
+                return AssetIndex(assets)
+
+    @staticmethod
+    def _lookup(
+        index: Any,
+        age: float,
+        ips: List[str],
+        find: Callable[[IPAddress], Any]
+    ) -> Dict[str, Any]:
+        results: Dict[str, Any] = {}
+        invalid: List[str] = []
+        for value in ips:
+            ip = parse_ip(value)
+            if ip is None:
+                invalid.append(value)
+            else:
+                results[value] = find(ip)
+        return {
+            "results": results,
+            "invalid": invalid,
+            "index_entries": index.size,
+            "index_age_seconds": round(age, 1),
+        }
+
+    def lookup_networks(self, ips: List[str]) -> Dict[str, Any]:
+        """
+        Find the most specific network hierarchy entry for each IP
+
+        Args:
+            ips: IPv4/IPv6 addresses
+
+        Returns:
+            {"results": {ip: network or None}, "invalid": [...], index size and age}
+        """
+        index, age = self._networks.get()
+        return self._lookup(index, age, ips, index.lookup)
+
+    def classify_rows(
+        self,
+        rows: List[Dict[str, Any]],
+        fields: Sequence[str] = DEFAULT_IP_FIELDS
+    ) -> List[str]:
+        """Tag IP columns of search result rows with their network (see NetworkIndex)"""
+        index, _ = self._networks.get()
+        with tracing.span("classify_ips", rows=len(rows)):
+            return index.classify_rows(rows, fields)
+
+    def lookup_assets(self, ips: List[str]) -> Dict[str, Any]:
+        """
+        Find the assets that own each IP
+
+        Args:
+            ips: IPv4/IPv6 addresses
+
+        Returns:
+            {"results": {ip: [asset]}, "invalid": [...], index size and age}
+        """
+        index, age = self._assets.get()
+        return self._lookup(index, age, ips, index.lookup)
+
+
+def settings_from_env() -> Dict[str, Any]:
+    """Read QRADAR_IP_INDEX_REFRESH into QRadarClient keyword arguments"""
+    return {
+        "ip_index_refresh": float(os.getenv("QRADAR_IP_INDEX_REFRESH", "900")),
+    }
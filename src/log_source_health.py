@@ -0,0 +1,352 @@
+"""Log source health table with stale-source detection
+
+"Which log sources went quiet?" used to mean downloading every log source
+with all of its protocol parameters and sorting through them. This module
+keeps a compact local table instead (ID, name, type, domain, enabled,
+status, last event time, EPS) and answers from memory:
+
+- the table is downloaded once in pages with only those fields, then kept
+  current by fetching only sources whose ``last_event_time`` or
+  ``modified_date`` is at or after the newest one already in the table,
+  less a safety margin (the last sync's duration plus the refresh
+  interval) so that a value QRadar wrote late, or behind a page already
+  read, is still picked up. Sources that stopped sending are exactly the
+  ones a delta does not return, so their last event time stays put;
+- every refresh sorts the sources by last event time, overall and per type
+  and per domain, so "quiet for at least N hours" is a bisect of the
+  matching list (stalest first) rather than a scan.
+
+Deltas cannot see deleted sources, so the table is downloaded again at
+least every ``QRADAR_LOG_SOURCE_FULL_REFRESH`` seconds. Quiet time is
+measured from the newest event any source reported, so the server's clock
+does not need to agree with the console's; results also say how old that
+newest event is by the local clock, which exposes a console that stopped
+receiving anything at all.
+
+The table is built on first use and refreshed in the background once it is
+older than the refresh interval; queries keep using the previous table while
+that happens.
+
+    QRADAR_LOG_SOURCE_REFRESH        Seconds between delta syncs (default: 60)
+    QRADAR_LOG_SOURCE_FULL_REFRESH   Seconds between full downloads (default: 3600)
+
+Author: Ram Krishna Katakwar
+Version: 0.2.0
+License: MIT
+"""
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from . import tracing
+
+logger = logging.getLogger("qradar-mcp.log_source_health")
+
+# Log source fields kept in the table
+LOG_SOURCE_FIELDS = (
+    "id,name,type_id,enabled,status(status),last_event_time,modified_date,domain_id,average_eps"
+)
+# Wait before retrying a refresh that failed
+RETRY_SECONDS = 30.0
+
+HOUR_MS = 3600 * 1000
+
+# (type_id, domain_id) of a group of sources, None meaning any
+GroupKey = Tuple[Optional[int], Optional[int]]
+# Sorted (last event times, source IDs) of one group of sources
+Group = Tuple[List[int], List[int]]
+
+
+def compact(source: Dict[str, Any]) -> Dict[str, Any]:
+    """The table entry for a log source as returned by the API"""
+    status = source.get("status")
+    return {
+        "id": source.get("id"),
+        "name": source.get("name"),
+        "type_id": source.get("type_id"),
+        "domain_id": source.get("domain_id"),
+        "enabled": source.get("enabled", True),
+        "status": status.get("status") if isinstance(status, dict) else status,
+        "last_event_time": source.get("last_event_time") or 0,
+        "modified_date": source.get("modified_date") or 0,
+        "average_eps": source.get("average_eps"),
+    }
+
+
+class HealthTable:
+    """Immutable snapshot of the log source table with precomputed rankings"""
+
+    def __init__(self, records: Dict[int, Dict[str, Any]], type_names: Dict[int, str]):
+        self.records = records
+        self.type_names = type_names
+        self.newest_event = max((r["last_event_time"] for r in records.values()), default=0)
+        self.newest_modified = max((r["modified_date"] for r in records.values()), default=0)
+        self.type_ids = sorted({r["type_id"] for r in records.values()}, key=str)
+        self.domain_ids = sorted({r["domain_id"] for r in records.values()}, key=str)
+
+        ordered = sorted(records.values(), key=lambda r: (r["last_event_time"], r["id"]))
+        # Disabled sources are quiet by design; keep them out unless asked for
+        self._groups: Dict[bool, Dict[GroupKey, Group]] = {True: {}, False: {}}
+        for record in ordered:
+            type_id, domain_id = record["type_id"], record["domain_id"]
+            keys = ((None, None), (type_id, None), (None, domain_id), (type_id, domain_id))
+            for include_disabled in ((True, False) if record["enabled"] else (True,)):
+                for key in keys:
+                    times, ids = self._groups[include_disabled].setdefault(key, ([], []))
+                    times.append(record["last_event_time"])
+                    ids.append(record["id"])
+
+    @property
+    def size(self) -> int:
+        return len(self.records)
+
+    def _quiet_range(
+        self,
+        key: GroupKey,
+        include_disabled: bool,
+        quiet_for_ms: int,
+        within_ms: Optional[int]
+    ) -> Tuple[List[int], int, int]:
+        """A group's source IDs and the slice of them that is quiet"""
+        times, ids = self._groups[include_disabled].get(key, ([], []))
+        hi = bisect_right(times, self.newest_event - quiet_for_ms)
+        lo = bisect_left(times, self.newest_event - within_ms) if within_ms is not None else 0
+        return ids, lo, max(lo, hi)
+
+    def quiet(
+        self,
+        quiet_for_ms: int,
+        within_ms: Optional[int] = None,
+        type_id: Optional[int] = None,
+        domain_id: Optional[int] = None,
+        include_disabled: bool = False
+    ) -> Tuple[List[int], int]:
+        """
+        IDs of sources whose last event is at least quiet_for_ms before the newest
+        one (and at most within_ms before it, if given), stalest first
+
+        Returns:
+            (source IDs, sources considered)
+        """
+        ids, lo, hi = self._quiet_range(
+            (type_id, domain_id), include_disabled, quiet_for_ms, within_ms
+        )
+        return ids[lo:hi], len(ids)
+
+    def ranking(
+        self,
+        group: str,
+        quiet_for_ms: int,
+        within_ms: Optional[int] = None,
+        type_id: Optional[int] = None,
+        domain_id: Optional[int] = None,
+        include_disabled: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Quiet source counts per "type" or "domain", most quiet first"""
+        ranked = []
+        for value in (self.type_ids if group == "type" else self.domain_ids):
+            if group == "type":
+                if type_id is not None and value != type_id:
+                    continue
+                key = (value, domain_id)
+            else:
+                if domain_id is not None and value != domain_id:
+                    continue
+                key = (type_id, value)
+            ids, lo, hi = self._quiet_range(key, include_disabled, quiet_for_ms, within_ms)
+            if hi > lo:
+                entry = {f"{group}_id": value, "quiet": hi - lo, "total": len(ids)}
+                if group == "type":
+                    entry["type_name"] = self.type_names.get(value)
+                ranked.append(entry)
+        ranked.sort(key=lambda entry: -entry["quiet"])
+        return ranked
+
+    def describe(self, source_id: int) -> Dict[str, Any]:
+        record = self.records[source_id]
+        last = record["last_event_time"]
+        return {
+            **{k: v for k, v in record.items() if k != "modified_date"},
+            "type_name": self.type_names.get(record["type_id"]),
+            "quiet_hours": round((self.newest_event - last) / HOUR_MS, 1) if last else None,
+        }
+
+
+class LogSourceHealth:
+    """Log source health table for a QRadarClient"""
+
+    def __init__(
+        self,
+        client: Any,
+        refresh_seconds: float = 60.0,
+        full_refresh_seconds: float = 3600.0,
+        page_size: int = 1000
+    ):
+        self.client = client
+        self.refresh_seconds = refresh_seconds
+        self.full_refresh_seconds = full_refresh_seconds
+        self.page_size = page_size
+        self._table: Optional[HealthTable] = None
+        self._synced_at = 0.0
+        self._built_at = 0.0
+        self._sync_seconds = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    def _fetch(self, filter_query: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Compact log source entries, downloaded in pages"""
+        offset = 0
+        while True:
+            page = self.client.get_log_sources(
+                filter_query,
+                fields=LOG_SOURCE_FIELDS,
+                range_header=f"{offset}-{offset + self.page_size - 1}"
+            )
+            for source in page:
+                yield compact(source)
+            offset += len(page)
+            if len(page) < self.page_size:
+                return
+
+    def _type_names(self) -> Dict[int, str]:
+        try:
+            return {t.get("id"): t.get("name") for t in self.client.get_log_source_types()}
+        except Exception as e:
+            logger.warning(f"Could not read log source type names: {e}")
+            return self._table.type_names if self._table is not None else {}
+
+    def _sync(self) -> HealthTable:
+        """Bring the table up to date (a full download when due)"""
+        table = self._table
+        now = time.monotonic()
+        full = table is None or now - self._built_at >= self.full_refresh_seconds
+        start = time.perf_counter()
+        with tracing.span("log_sources.full_sync" if full else "log_sources.delta_sync") as span:
+            if full:
+                records = {r["id"]: r for r in self._fetch()}
+            else:
+                records = dict(table.records)
+                changed = 0
+                # Overlap with the previous sync; sources fetched twice are just replaced
+                margin = int((self._sync_seconds + self.refresh_seconds) * 1000)
+                for record in self._fetch(
+                    f"last_event_time >= {max(0, table.newest_event - margin)} "
+                    f"or modified_date >= {max(0, table.newest_modified - margin)}"
+                ):
+                    records[record["id"]] = record
+                    changed += 1
+                span.set_attribute("sources_changed", changed)
+            table = HealthTable(records, self._type_names())
+            span.set_attribute("sources", table.size)
+        with self._lock:
+            self._table = table
+            self._synced_at = now
+            self._sync_seconds = time.perf_counter() - start
+            if full:
+                self._built_at = now
+        if full:
+            logger.info(
+                f"Built log source health table with {table.size} sources "
+                f"in {time.perf_counter() - start:.2f}s"
+            )
+        return table
+
+    def _refresh(self) -> None:
+        try:
+            self._sync()
+        except Exception as e:
+            logger.warning(f"Log source health refresh failed, keeping previous table: {e}")
+            with self._lock:
+                # Try again after RETRY_SECONDS rather than on every query
+                self._synced_at = time.monotonic() - self.refresh_seconds + RETRY_SECONDS
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def table(self) -> Tuple[HealthTable, float]:
+        """The current table and seconds since it was last synced"""
+        with self._lock:
+            table, synced_at = self._table, self._synced_at
+            stale = table is not None and time.monotonic() - synced_at >= self.refresh_seconds
+            if stale and not self._refreshing:
+                self._refreshing = True
+                threading.Thread(
+                    target=self._refresh, name="qradar-log-source-health", daemon=True
+                ).start()
+        if table is None:
+            # First use: build in the caller, once, however many callers are waiting
+            with self._build_lock:
+                table = self._table
+                if table is None:
+                    table = self._sync()
+            synced_at = self._synced_at
+        return table, time.monotonic() - synced_at
+
+    def quiet_sources(
+        self,
+        quiet_for_hours: float = 1.0,
+        within_hours: Optional[float] = None,
+        type_id: Optional[int] = None,
+        domain_id: Optional[int] = None,
+        include_disabled: bool = False,
+        limit: int = 100
+    ) -> Dict[str, Any]:
+        """
+        Find log sources that have not sent events for a while
+
+        Args:
+            quiet_for_hours: Minimum time since a source's last event
+            within_hours: Only sources whose last event is at most this old
+                (i.e. that went quiet recently; default: no limit)
+            type_id: Only sources of this log source type
+            domain_id: Only sources in this domain
+            include_disabled: Also consider disabled sources
+            limit: Most sources listed (counts and rankings cover all of them)
+
+        Returns:
+            Quiet sources (stalest first) with counts per type and domain,
+            and the age of the table
+        """
+        if quiet_for_hours < 0:
+            raise ValueError("quiet_for_hours must not be negative")
+        if within_hours is not None and within_hours < quiet_for_hours:
+            raise ValueError("within_hours must be at least quiet_for_hours")
+
+        table, age = self.table()
+        start = time.perf_counter()
+        window = (
+            int(quiet_for_hours * HOUR_MS),
+            int(within_hours * HOUR_MS) if within_hours is not None else None,
+            type_id,
+            domain_id,
+            include_disabled
+        )
+        ids, considered = table.quiet(*window)
+        return {
+            "quiet_for_hours": quiet_for_hours,
+            "within_hours": within_hours,
+            "reference_time": table.newest_event,
+            "newest_event_age_seconds": (
+                round(time.time() - table.newest_event / 1000, 1) if table.newest_event else None
+            ),
+            "sources_considered": considered,
+            "quiet_count": len(ids),
+            "sources": [table.describe(i) for i in ids[:max(0, limit)]],
+            "by_type": table.ranking("type", *window),
+            "by_domain": table.ranking("domain", *window),
+            "table_sources": table.size,
+            "table_age_seconds": round(age, 1),
+            "query_ms": round((time.perf_counter() - start) * 1000, 2),
+        }
+
+
+def settings_from_env() -> Dict[str, Any]:
+    """Read QRADAR_LOG_SOURCE_* into QRadarClient keyword arguments"""
+    return {
+        "log_source_refresh": float(os.getenv("QRADAR_LOG_SOURCE_REFRESH", "60")),
+        "log_source_full_refresh": float(os.getenv("QRADAR_LOG_SOURCE_FULL_REFRESH", "3600")),
+    }
@@ -0,0 +1,413 @@
+"""In-process metrics for the IBM QRadar MCP server
+
+Counters and histograms are kept in memory and rendered in the Prometheus
+text exposition format, either through the ``qradar_server_metrics`` tool or
+an optional local HTTP endpoint (``QRADAR_METRICS_PORT``).
+
+Author: Ram Krishna Katakwar
+Version: 0.2.0
+License: MIT
+"""
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from a cached lookup up to a long Ariel search
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0
+)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonically increasing counter with labels"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def samples(self) -> Dict[LabelValues, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> List[str]:
+        lines = []
+        for key, value in sorted(self.samples().items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    """Value that can go up and down, such as a current limit"""
+
+    type_name = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels"""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # label values -> [bucket counts..., sum, count]
+        self._values: Dict[LabelValues, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def samples(self) -> Dict[LabelValues, List[float]]:
+        with self._lock:
+            return {k: list(v) for k, v in self._values.items()}
+
+    def quantile(self, q: float, **labels: str) -> Optional[float]:
+        """
+        Estimate a quantile from the buckets (same interpolation as histogram_quantile)
+
+        Args:
+            q: Quantile between 0 and 1
+            labels: Label values identifying the series
+
+        Returns:
+            Estimated value in seconds, or None if nothing was observed
+        """
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            series = self._values.get(key)
+            if not series or not series[-1]:
+                return None
+            counts = series[:len(self.buckets)]
+            total = series[-1]
+        rank = q * total
+        cumulative = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets, counts):
+            if cumulative + count >= rank and count:
+                if bound == float("inf"):
+                    return lower
+                return lower + (bound - lower) * (rank - cumulative) / count
+            cumulative += count
+            lower = bound if bound != float("inf") else lower
+        return lower
+
+    def render(self) -> List[str]:
+        lines = []
+        for key, series in sorted(self.samples().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+                )
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format (0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> Dict[str, Dict]:
+        """
+        Compact JSON-friendly view of all metrics
+
+        Returns:
+            Metric name -> series label string -> value (counters/gauges) or
+            count/sum/mean/p50/p95 (histograms)
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        result: Dict[str, Dict] = {}
+        for metric in metrics:
+            series = {}
+            for key, value in sorted(metric.samples().items()):
+                label = ",".join(f"{n}={v}" for n, v in zip(metric.labelnames, key)) or "total"
+                if isinstance(metric, Histogram):
+                    labels = dict(zip(metric.labelnames, key))
+                    count = value[-1]
+                    series[label] = {
+                        "count": count,
+                        "sum_seconds": round(value[-2], 6),
+                        "mean_seconds": round(value[-2] / count, 6) if count else None,
+                        "p50_seconds": _round(metric.quantile(0.5, **labels)),
+                        "p95_seconds": _round(metric.quantile(0.95, **labels)),
+                    }
+                else:
+                    series[label] = value
+            if series:
+                result[metric.name] = series
+        return result
+
+
+def cache_hit_ratios() -> Dict[str, float]:
+    """
+    Hit ratio per cache from qradar_cache_requests_total
+
+    Returns:
+        Cache name -> hits / (hits + misses)
+    """
+    totals: Dict[str, List[float]] = {}
+    for (cache, result), value in CACHE_REQUESTS.samples().items():
+        counts = totals.setdefault(cache, [0, 0])
+        counts[0 if result in ("hit", "revalidated") else 1] += value
+    return {
+        cache: round(hits / (hits + misses), 4)
+        for cache, (hits, misses) in totals.items()
+        if hits + misses
+    }
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 6) if value is not None else None
+
+
+REGISTRY = MetricsRegistry()
+
+# ==================== Metric Definitions ====================
+
+TOOL_LATENCY = REGISTRY.histogram(
+    "qradar_mcp_tool_duration_seconds",
+    "Time spent handling an MCP tool call",
+    ["tool", "status"],
+)
+HTTP_LATENCY = REGISTRY.histogram(
+    "qradar_api_request_duration_seconds",
+    "QRadar REST API request latency by endpoint template",
+    ["method", "endpoint"],
+)
+HTTP_ERRORS = REGISTRY.counter(
+    "qradar_api_errors_total",
+    "Failed QRadar REST API requests by status code",
+    ["method", "endpoint", "status_code"],
+)
+HTTP_HEDGES = REGISTRY.counter(
+    "qradar_api_hedges_total",
+    "Hedged GETs by result (sent, won, budget_exhausted)",
+    ["endpoint", "result"],
+)
+HTTP_BYTES_SENT = REGISTRY.counter(
+    "qradar_api_bytes_sent_total",
+    "Request body bytes sent to QRadar",
+    ["endpoint"],
+)
+HTTP_BYTES_RECEIVED = REGISTRY.counter(
+    "qradar_api_bytes_received_total",
+    "Response body bytes received from QRadar",
+    ["endpoint"],
+)
+ARIEL_PHASE = REGISTRY.histogram(
+    "qradar_ariel_search_phase_seconds",
+    "Ariel search time by phase (queue, run, poll, fetch)",
+    ["database", "phase"],
+)
+ARIEL_POLLS = REGISTRY.counter(
+    "qradar_ariel_status_polls_total",
+    "Ariel search status polls issued",
+    ["database"],
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    "qradar_cache_requests_total",
+    "Cache lookups by cache and result (hit, revalidated or miss)",
+    ["cache", "result"],
+)
+CIRCUIT_STATE = REGISTRY.gauge(
+    "qradar_circuit_state",
+    "Circuit breaker state per endpoint (0 closed, 1 half-open, 2 open)",
+    ["endpoint"],
+)
+CIRCUIT_REJECTED = REGISTRY.counter(
+    "qradar_circuit_rejected_total",
+    "Requests failed fast because their circuit was open",
+    ["endpoint"],
+)
+STALE_SERVED = REGISTRY.counter(
+    "qradar_stale_results_total",
+    "Last-good results served because QRadar could not answer",
+    ["endpoint"],
+)
+RATE_LIMIT_CONCURRENCY = REGISTRY.gauge(
+    "qradar_ratelimit_concurrency_limit",
+    "Current adaptive concurrency limit per endpoint class",
+    ["endpoint_class"],
+)
+RATE_LIMIT_IN_FLIGHT = REGISTRY.gauge(
+    "qradar_ratelimit_in_flight",
+    "QRadar requests currently in flight per endpoint class",
+    ["endpoint_class"],
+)
+RATE_LIMIT_WAIT = REGISTRY.histogram(
+    "qradar_ratelimit_wait_seconds",
+    "Time requests waited for a concurrency slot or rate token",
+    ["endpoint_class"],
+)
+RATE_LIMIT_THROTTLED = REGISTRY.counter(
+    "qradar_ratelimit_throttled_total",
+    "Requests the console pushed back on (status_429, status_503, timeout)",
+    ["endpoint_class", "reason"],
+)
+
+# ==================== Endpoint Templates ====================
+
+_TEMPLATE_RULES = [
+    (re.compile(r"^/reference_data/(sets|maps|map_of_sets|tables)/bulk_load/[^/]+"),
+     r"/reference_data/\1/bulk_load/{name}"),
+    (re.compile(r"^/reference_data/(sets|maps|map_of_sets|tables)/(?!bulk_load)[^/]+"),
+     r"/reference_data/\1/{name}"),
+    (re.compile(r"^/ariel/databases/[^/]+"), "/ariel/databases/{name}"),
+    (re.compile(r"^/ariel/searches/[^/]+"), "/ariel/searches/{search_id}"),
+    (re.compile(r"/\d+(?=/|$)"), "/{id}"),
+]
+
+
+def endpoint_template(endpoint: str) -> str:
+    """
+    Collapse IDs and names in an API path so metrics stay low-cardinality
+
+    Args:
+        endpoint: API endpoint path (e.g. "/siem/offenses/42/notes")
+
+    Returns:
+        Endpoint template (e.g. "/siem/offenses/{id}/notes")
+    """
+    template = "/" + endpoint.split("?", 1)[0].strip("/")
+    for pattern, replacement in _TEMPLATE_RULES:
+        template = pattern.sub(replacement, template)
+    return template
+
+
+# ==================== HTTP Exposition ====================
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Keep scrapes out of the MCP server log
+        pass
+
+
+def start_http_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    Serve /metrics on a local port from a daemon thread
+
+    Args:
+        port: TCP port to listen on
+        host: Interface to bind (loopback by default)
+
+    Returns:
+        The running HTTP server
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(
+        target=server.serve_forever, name="qradar-metrics", daemon=True
+    )
+    thread.start()
+    return server
@@ -0,0 +1,203 @@
+"""On-demand profiling of individual tool calls
+
+Selected tool invocations can be wrapped in ``cProfile`` (CPU) and/or
+``tracemalloc`` (memory). Dumps are written to a directory and tagged with
+the tool name and a hash of its arguments so repeated calls are easy to line
+up.
+
+Profiling is switched on per tool through the environment:
+
+    QRADAR_PROFILE_TOOLS   Comma-separated tool names, or * for all tools
+    QRADAR_PROFILE_MODE    cpu, memory or cpu,memory (default: cpu)
+    QRADAR_PROFILE_DIR     Output directory (default: <tmp>/qradar-mcp-profiles)
+
+or per call by passing ``"_profile": true`` (or ``"cpu"``, ``"memory"``,
+``"cpu,memory"``) in the tool arguments. When neither is set the only cost
+is a set lookup.
+
+``cProfile`` and ``tracemalloc`` are process-wide, so only one call is
+profiled at a time; a call that would overlap it runs unprofiled and the
+skip is logged.
+
+Author: Ram Krishna Katakwar
+Version: 0.2.0
+License: MIT
+"""
+import cProfile
+import hashlib
+import io
+import json
+import logging
+import os
+import pstats
+import tempfile
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, FrozenSet, Optional
+
+logger = logging.getLogger("qradar-mcp.profiling")
+
+PROFILE_ARGUMENT = "_profile"
+VALID_MODES = frozenset({"cpu", "memory"})
+
+# Held while a call is being profiled; profilers cannot overlap
+_profiling_lock = threading.Lock()
+
+
+def _parse_modes(value: Any, default: FrozenSet[str]) -> FrozenSet[str]:
+    if value is True or value == "true":
+        return default
+    if not value:
+        return frozenset()
+    modes = frozenset(m.strip().lower() for m in str(value).split(",") if m.strip())
+    unknown = modes - VALID_MODES
+    if unknown:
+        raise ValueError(f"Unknown profile mode(s): {', '.join(sorted(unknown))}")
+    return modes
+
+
+class Profiler:
+    """Decides which calls to profile and writes their dumps"""
+
+    def __init__(
+        self,
+        tools: Optional[FrozenSet[str]] = None,
+        modes: FrozenSet[str] = frozenset({"cpu"}),
+        output_dir: Optional[str] = None,
+        top_n: int = 30
+    ):
+        self.tools = tools or frozenset()
+        self.all_tools = "*" in self.tools
+        self.modes = modes
+        self.output_dir = output_dir or os.path.join(tempfile.gettempdir(), "qradar-mcp-profiles")
+        self.top_n = top_n
+
+    def modes_for(self, name: str, arguments: Dict[str, Any]) -> FrozenSet[str]:
+        """Profiling modes to apply to this call (empty when not profiled)"""
+        if PROFILE_ARGUMENT in arguments:
+            return _parse_modes(arguments[PROFILE_ARGUMENT], self.modes)
+        if self.all_tools or name in self.tools:
+            return self.modes
+        return frozenset()
+
+    def run(
+        self,
+        name: str,
+        arguments: Dict[str, Any],
+        func: Callable[[str, Dict[str, Any]], Any]
+    ) -> Any:
+        """
+        Call func(name, arguments), profiling it if enabled for this call
+
+        Args:
+            name: Tool name
+            arguments: Tool arguments (the _profile switch is removed before the call)
+            func: Tool implementation
+
+        Returns:
+            Whatever func returns
+        """
+        modes = self.modes_for(name, arguments)
+        if PROFILE_ARGUMENT in arguments:
+            arguments = {k: v for k, v in arguments.items() if k != PROFILE_ARGUMENT}
+        if not modes:
+            return func(name, arguments)
+        if not _profiling_lock.acquire(blocking=False):
+            logger.info(f"Profile of {name} skipped: another call is being profiled")
+            return func(name, arguments)
+        try:
+            return self._profile(name, arguments, func, modes)
+        finally:
+            _profiling_lock.release()
+
+    def _profile(
+        self,
+        name: str,
+        arguments: Dict[str, Any],
+        func: Callable[[str, Dict[str, Any]], Any],
+        modes: FrozenSet[str]
+    ) -> Any:
+        tag = self._tag(name, arguments)
+        started_tracemalloc = False
+        if "memory" in modes and not tracemalloc.is_tracing():
+            tracemalloc.start(25)
+            started_tracemalloc = True
+        if "memory" in modes:
+            tracemalloc.reset_peak()
+        profile = cProfile.Profile() if "cpu" in modes else None
+
+        start = time.perf_counter()
+        try:
+            if profile is not None:
+                return profile.runcall(func, name, arguments)
+            return func(name, arguments)
+        finally:
+            elapsed = time.perf_counter() - start
+            try:
+                os.makedirs(self.output_dir, exist_ok=True)
+                if profile is not None:
+                    self._write_cpu(tag, profile, elapsed)
+                if "memory" in modes:
+                    self._write_memory(tag, elapsed)
+            except Exception as e:
+                logger.warning(f"Failed to write profile for {name}: {str(e)}")
+            finally:
+                if started_tracemalloc:
+                    tracemalloc.stop()
+
+    def _tag(self, name: str, arguments: Dict[str, Any]) -> str:
+        digest = hashlib.sha1(
+            json.dumps(arguments, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()[:10]
+        return f"{time.strftime('%Y%m%d-%H%M%S')}-{name}-{digest}"
+
+    def _write_cpu(self, tag: str, profile: cProfile.Profile, elapsed: float) -> None:
+        base = os.path.join(self.output_dir, tag)
+        profile.dump_stats(f"{base}.pstats")
+
+        text = io.StringIO()
+        text.write(f"# {tag} wall time {elapsed * 1000:.1f} ms\n")
+        stats = pstats.Stats(profile, stream=text)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top_n)
+        with open(f"{base}.cpu.txt", "w", encoding="utf-8") as f:
+            f.write(text.getvalue())
+        logger.info(f"CPU profile written to {base}.pstats")
+
+    def _write_memory(self, tag: str, elapsed: float) -> None:
+        base = os.path.join(self.output_dir, tag)
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+
+        lines = [
+            f"# {tag} wall time {elapsed * 1000:.1f} ms",
+            f"# traced memory: current {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB",
+            "",
+        ]
+        for stat in snapshot.statistics("lineno")[:self.top_n]:
+            lines.append(str(stat))
+        with open(f"{base}.memory.txt", "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        logger.info(f"Memory profile written to {base}.memory.txt")
+
+
+_profiler = Profiler()
+
+
+def configure_from_env() -> Profiler:
+    """Configure the global profiler from QRADAR_PROFILE_* environment variables"""
+    global _profiler
+    tools = frozenset(
+        t.strip() for t in os.getenv("QRADAR_PROFILE_TOOLS", "").split(",") if t.strip()
+    )
+    _profiler = Profiler(
+        tools=tools,
+        modes=_parse_modes(os.getenv("QRADAR_PROFILE_MODE", "cpu"), frozenset({"cpu"})),
+        output_dir=os.getenv("QRADAR_PROFILE_DIR"),
+    )
+    return _profiler
+
+
+def run(name: str, arguments: Dict[str, Any], func: Callable[[str, Dict[str, Any]], Any]) -> Any:
+    """Call a tool implementation through the global profiler"""
+    return _profiler.run(name, arguments, func)
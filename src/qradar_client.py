@@ -4,40 +4,249 @@ Author: Ram Krishna Katakwar
 Version: 0.2.0
 License: MIT
 """
+import contextvars
+import ipaddress
 import json
 import time
-from typing import Dict, List, Optional, Any
+import threading
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterator, List, Optional, Any, Tuple
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+from . import (
+    bulk_load, cassette, circuit, disk_cache, hedging, ip_index, log_source_health, metrics,
+    ratelimit, refset_index, rule_graph, scheduler, tracing
+)
+
 
 class QRadarClient:
     """Client for interacting with IBM QRadar REST API"""
 
-    def __init__(self, host: str, api_token: str, verify_ssl: bool = True):
+    def __init__(
+        self,
+        host: str,
+        api_token: str,
+        verify_ssl: bool = True,
+        metadata_ttl: int = 300,
+        pool_maxsize: int = 32,
+        cassette_mode: Optional[str] = None,
+        cassette_path: str = cassette.DEFAULT_PATH,
+        cassette_latency_scale: float = 1.0,
+        rate_limit: Optional[float] = None,
+        rate_burst: Optional[float] = None,
+        initial_concurrency: int = 8,
+        max_concurrency: int = 32,
+        ariel_max_searches: int = 5,
+        timeout: float = 30.0,
+        endpoint_timeouts: Optional[Dict[str, float]] = None,
+        hedge_endpoints: Optional[List[str]] = None,
+        hedge_quantile: float = 0.95,
+        hedge_budget: float = 0.1,
+        hedge_min_delay: float = 0.05,
+        circuit_failure_ratio: float = 0.5,
+        circuit_min_requests: int = 5,
+        circuit_window: float = 30.0,
+        circuit_open_seconds: float = 15.0,
+        stale_max_age: float = 3600.0,
+        stale_max_entries: int = 128,
+        disk_cache_enabled: bool = False,
+        disk_cache_path: Optional[str] = None,
+        disk_cache_fresh_seconds: float = 300.0,
+        disk_cache_max_age: float = 3600.0,
+        disk_cache_max_mb: float = 256.0,
+        disk_cache_endpoints: Optional[List[str]] = None,
+        resolver_max_entries: int = 10000,
+        ip_index_refresh: float = 900.0,
+        log_source_refresh: float = 60.0,
+        log_source_full_refresh: float = 3600.0,
+        refset_refresh: float = 300.0,
+        refset_full_refresh: float = 86400.0,
+        refset_exact_max: int = 200000,
+        refset_false_positive_rate: float = 0.001,
+        bulk_chunk_size: int = 10000,
+        bulk_chunk_bytes: int = 1024 * 1024,
+        bulk_concurrency: int = 4,
+        bulk_retries: int = 3,
+        bulk_load_dir: Optional[str] = None,
+        rule_graph_refresh: float = 600.0,
+        rule_graph_concurrency: int = 4,
+        rule_graph_path: Optional[str] = None,
+        schedule_file: Optional[str] = None,
+        schedule_db: Optional[str] = None,
+        materialized_max_age: float = 900.0
+    ):
         """
         Initialize QRadar client
         
         Args:
-            host: QRadar console hostname or IP
+            host: QRadar console hostname or IP (may include a scheme,
+                e.g. "http://127.0.0.1:8080" for a local stand-in)
             api_token: API authentication token
             verify_ssl: Whether to verify SSL certificates
+            metadata_ttl: Seconds to keep slow-changing metadata in memory
+            pool_maxsize: Connections kept open to the console (one per concurrent call)
+            cassette_mode: "record" to save traffic to a cassette, "replay" to serve
+                requests from one without touching the network, None for neither
+            cassette_path: Cassette file (gzip-compressed JSON lines)
+            cassette_latency_scale: Multiplier for recorded latencies on replay
+            rate_limit: Requests per second across the client (None for no cap)
+            rate_burst: Token bucket size (default: one second of rate_limit)
+            initial_concurrency: Starting concurrency limit per endpoint class
+            max_concurrency: Upper bound the adaptive limit may grow to
+            ariel_max_searches: Ariel searches running at once (create to results)
+            timeout: Default request timeout in seconds
+            endpoint_timeouts: Timeouts by endpoint template ("/siem/offenses/{id}")
+                or endpoint class ("ariel")
+            hedge_endpoints: Endpoint templates whose GETs may be hedged ("*" for all)
+            hedge_quantile: Latency quantile after which a hedge is sent
+            hedge_budget: Max fraction of eligible requests that get a hedge
+            hedge_min_delay: Minimum seconds before hedging
+            circuit_failure_ratio: Failure ratio that opens an endpoint's circuit
+            circuit_min_requests: Requests in the window before a circuit can open
+            circuit_window: Rolling window for the failure ratio, in seconds
+            circuit_open_seconds: Time an open circuit fails fast before probing
+            stale_max_age: Oldest last-good result served while QRadar is failing
+            stale_max_entries: List results kept for stale fallback
+            disk_cache_enabled: Keep catalog GETs in a SQLite cache shared between processes
+            disk_cache_path: Cache database file
+            disk_cache_fresh_seconds: Serve cached catalogs without revalidating for this long
+            disk_cache_max_age: Download cached catalogs again after this many seconds
+            disk_cache_max_mb: Size cap for the cache database
+            disk_cache_endpoints: Endpoint templates to cache (default: catalogs)
+            resolver_max_entries: Resolved addresses, offense types and log sources kept (LRU)
+            ip_index_refresh: Seconds before the network and asset IP indexes are rebuilt
+            log_source_refresh: Seconds between delta syncs of the log source health table
+            log_source_full_refresh: Seconds between full downloads of that table
+            refset_refresh: Seconds between delta syncs of a reference set index
+            refset_full_refresh: Seconds between full downloads of a reference set
+            refset_exact_max: Largest reference set indexed exactly (larger: bloom filter)
+            refset_false_positive_rate: Bloom filter false-positive rate
+            bulk_chunk_size: Most values per reference set bulk_load request
+            bulk_chunk_bytes: Largest bulk_load request body in bytes
+            bulk_concurrency: Bulk load chunks in flight at once
+            bulk_retries: Retries of a bulk load chunk QRadar failed to take
+            bulk_load_dir: Directory bulk loads may read files from (None: files off)
+            rule_graph_refresh: Seconds between checks of the rule graph for changed rules
+            rule_graph_concurrency: Rule dependents tasks run at once while scanning
+            rule_graph_path: File the rule graph is saved to between restarts
+            schedule_file: JSON file of saved searches / AQL to run on a cron schedule
+            schedule_db: Database holding their latest results (shared between processes)
+            materialized_max_age: Oldest stored result execute_saved_search may serve
         """
         self.host = host.rstrip('/')
         self.api_token = api_token
         self.verify_ssl = verify_ssl
-        self.base_url = f"https://{self.host}/api"
+        if "://" in self.host:
+            self.base_url = f"{self.host}/api"
+        else:
+            self.base_url = f"https://{self.host}/api"
+        
+        # In-memory cache for metadata endpoints (system info, Ariel fields, ...)
+        self.metadata_ttl = metadata_ttl
+        self._metadata_cache: Dict[str, Tuple[float, Any]] = {}
+        self._metadata_lock = threading.Lock()
+        
+        # Objects referenced by ID from offenses, kept for metadata_ttl (LRU)
+        self.resolver_max_entries = resolver_max_entries
+        self._resolved: "OrderedDict[Tuple[str, int], Tuple[float, Any]]" = OrderedDict()
+        self._resolved_lock = threading.Lock()
+        
+        # Network hierarchy and asset interface IPs indexed locally, built on first lookup
+        self.ip_index = ip_index.IPIndex(self, ip_index_refresh)
+        
+        # Compact log source table for stale-source queries, synced by last event time
+        self.log_source_health = log_source_health.LogSourceHealth(
+            self, log_source_refresh, log_source_full_refresh
+        )
+        
+        # Reference set membership, downloaded on first check and then synced by last_seen
+        self.refset_index = refset_index.ReferenceSetIndex(
+            self, refset_refresh, refset_full_refresh, refset_exact_max, refset_false_positive_rate
+        )
+        
+        # Large value lists are pushed into reference sets in parallel chunks
+        self.bulk_loader = bulk_load.BulkLoader(
+            self, bulk_chunk_size, bulk_chunk_bytes, bulk_concurrency, bulk_retries, bulk_load_dir
+        )
+        
+        # Rule and building block dependencies, rescanned only when rules change
+        self.rule_graph = rule_graph.RuleGraphIndex(
+            self, rule_graph_refresh, rule_graph_concurrency, rule_graph_path
+        )
+        
+        # Scheduled searches whose latest results are served without querying QRadar
+        self.materialized_max_age = materialized_max_age
+        self.scheduler: Optional[scheduler.Scheduler] = None
+        if schedule_file:
+            self.scheduler = scheduler.create(
+                self, self.base_url, api_token, schedule_file, schedule_db
+            )
+        
+        # Fail fast per endpoint while QRadar is unhealthy, serving last-good list results
+        self.breakers = circuit.CircuitBreakers(
+            circuit_failure_ratio, circuit_min_requests, circuit_window, circuit_open_seconds
+        )
+        self.stale_max_age = stale_max_age
+        self.stale_max_entries = stale_max_entries
+        self._last_good: "OrderedDict[Tuple[str, str, str], Tuple[float, Any]]" = OrderedDict()
+        self._last_good_lock = threading.Lock()
+        
+        # Throttling (429/503) is retried by the rate limiter, which honors Retry-After
+        # and adapts concurrency; urllib3 only retries connection errors and 5xx
+        self.limiter = ratelimit.RateLimiter(
+            rate=rate_limit,
+            burst=rate_burst,
+            initial_concurrency=initial_concurrency,
+            max_concurrency=max_concurrency
+        )
+        self.ariel_max_searches = max(1, ariel_max_searches)
+        self._ariel_slots = threading.BoundedSemaphore(self.ariel_max_searches)
+        
+        self.timeouts = hedging.TimeoutPolicy(timeout, endpoint_timeouts)
+        self.hedge_policy = hedging.HedgePolicy(
+            hedge_endpoints, hedge_quantile, hedge_budget, hedge_min_delay
+        )
+        self._pool_maxsize = pool_maxsize
+        self._pools: Dict[str, ThreadPoolExecutor] = {}
+        self._pools_lock = threading.Lock()
         
         # Configure session with retries
         self.session = requests.Session()
         retry_strategy = Retry(
             total=3,
             backoff_factor=1,
-            status_forcelist=[429, 500, 502, 503, 504],
+            status_forcelist=[500, 502, 504],
+            respect_retry_after_header=False,
         )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
+        adapter_options = {
+            "max_retries": retry_strategy,
+            "pool_connections": 1,
+            "pool_maxsize": pool_maxsize,
+        }
+        if cassette_mode == "replay":
+            adapter = cassette.ReplayAdapter(cassette_path, latency_scale=cassette_latency_scale)
+        elif cassette_mode == "record":
+            adapter = cassette.RecordingAdapter(cassette_path, api_token, **adapter_options)
+        else:
+            adapter = HTTPAdapter(**adapter_options)
+        cache = disk_cache.open_cache(
+            disk_cache_path or disk_cache.default_path(), int(disk_cache_max_mb * 1024 * 1024)
+        ) if disk_cache_enabled else None
+        if cache is not None:
+            # An unusable cache file leaves the client working without it
+            adapter = disk_cache.CachingAdapter(
+                adapter,
+                cache,
+                api_token,
+                endpoints=disk_cache_endpoints,
+                fresh_seconds=disk_cache_fresh_seconds,
+                max_age=disk_cache_max_age
+            )
         self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
         
         # Set default headers
         self.session.headers.update({
@@ -53,7 +262,8 @@ class QRadarClient:
         endpoint: str, 
         params: Optional[Dict] = None,
         data: Optional[Dict] = None,
-        json_data: Optional[Dict] = None
+        json_data: Optional[Any] = None,
+        headers: Optional[Dict[str, str]] = None
     ) -> Dict[str, Any]:
         """
         Make HTTP request to QRadar API
@@ -64,64 +274,395 @@ class QRadarClient:
             params: Query parameters
             data: Form data
             json_data: JSON data
+            headers: Extra headers for this request only (e.g. Range)
             
         Returns:
             Response data as dictionary
         """
         url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        template = metrics.endpoint_template(endpoint)
+        breaker = self.breakers.breaker_for(template)
+        fallback_key = None
+        if method == "GET":
+            fallback_key = (
+                endpoint, json.dumps(params, sort_keys=True), (headers or {}).get("Range", "")
+            )
         
-        try:
-            response = self.session.request(
-                method=method,
-                url=url,
-                params=params,
-                data=data,
-                json=json_data,
-                verify=self.verify_ssl,
-                timeout=30
+        if not breaker.allow():
+            metrics.CIRCUIT_REJECTED.inc(endpoint=template)
+            stale = self._last_good_result(fallback_key, template, "circuit_open")
+            if stale is not None:
+                return stale
+            raise circuit.CircuitOpenError(
+                f"QRadar API circuit open for {template} after repeated failures; "
+                f"next attempt in {breaker.retry_in():.0f}s"
             )
-            response.raise_for_status()
-            
-            # Handle empty responses
-            if not response.content:
-                return {}
+        
+        start = time.perf_counter()
+        healthy = False
+        
+        with tracing.span(f"{method} {template}", method=method, endpoint=template) as span:
+            try:
+                request_options = {
+                    "url": url,
+                    "params": params,
+                    "data": data,
+                    "json": json_data,
+                    "headers": headers,
+                    "verify": self.verify_ssl,
+                    "timeout": self.timeouts.timeout_for(endpoint),
+                }
+                if self.hedge_policy.applies_to(method, template):
+                    response = self._hedged_send(
+                        method, endpoint, template, span, **request_options
+                    )
+                else:
+                    response = self._send(method, endpoint, **request_options)
+                self._record_transfer(template, response)
+                span.set_attribute("status_code", response.status_code)
+                span.set_attribute("bytes_received", len(response.content))
+                if disk_cache.CACHE_HEADER in response.headers:
+                    span.set_attribute("cache", response.headers[disk_cache.CACHE_HEADER])
+                # 4xx answers are our mistake, not a sign the console is struggling
+                healthy = (
+                    response.status_code < 500
+                    and response.status_code not in ratelimit.THROTTLE_STATUSES
+                )
+                response.raise_for_status()
+                
+                # Handle empty responses
+                if not response.content:
+                    return {}
                 
-            return response.json()
+                with tracing.span("decode_json", endpoint=template):
+                    result = response.json()
+                if fallback_key is not None and isinstance(result, list):
+                    self._remember(fallback_key, result)
+                return result
+                
+            except requests.exceptions.RequestException as e:
+                status_code = "connection"
+                if isinstance(e, requests.exceptions.Timeout):
+                    status_code = "timeout"
+                error_msg = f"QRadar API request failed: {str(e)}"
+                if hasattr(e, 'response') and e.response is not None:
+                    status_code = str(e.response.status_code)
+                    try:
+                        error_details = e.response.json()
+                        error_msg += f" - {json.dumps(error_details)}"
+                    except:
+                        error_msg += f" - {e.response.text}"
+                metrics.HTTP_ERRORS.inc(method=method, endpoint=template, status_code=status_code)
+                if healthy:
+                    raise Exception(error_msg)
+                stale = self._last_good_result(fallback_key, template, "error")
+                if stale is not None:
+                    return stale
+                raise circuit.UpstreamError(error_msg)
+            finally:
+                breaker.record(healthy)
+                metrics.HTTP_LATENCY.observe(
+                    time.perf_counter() - start, method=method, endpoint=template
+                )
+
+    def _remember(self, key: Tuple[str, str, str], result: Any) -> None:
+        """Keep a successful list result for stale fallback (LRU)"""
+        with self._last_good_lock:
+            self._last_good[key] = (time.monotonic(), result)
+            self._last_good.move_to_end(key)
+            while len(self._last_good) > self.stale_max_entries:
+                self._last_good.popitem(last=False)
+
+    def _last_good_result(
+        self,
+        key: Optional[Tuple[str, str, str]],
+        template: str,
+        reason: str
+    ) -> Optional[Any]:
+        """Last good result for a request if one is young enough, noting that it is stale"""
+        if key is None:
+            return None
+        with self._last_good_lock:
+            entry = self._last_good.get(key)
+        if entry is None:
+            return None
+        age = time.monotonic() - entry[0]
+        if age > self.stale_max_age:
+            return None
+        circuit.note_stale(template, age, reason)
+        return entry[1]
+
+    def _send(self, method: str, endpoint: str, **kwargs) -> requests.Response:
+        """
+        Send a request through the rate limiter, retrying when QRadar throttles
+        
+        Args:
+            method: HTTP method
+            endpoint: API endpoint path (selects the endpoint class)
+            **kwargs: Passed to requests.Session.request
+            
+        Returns:
+            The final response (still 429/503 if retries ran out)
+        """
+        klass = ratelimit.endpoint_class(endpoint)
+        attempt = 0
+        while True:
+            self.limiter.acquire(klass)
+            outcome, reason, retry_after = "error", "", None
+            try:
+                response = self.session.request(method=method, **kwargs)
+                if response.status_code in ratelimit.THROTTLE_STATUSES:
+                    outcome, reason = "throttled", f"status_{response.status_code}"
+                    retry_after = ratelimit.parse_retry_after(response.headers.get("Retry-After"))
+                else:
+                    outcome = "ok"
+            except requests.exceptions.Timeout:
+                outcome, reason = "throttled", "timeout"
+                raise
+            finally:
+                self.limiter.release(klass, outcome, reason, retry_after)
             
-        except requests.exceptions.RequestException as e:
-            error_msg = f"QRadar API request failed: {str(e)}"
-            if hasattr(e, 'response') and e.response is not None:
+            if outcome != "throttled" or attempt >= self.limiter.max_retries:
+                return response
+            delay = self.limiter.backoff(attempt, retry_after)
+            attempt += 1
+            if delay:
+                with tracing.span("ratelimit.backoff", seconds=delay):
+                    time.sleep(delay)
+
+    def _hedged_send(
+        self,
+        method: str,
+        endpoint: str,
+        template: str,
+        span: Any,
+        **kwargs
+    ) -> requests.Response:
+        """
+        Send a GET and, if it is slower than the endpoint's usual tail, a second copy
+        
+        Args:
+            method: HTTP method (only idempotent GETs are hedged)
+            endpoint: API endpoint path
+            template: Endpoint template (selects the latency history)
+            span: Request span to annotate
+            **kwargs: Passed to requests.Session.request
+            
+        Returns:
+            The first successful response; a 5xx or 429 answer counts as a
+            failure, and is returned only if the other attempt fails too
+        """
+        self.hedge_policy.count_eligible()
+        pool = self._get_pool("hedge", self._pool_maxsize * 2)
+        primary = pool.submit(
+            contextvars.copy_context().run, self._send, method, endpoint, **kwargs
+        )
+        delay = self.hedge_policy.delay_for(template)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+        if not self.hedge_policy.try_spend():
+            metrics.HTTP_HEDGES.inc(endpoint=template, result="budget_exhausted")
+            return primary.result()
+        
+        metrics.HTTP_HEDGES.inc(endpoint=template, result="sent")
+        span.set_attribute("hedged_after_ms", round(delay * 1000, 1))
+        hedge = pool.submit(
+            contextvars.copy_context().run, self._send, method, endpoint, **kwargs
+        )
+        # The slower attempt is left to finish in the background and discarded
+        pending = {primary, hedge}
+        failed: Optional[Future] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                response = future.result() if future.exception() is None else None
+                healthy = response is not None and (
+                    response.status_code < 500 and response.status_code != 429
+                )
+                if healthy:
+                    if future is hedge:
+                        metrics.HTTP_HEDGES.inc(endpoint=template, result="won")
+                        span.set_attribute("hedge_won", True)
+                    if failed is not None and failed.exception() is None:
+                        failed.result().close()
+                    return response
+                # Wait for the other attempt; an error answer beats an exception
+                if failed is None or response is not None:
+                    failed = future
+        return failed.result()
+
+    def _get_pool(self, name: str, max_workers: int) -> ThreadPoolExecutor:
+        """Shared worker pool for hedges ("hedge") or concurrent lookups ("fanout")"""
+        pool = self._pools.get(name)
+        if pool is None:
+            with self._pools_lock:
+                pool = self._pools.get(name)
+                if pool is None:
+                    pool = self._pools[name] = ThreadPoolExecutor(
+                        max_workers=max_workers,
+                        thread_name_prefix=f"qradar-{name}"
+                    )
+        return pool
+
+    def _fan_out(self, calls: List[Tuple[Any, Tuple]]) -> List[Tuple[bool, Any]]:
+        """
+        Run independent client calls concurrently
+        
+        Args:
+            calls: (function, args) pairs
+            
+        Returns:
+            (True, result) or (False, exception) per call, in order
+        """
+        # Nested fan-outs run inline so fanout workers never wait on their own pool
+        inline = threading.current_thread().name.startswith("qradar-fanout")
+        if len(calls) == 1 or inline:
+            outcomes = []
+            for func, args in calls:
                 try:
-                    error_details = e.response.json()
-                    error_msg += f" - {json.dumps(error_details)}"
-                except:
-                    error_msg += f" - {e.response.text}"
-            raise Exception(error_msg)
+                    outcomes.append((True, func(*args)))
+                except Exception as e:
+                    outcomes.append((False, e))
+            return outcomes
+        
+        pool = self._get_pool("fanout", self._pool_maxsize)
+        futures = [
+            pool.submit(contextvars.copy_context().run, func, *args) for func, args in calls
+        ]
+        outcomes = []
+        for future in futures:
+            try:
+                outcomes.append((True, future.result()))
+            except Exception as e:
+                outcomes.append((False, e))
+        return outcomes
+
+    def _map_bounded(
+        self,
+        func: Any,
+        items: List[Any],
+        concurrency: int
+    ) -> List[Tuple[bool, Any]]:
+        """
+        Call func on each item with at most ``concurrency`` calls in flight
+        
+        Args:
+            func: Function of one item
+            items: Items to process
+            concurrency: Calls in flight at once (capped by the connection pool)
+            
+        Returns:
+            (True, result) or (False, exception) per item, in order
+        """
+        inline = threading.current_thread().name.startswith("qradar-fanout")
+        if concurrency <= 1 or len(items) <= 1 or inline:
+            outcomes = []
+            for item in items:
+                try:
+                    outcomes.append((True, func(item)))
+                except Exception as e:
+                    outcomes.append((False, e))
+            return outcomes
+        
+        pool = self._get_pool("fanout", self._pool_maxsize)
+        outcomes: List[Tuple[bool, Any]] = [(False, None)] * len(items)
+        in_flight: Dict[Any, int] = {}
+        
+        def collect(done: Any) -> None:
+            for future in done:
+                index = in_flight.pop(future)
+                try:
+                    outcomes[index] = (True, future.result())
+                except Exception as e:
+                    outcomes[index] = (False, e)
+        
+        for index, item in enumerate(items):
+            if len(in_flight) >= concurrency:
+                collect(wait(in_flight, return_when=FIRST_COMPLETED)[0])
+            future = pool.submit(contextvars.copy_context().run, func, item)
+            in_flight[future] = index
+        collect(wait(in_flight)[0])
+        return outcomes
+
+    @staticmethod
+    def _record_transfer(template: str, response: requests.Response) -> None:
+        """Count request and response body bytes for an endpoint template"""
+        body = response.request.body if response.request is not None else None
+        if body:
+            metrics.HTTP_BYTES_SENT.inc(len(body), endpoint=template)
+        metrics.HTTP_BYTES_RECEIVED.inc(len(response.content), endpoint=template)
+
+    def _get_metadata(self, endpoint: str) -> Any:
+        """
+        GET a slow-changing metadata endpoint, serving repeat calls from memory
+        
+        Args:
+            endpoint: API endpoint path
+            
+        Returns:
+            Response data (shared with the cache, do not modify)
+        """
+        with self._metadata_lock:
+            cached = self._metadata_cache.get(endpoint)
+        if cached and time.monotonic() - cached[0] < self.metadata_ttl:
+            metrics.CACHE_REQUESTS.inc(cache="metadata", result="hit")
+            return cached[1]
+        
+        metrics.CACHE_REQUESTS.inc(cache="metadata", result="miss")
+        try:
+            data = self._make_request("GET", endpoint)
+        except circuit.UpstreamError:
+            # Expired metadata beats no metadata while QRadar is failing
+            if cached is None:
+                raise
+            age = time.monotonic() - cached[0]
+            if age > self.stale_max_age:
+                raise
+            circuit.note_stale(metrics.endpoint_template(endpoint), age, "metadata")
+            return cached[1]
+        with self._metadata_lock:
+            self._metadata_cache[endpoint] = (time.monotonic(), data)
+        return data
 
     # ==================== Event and Log Queries ====================
     
-    def search_events(
-        self, 
-        query: str, 
-        timeout: int = 60,
-        max_wait: int = 300
-    ) -> Dict[str, Any]:
+    def _run_ariel_search(
+        self,
+        query: str,
+        max_wait: int,
+        database: str,
+        label: str
+    ) -> Tuple[str, str, Dict[str, Any]]:
         """
-        Search events using AQL (Ariel Query Language)
+        Create an Ariel search, wait for it to complete and fetch its results
         
         Args:
             query: AQL query string
-            timeout: Query timeout in seconds
             max_wait: Maximum time to wait for results
+            database: Ariel database the query targets (events or flows)
+            label: Search description used in error messages
             
         Returns:
-            Search results
+            Tuple of (search_id, final status, results response)
         """
+        # QRadar caps concurrent searches per user; wait here rather than be refused
+        with tracing.span("ariel.slot_wait", database=database):
+            self._ariel_slots.acquire()
+        try:
+            return self._run_ariel_search_slot(query, max_wait, database, label)
+        finally:
+            self._ariel_slots.release()
+
+    def _run_ariel_search_slot(
+        self,
+        query: str,
+        max_wait: int,
+        database: str,
+        label: str
+    ) -> Tuple[str, str, Dict[str, Any]]:
+        """_run_ariel_search once a search slot is held"""
         # Step 1: Create search
-        search_data = {
-            "query_expression": query
-        }
-        
         search_response = self._make_request(
             "POST",
             "/ariel/searches",
@@ -130,42 +671,86 @@ class QRadarClient:
         
         search_id = search_response.get("search_id")
         if not search_id:
-            raise Exception("Failed to create search - no search_id returned")
+            raise Exception(f"Failed to create {label.lower()} - no search_id returned")
         
         # Step 2: Wait for search to complete
         start_time = time.time()
+        queued_until = None
+        poll_count = 0
         while True:
             if time.time() - start_time > max_wait:
-                raise Exception(f"Search timed out after {max_wait} seconds")
-            
-            status_response = self._make_request(
-                "GET",
-                f"/ariel/searches/{search_id}"
-            )
+                raise Exception(f"{label} timed out after {max_wait} seconds")
             
-            status = status_response.get("status")
+            poll_count += 1
+            with tracing.span("ariel.poll", search_id=search_id, iteration=poll_count) as poll_span:
+                status_response = self._make_request(
+                    "GET",
+                    f"/ariel/searches/{search_id}"
+                )
+                metrics.ARIEL_POLLS.inc(database=database)
+                
+                status = status_response.get("status")
+                poll_span.set_attribute("status", status)
+            if queued_until is None and status != "WAIT":
+                queued_until = time.time()
             
             if status == "COMPLETED":
                 break
             elif status == "ERROR":
-                raise Exception(f"Search failed: {status_response.get('error_messages', [])}")
+                raise Exception(f"{label} failed: {status_response.get('error_messages', [])}")
             elif status in ["CANCELED", "CANCELLED"]:
-                raise Exception("Search was canceled")
+                raise Exception(f"{label} was canceled")
             
-            time.sleep(2)  # Poll every 2 seconds
+            with tracing.span("ariel.sleep", seconds=2):
+                time.sleep(2)  # Poll every 2 seconds
+        
+        completed_at = time.time()
+        metrics.ARIEL_PHASE.observe(queued_until - start_time, database=database, phase="queue")
+        metrics.ARIEL_PHASE.observe(completed_at - queued_until, database=database, phase="run")
+        metrics.ARIEL_PHASE.observe(completed_at - start_time, database=database, phase="poll")
         
         # Step 3: Retrieve results
         results_response = self._make_request(
             "GET",
             f"/ariel/searches/{search_id}/results"
         )
+        metrics.ARIEL_PHASE.observe(time.time() - completed_at, database=database, phase="fetch")
         
-        return {
+        return search_id, status, results_response
+
+    def search_events(
+        self, 
+        query: str, 
+        timeout: int = 60,
+        max_wait: int = 300,
+        classify_ips: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Search events using AQL (Ariel Query Language)
+        
+        Args:
+            query: AQL query string
+            timeout: Query timeout in seconds
+            max_wait: Maximum time to wait for results
+            classify_ips: Tag sourceip/destinationip with their network hierarchy group
+            
+        Returns:
+            Search results
+        """
+        search_id, status, results_response = self._run_ariel_search(
+            query, max_wait, database="events", label="Search"
+        )
+        rows = results_response.get("events", [])
+        
+        result = {
             "search_id": search_id,
             "status": status,
-            "events": results_response.get("events", []),
-            "record_count": len(results_response.get("events", []))
+            "events": rows,
+            "record_count": len(rows)
         }
+        if classify_ips:
+            result["classified_fields"] = self.ip_index.classify_rows(rows)
+        return result
 
     def get_recent_events(
         self, 
@@ -192,7 +777,8 @@ class QRadarClient:
         self, 
         query: str,
         timeout: int = 60,
-        max_wait: int = 300
+        max_wait: int = 300,
+        classify_ips: bool = False
     ) -> Dict[str, Any]:
         """
         Search network flows using AQL
@@ -201,55 +787,25 @@ class QRadarClient:
             query: AQL query string
             timeout: Query timeout in seconds
             max_wait: Maximum time to wait for results
+            classify_ips: Tag sourceip/destinationip with their network hierarchy group
             
         Returns:
             Search results
         """
-        # Similar to search_events but for flows
-        search_response = self._make_request(
-            "POST",
-            "/ariel/searches",
-            params={"query_expression": query}
+        search_id, status, results_response = self._run_ariel_search(
+            query, max_wait, database="flows", label="Flow search"
         )
+        rows = results_response.get("flows", [])
         
-        search_id = search_response.get("search_id")
-        if not search_id:
-            raise Exception("Failed to create flow search - no search_id returned")
-        
-        # Wait for completion
-        start_time = time.time()
-        while True:
-            if time.time() - start_time > max_wait:
-                raise Exception(f"Flow search timed out after {max_wait} seconds")
-            
-            status_response = self._make_request(
-                "GET",
-                f"/ariel/searches/{search_id}"
-            )
-            
-            status = status_response.get("status")
-            
-            if status == "COMPLETED":
-                break
-            elif status == "ERROR":
-                raise Exception(f"Flow search failed: {status_response.get('error_messages', [])}")
-            elif status in ["CANCELED", "CANCELLED"]:
-                raise Exception("Flow search was canceled")
-            
-            time.sleep(2)
-        
-        # Retrieve results
-        results_response = self._make_request(
-            "GET",
-            f"/ariel/searches/{search_id}/results"
-        )
-        
-        return {
+        result = {
             "search_id": search_id,
             "status": status,
-            "flows": results_response.get("flows", []),
-            "record_count": len(results_response.get("flows", []))
+            "flows": rows,
+            "record_count": len(rows)
         }
+        if classify_ips:
+            result["classified_fields"] = self.ip_index.classify_rows(rows)
+        return result
 
     # ==================== Offenses ====================
     
@@ -276,21 +832,13 @@ class QRadarClient:
         if fields:
             params["fields"] = fields
         
+        # Range is passed per request; mutating session headers is not thread-safe
         headers = {}
         if range_header:
             headers["Range"] = f"items={range_header}"
         
-        # Temporarily add range header if provided
-        if headers:
-            original_headers = self.session.headers.copy()
-            self.session.headers.update(headers)
-        
-        try:
-            offenses = self._make_request("GET", "/siem/offenses", params=params)
-            return offenses if isinstance(offenses, list) else [offenses]
-        finally:
-            if headers:
-                self.session.headers = original_headers
+        offenses = self._make_request("GET", "/siem/offenses", params=params, headers=headers)
+        return offenses if isinstance(offenses, list) else [offenses]
 
     def get_offense_by_id(self, offense_id: int) -> Dict[str, Any]:
         """
@@ -309,7 +857,8 @@ class QRadarClient:
     def get_log_sources(
         self,
         filter_query: Optional[str] = None,
-        fields: Optional[str] = None
+        fields: Optional[str] = None,
+        range_header: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """
         Get log sources (agents) from QRadar
@@ -317,6 +866,7 @@ class QRadarClient:
         Args:
             filter_query: Filter string
             fields: Comma-separated list of fields to return
+            range_header: Range of results to return (e.g., "0-49")
             
         Returns:
             List of log sources
@@ -327,7 +877,16 @@ class QRadarClient:
         if fields:
             params["fields"] = fields
         
-        log_sources = self._make_request("GET", "/config/event_sources/log_source_management/log_sources", params=params)
+        headers = {}
+        if range_header:
+            headers["Range"] = f"items={range_header}"
+        
+        log_sources = self._make_request(
+            "GET",
+            "/config/event_sources/log_source_management/log_sources",
+            params=params,
+            headers=headers
+        )
         return log_sources if isinstance(log_sources, list) else [log_sources]
 
     def get_log_source_by_id(self, log_source_id: int) -> Dict[str, Any]:
@@ -352,7 +911,7 @@ class QRadarClient:
         Returns:
             List of log source types
         """
-        types = self._make_request("GET", "/config/event_sources/log_source_management/log_source_types")
+        types = self._get_metadata("/config/event_sources/log_source_management/log_source_types")
         return types if isinstance(types, list) else [types]
 
     # ==================== Assets ====================
@@ -360,7 +919,8 @@ class QRadarClient:
     def get_assets(
         self,
         filter_query: Optional[str] = None,
-        fields: Optional[str] = None
+        fields: Optional[str] = None,
+        range_header: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """
         Get assets from QRadar
@@ -368,6 +928,7 @@ class QRadarClient:
         Args:
             filter_query: Filter string
             fields: Comma-separated list of fields to return
+            range_header: Range of results to return (e.g., "0-49")
             
         Returns:
             List of assets
@@ -378,7 +939,11 @@ class QRadarClient:
         if fields:
             params["fields"] = fields
         
-        assets = self._make_request("GET", "/asset_model/assets", params=params)
+        headers = {}
+        if range_header:
+            headers["Range"] = f"items={range_header}"
+        
+        assets = self._make_request("GET", "/asset_model/assets", params=params, headers=headers)
         return assets if isinstance(assets, list) else [assets]
 
     def search_assets(self, ip_address: str) -> List[Dict[str, Any]]:
@@ -406,17 +971,137 @@ class QRadarClient:
         ref_sets = self._make_request("GET", "/reference_data/sets")
         return ref_sets if isinstance(ref_sets, list) else [ref_sets]
 
-    def get_reference_set_data(self, ref_set_name: str) -> Dict[str, Any]:
+    def get_reference_set_data(
+        self,
+        ref_set_name: str,
+        filter_query: Optional[str] = None,
+        fields: Optional[str] = None,
+        range_header: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
         Get data from a specific reference set
         
         Args:
             ref_set_name: Name of the reference set
+            filter_query: Filter on the set's data elements (e.g., "last_seen > 1700000000000")
+            fields: Comma-separated list of fields to return
+            range_header: Range of data elements to return (e.g., "0-9999")
             
         Returns:
             Reference set data
         """
-        return self._make_request("GET", f"/reference_data/sets/{ref_set_name}")
+        params = {}
+        if filter_query:
+            params["filter"] = filter_query
+        if fields:
+            params["fields"] = fields
+        
+        headers = {}
+        if range_header:
+            headers["Range"] = f"items={range_header}"
+        
+        return self._make_request(
+            "GET", f"/reference_data/sets/{ref_set_name}", params=params, headers=headers
+        )
+    
+    @staticmethod
+    def reference_set_filter(
+        value_prefix: Optional[str] = None,
+        last_seen_after: Optional[int] = None,
+        last_seen_before: Optional[int] = None
+    ) -> Optional[str]:
+        """
+        Build a filter on reference set elements
+        
+        Args:
+            value_prefix: Only values starting with this (case-insensitive; % and _
+                match themselves, not as wildcards)
+            last_seen_after: Only elements last seen at or after this time (epoch ms)
+            last_seen_before: Only elements last seen before this time (epoch ms)
+            
+        Returns:
+            Filter string, or None for no filter
+        """
+        clauses = []
+        if value_prefix:
+            escaped = value_prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            clauses.append(f"value ILIKE {json.dumps(escaped + '%')}")
+        if last_seen_after is not None:
+            clauses.append(f"last_seen >= {int(last_seen_after)}")
+        if last_seen_before is not None:
+            clauses.append(f"last_seen < {int(last_seen_before)}")
+        return " and ".join(clauses) or None
+    
+    def iter_reference_set_pages(
+        self,
+        ref_set_name: str,
+        filter_query: Optional[str] = None,
+        fields: Optional[str] = None,
+        page_size: int = 1000,
+        start: int = 0
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Read a reference set one page of data elements at a time
+        
+        Each page is a separate Range request, so a set with millions of
+        elements never has to fit in one response (or one timeout).
+        
+        Args:
+            ref_set_name: Name of the reference set
+            filter_query: Filter on the set's data elements
+            fields: Comma-separated list of fields to return
+            page_size: Data elements per request
+            start: Offset of the first element
+            
+        Yields:
+            Reference set responses, each holding one page of "data"
+        """
+        while True:
+            page = self.get_reference_set_data(
+                ref_set_name, filter_query, fields, f"{start}-{start + page_size - 1}"
+            )
+            yield page
+            data = page.get("data") or []
+            if len(data) < page_size:
+                return
+            start += len(data)
+    
+    def iter_reference_set_data(
+        self,
+        ref_set_name: str,
+        filter_query: Optional[str] = None,
+        page_size: int = 1000
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream the data elements of a reference set
+        
+        Args:
+            ref_set_name: Name of the reference set
+            filter_query: Filter on the set's data elements (see reference_set_filter)
+            page_size: Data elements per request
+            
+        Yields:
+            Data elements (value, source, first_seen, last_seen)
+        """
+        for page in self.iter_reference_set_pages(ref_set_name, filter_query, page_size=page_size):
+            yield from page.get("data") or []
+    
+    def bulk_load_reference_set(self, ref_set_name: str, values: List[str]) -> Dict[str, Any]:
+        """
+        Add values to a reference set in one request
+        
+        Use bulk_loader.load() for lists too large for a single request.
+        
+        Args:
+            ref_set_name: Name of the reference set
+            values: Values to add (existing values only get a new last_seen)
+            
+        Returns:
+            Updated reference set (without data)
+        """
+        return self._make_request(
+            "POST", f"/reference_data/sets/bulk_load/{ref_set_name}", json_data=values
+        )
 
     # ==================== System Information ====================
     
@@ -427,7 +1112,7 @@ class QRadarClient:
         Returns:
             System information
         """
-        return self._make_request("GET", "/system/about")
+        return self._get_metadata("/system/about")
 
     def get_servers(self) -> List[Dict[str, Any]]:
         """
@@ -477,6 +1162,50 @@ class QRadarClient:
         """
         return self._make_request("GET", f"/analytics/rules/{rule_id}")
 
+    def find_rule_dependents(
+        self,
+        rule_id: int,
+        building_block: bool = False,
+        max_wait: float = 60.0
+    ) -> List[Dict[str, Any]]:
+        """
+        Find what uses a rule or building block in its tests
+        
+        QRadar works this out in a task: one POST starts it, its status is
+        polled until it completes, then its results are read.
+        
+        Args:
+            rule_id: Rule or building block ID
+            building_block: Whether rule_id is a building block
+            max_wait: Maximum seconds to wait for the task
+            
+        Returns:
+            Dependents ({"id", "name", "dependent_type"}: rules, building
+            blocks and other content such as searches)
+        """
+        collection = "building_blocks" if building_block else "rules"
+        task = self._make_request("POST", f"/analytics/{collection}/{rule_id}/dependents")
+        task_id = task.get("id")
+        if task_id is None:
+            raise Exception(f"Failed to start dependents task for {rule_id} - no task id returned")
+        
+        start_time = time.time()
+        delay = 0.1
+        while task.get("status") != "COMPLETED":
+            if task.get("status") in ("CANCELLING", "CANCELLED", "EXCEPTION", "INTERRUPTED"):
+                raise Exception(
+                    f"Dependents task for {rule_id} ended with status {task.get('status')}: "
+                    f"{task.get('message', '')}"
+                )
+            if time.time() - start_time > max_wait:
+                raise Exception(f"Dependents task for {rule_id} timed out after {max_wait} seconds")
+            time.sleep(delay)
+            delay = min(delay * 2, 2.0)
+            task = self._make_request("GET", f"/analytics/dependent_tasks/{task_id}")
+        
+        dependents = self._make_request("GET", f"/analytics/dependent_tasks/{task_id}/results")
+        return dependents if isinstance(dependents, list) else [dependents]
+
     # ==================== Saved Searches ====================
     
     def get_saved_searches(self) -> List[Dict[str, Any]]:
@@ -491,7 +1220,7 @@ class QRadarClient:
     
     def get_saved_search_by_id(self, search_id: str) -> Dict[str, Any]:
         """
-        Get specific saved search by ID
+        Get specific saved search by ID (cached for metadata_ttl)
         
         Args:
             search_id: Saved search ID
@@ -499,23 +1228,39 @@ class QRadarClient:
         Returns:
             Saved search details
         """
-        return self._make_request("GET", f"/ariel/saved_searches/{search_id}")
+        return self._get_metadata(f"/ariel/saved_searches/{search_id}")
     
     def execute_saved_search(
         self, 
         search_id: str,
-        max_wait: int = 300
+        max_wait: int = 300,
+        max_age: Optional[float] = None
     ) -> Dict[str, Any]:
         """
         Execute a saved search
         
+        If the search is scheduled and its stored result is young enough, that
+        result is returned (with a "materialized" entry) instead of running it.
+        
         Args:
             search_id: Saved search ID
             max_wait: Maximum time to wait for results
+            max_age: Oldest stored result to accept in seconds (default:
+                materialized_max_age; 0 always runs the search)
             
         Returns:
             Search results
         """
+        if max_age is None:
+            max_age = self.materialized_max_age
+        if self.scheduler is not None and max_age > 0:
+            materialized = self.scheduler.fresh_saved_search(search_id, max_age)
+            metrics.CACHE_REQUESTS.inc(
+                cache="materialized", result="hit" if materialized is not None else "miss"
+            )
+            if materialized is not None:
+                return materialized
+        
         # Get saved search details to get the query
         saved_search = self.get_saved_search_by_id(search_id)
         query = saved_search.get("aql")
@@ -523,8 +1268,53 @@ class QRadarClient:
         if not query:
             raise Exception(f"Saved search {search_id} does not have an AQL query")
         
-        # Execute the query
+        # Execute the query against the database the search was saved for
+        if str(saved_search.get("database", "")).upper() == "FLOWS":
+            return self.search_flows(query, max_wait=max_wait)
         return self.search_events(query, max_wait=max_wait)
+    
+    def execute_saved_searches(
+        self,
+        search_ids: List[str],
+        max_wait: int = 300,
+        on_result: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Execute several saved searches concurrently
+        
+        Searches run at most ``ariel_max_searches`` at a time, so the batch
+        takes about as long as its slowest searches rather than their sum.
+        
+        Args:
+            search_ids: Saved search IDs (duplicates are run once)
+            max_wait: Maximum time to wait for each search
+            on_result: Called with each result as soon as its search finishes
+                (from a worker thread)
+            
+        Returns:
+            One result per saved search, in the order given; failed searches
+            have status "ERROR" and an "error" message
+        """
+        start = time.perf_counter()
+        
+        def run(search_id: str) -> Dict[str, Any]:
+            entry: Dict[str, Any] = {"saved_search_id": search_id}
+            try:
+                saved_search = self.get_saved_search_by_id(search_id)
+                entry["name"] = saved_search.get("name")
+                entry.update(self.execute_saved_search(search_id, max_wait))
+            except Exception as e:
+                entry["status"] = "ERROR"
+                entry["error"] = str(e)
+            entry["finished_after_seconds"] = round(time.perf_counter() - start, 3)
+            if on_result is not None:
+                on_result(entry)
+            return entry
+        
+        unique = list(dict.fromkeys(str(i) for i in search_ids))
+        with tracing.span("ariel.saved_searches", searches=len(unique)):
+            outcomes = self._map_bounded(run, unique, self.ariel_max_searches)
+        return [value for _, value in outcomes]
 
     # ==================== Offense Notes ====================
     
@@ -592,7 +1382,7 @@ class QRadarClient:
         Returns:
             List of closing reasons
         """
-        reasons = self._make_request("GET", "/siem/offense_closing_reasons")
+        reasons = self._get_metadata("/siem/offense_closing_reasons")
         return reasons if isinstance(reasons, list) else [reasons]
     
     def assign_offense(self, offense_id: int, assigned_to: str) -> Dict[str, Any]:
@@ -611,6 +1401,132 @@ class QRadarClient:
             f"/siem/offenses/{offense_id}",
             params={"assigned_to": assigned_to}
         )
+    
+    def triage_offenses(
+        self,
+        offense_ids: Optional[List[int]] = None,
+        filter_query: Optional[str] = None,
+        note_text: Optional[str] = None,
+        status: Optional[str] = None,
+        closing_reason_id: Optional[int] = None,
+        assigned_to: Optional[str] = None,
+        dry_run: bool = False,
+        max_offenses: int = 1000,
+        concurrency: int = 8
+    ) -> Dict[str, Any]:
+        """
+        Add a note to, change the status of and/or assign many offenses
+        
+        Offenses are selected by ID or by filter and read once, so changes that
+        are already in place are skipped. The note is added before the status
+        and assignment change (sent as one update). Offenses are processed with
+        at most ``concurrency`` in flight, on top of the client's rate limiting.
+        
+        Args:
+            offense_ids: Offenses to change
+            filter_query: Offense filter selecting the offenses instead (e.g.
+                "status=OPEN and rules contains 1234")
+            note_text: Note to add to each offense
+            status: New status (OPEN, HIDDEN, CLOSED)
+            closing_reason_id: Required if status is CLOSED
+            assigned_to: Username to assign the offenses to
+            dry_run: Only report what would change
+            max_offenses: Refuse selections larger than this
+            concurrency: Offenses updated at once
+            
+        Returns:
+            {"dry_run", "matched", "counts": {result: n}, "seconds",
+             "offenses": [{"id", "description", "changes", "result", "error"?}]}
+        """
+        if (offense_ids is None) == (filter_query is None):
+            raise ValueError("Pass exactly one of offense_ids or filter_query")
+        if not (note_text or status or assigned_to):
+            raise ValueError("Nothing to do: pass note_text, status and/or assigned_to")
+        if status is not None and status not in ("OPEN", "HIDDEN", "CLOSED"):
+            raise ValueError(f"Invalid status {status}; use OPEN, HIDDEN or CLOSED")
+        if status == "CLOSED":
+            if closing_reason_id is None:
+                raise ValueError("closing_reason_id is required when status is CLOSED")
+            if closing_reason_id not in {r.get("id") for r in self.get_closing_reasons()}:
+                raise ValueError(f"Closing reason {closing_reason_id} does not exist")
+        
+        start = time.perf_counter()
+        fields = "id,description,status,assigned_to"
+        selection_errors: Dict[str, str] = {}
+        if offense_ids is not None:
+            if len(set(offense_ids)) > max_offenses:
+                raise ValueError(f"At most {max_offenses} offenses can be triaged per call")
+            found = self.get_offenses_by_ids(offense_ids, fields)
+            offenses = list(found["results"].values())
+            selection_errors = found["errors"]
+        else:
+            offenses = self.get_offenses(filter_query, fields, f"0-{max_offenses}")
+            if len(offenses) > max_offenses:
+                raise ValueError(
+                    f"Filter matches more than {max_offenses} offenses; narrow it down"
+                )
+        
+        plans = []
+        for offense in offenses:
+            changes: Dict[str, Any] = {}
+            if note_text:
+                changes["note"] = note_text
+            if status and offense.get("status") != status:
+                changes["status"] = [offense.get("status"), status]
+            if assigned_to and offense.get("assigned_to") != assigned_to:
+                changes["assigned_to"] = [offense.get("assigned_to"), assigned_to]
+            plans.append({
+                "id": offense.get("id"),
+                "description": (offense.get("description") or "").strip(),
+                "changes": changes,
+            })
+        
+        def apply(plan: Dict[str, Any]) -> None:
+            changes = plan["changes"]
+            if "note" in changes:
+                self.add_offense_note(plan["id"], note_text)
+                plan["note_added"] = True
+            params: Dict[str, Any] = {}
+            if "status" in changes:
+                params["status"] = status
+                if status == "CLOSED":
+                    params["closing_reason_id"] = closing_reason_id
+            if "assigned_to" in changes:
+                params["assigned_to"] = assigned_to
+            if params:
+                self._make_request("POST", f"/siem/offenses/{plan['id']}", params=params)
+        
+        todo = [plan for plan in plans if plan["changes"]]
+        if dry_run:
+            for plan in todo:
+                plan["result"] = "would_update"
+        else:
+            with tracing.span("offenses.triage", offenses=len(todo)):
+                outcomes = self._map_bounded(apply, todo, concurrency)
+            for plan, (ok, value) in zip(todo, outcomes):
+                plan["result"] = "updated" if ok else "failed"
+                if not ok:
+                    plan["error"] = str(value)
+        for plan in plans:
+            plan.setdefault("result", "unchanged")
+        for offense_id, message in selection_errors.items():
+            plans.append({
+                "id": int(offense_id),
+                "changes": {},
+                "result": "not_found" if message == "Not found" else "failed",
+                "error": message,
+            })
+        
+        counts: Dict[str, int] = {}
+        for plan in plans:
+            counts[plan["result"]] = counts.get(plan["result"], 0) + 1
+        return {
+            "dry_run": dry_run,
+            "matched": len(offenses),
+            "counts": counts,
+            "seconds": round(time.perf_counter() - start, 3),
+            "offenses": plans,
+        }
 
     # ==================== Custom Properties ====================
     
@@ -685,7 +1601,7 @@ class QRadarClient:
         Returns:
             List of databases (events, flows)
         """
-        databases = self._make_request("GET", "/ariel/databases")
+        databases = self._get_metadata("/ariel/databases")
         return databases if isinstance(databases, list) else [databases]
     
     def get_ariel_fields(self, database_name: str = "events") -> List[Dict[str, Any]]:
@@ -698,7 +1614,7 @@ class QRadarClient:
         Returns:
             List of available fields
         """
-        fields = self._make_request("GET", f"/ariel/databases/{database_name}/fields")
+        fields = self._get_metadata(f"/ariel/databases/{database_name}/fields")
         return fields if isinstance(fields, list) else [fields]
 
     # ==================== Event and Flow Categories ====================
@@ -710,7 +1626,7 @@ class QRadarClient:
         Returns:
             List of event categories
         """
-        categories = self._make_request("GET", "/data_classification/qid_records")
+        categories = self._get_metadata("/data_classification/qid_records")
         return categories if isinstance(categories, list) else [categories]
     
     def search_event_categories(self, search_term: str) -> List[Dict[str, Any]]:
@@ -734,13 +1650,15 @@ class QRadarClient:
     
     def get_building_blocks(
         self,
-        filter_query: Optional[str] = None
+        filter_query: Optional[str] = None,
+        fields: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """
         Get building blocks (rule building blocks)
         
         Args:
             filter_query: Filter string
+            fields: Comma-separated list of fields to return
             
         Returns:
             List of building blocks
@@ -748,6 +1666,8 @@ class QRadarClient:
         params = {}
         if filter_query:
             params["filter"] = filter_query
+        if fields:
+            params["fields"] = fields
         
         blocks = self._make_request("GET", "/analytics/building_blocks", params=params)
         return blocks if isinstance(blocks, list) else [blocks]
@@ -800,3 +1720,499 @@ class QRadarClient:
         reports = self._make_request("GET", "/gui_app_framework/applications")
         return reports if isinstance(reports, list) else [reports]
 
+    # ==================== Batch Lookups ====================
+    
+    def _get_by_ids(
+        self,
+        collection: str,
+        ids: List[int],
+        fields: Optional[str] = None,
+        chunk_size: int = 50
+    ) -> Dict[str, Any]:
+        """
+        Fetch many objects of one collection by ID
+        
+        IDs are requested in chunks with ``filter=id in (...)``; chunks run
+        concurrently. If the filter is rejected the chunk falls back to one
+        GET per ID. IDs missing from a filtered answer are reported as not found.
+        
+        Args:
+            collection: Collection endpoint (e.g. "/siem/offenses")
+            ids: Object IDs (duplicates are ignored)
+            fields: Comma-separated list of fields to return
+            chunk_size: IDs per filtered request
+            
+        Returns:
+            {"results": {id: object}, "errors": {id: message}}
+        """
+        unique = list(dict.fromkeys(int(i) for i in ids))
+        if fields and "id" not in [f.strip() for f in fields.split(",")]:
+            fields = f"id,{fields}"
+        
+        def fetch_chunk(chunk: List[int]) -> Any:
+            params = {"filter": f"id in ({','.join(str(i) for i in chunk)})"}
+            if fields:
+                params["fields"] = fields
+            return self._make_request("GET", collection, params=params)
+        
+        def fetch_one(object_id: int) -> Any:
+            params = {"fields": fields} if fields else None
+            return self._make_request("GET", f"{collection}/{object_id}", params=params)
+        
+        results: Dict[str, Any] = {}
+        errors: Dict[str, str] = {}
+        chunks = [unique[i:i + chunk_size] for i in range(0, len(unique), chunk_size)]
+        fallback: List[int] = []
+        for chunk, (ok, value) in zip(chunks, self._fan_out([(fetch_chunk, (c,)) for c in chunks])):
+            if ok:
+                for item in value if isinstance(value, list) else [value]:
+                    results[str(item.get("id"))] = item
+                errors.update({str(i): "Not found" for i in chunk if str(i) not in results})
+            elif isinstance(value, circuit.UpstreamError):
+                # QRadar is failing; one request per ID would only add load
+                errors.update({str(i): str(value) for i in chunk})
+            else:
+                fallback.extend(chunk)
+        
+        if fallback:
+            outcomes = self._fan_out([(fetch_one, (i,)) for i in fallback])
+            for object_id, (ok, value) in zip(fallback, outcomes):
+                if ok:
+                    results[str(object_id)] = value
+                else:
+                    errors[str(object_id)] = str(value)
+        
+        return {"results": results, "errors": errors}
+    
+    def get_offenses_by_ids(
+        self,
+        offense_ids: List[int],
+        fields: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Get several offenses by ID
+        
+        Args:
+            offense_ids: Offense IDs
+            fields: Comma-separated list of fields to return
+            
+        Returns:
+            {"results": {id: offense}, "errors": {id: message}}
+        """
+        return self._get_by_ids("/siem/offenses", offense_ids, fields)
+    
+    def get_log_sources_by_ids(
+        self,
+        log_source_ids: List[int],
+        fields: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Get several log sources by ID
+        
+        Args:
+            log_source_ids: Log source IDs
+            fields: Comma-separated list of fields to return
+            
+        Returns:
+            {"results": {id: log source}, "errors": {id: message}}
+        """
+        return self._get_by_ids(
+            "/config/event_sources/log_source_management/log_sources", log_source_ids, fields
+        )
+    
+    def get_rules_by_ids(self, rule_ids: List[int], fields: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get several rules by ID
+        
+        Args:
+            rule_ids: Rule IDs
+            fields: Comma-separated list of fields to return
+            
+        Returns:
+            {"results": {id: rule}, "errors": {id: message}}
+        """
+        return self._get_by_ids("/analytics/rules", rule_ids, fields)
+    
+    def get_users_by_ids(self, user_ids: List[int], fields: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get several users by ID
+        
+        Args:
+            user_ids: User IDs
+            fields: Comma-separated list of fields to return
+            
+        Returns:
+            {"results": {id: user}, "errors": {id: message}}
+        """
+        return self._get_by_ids("/config/access/users", user_ids, fields)
+
+    # ==================== Resolvers ====================
+    
+    def _resolve(
+        self,
+        collection: str,
+        ids: List[int],
+        errors: Optional[Dict[int, str]] = None
+    ) -> Dict[int, Any]:
+        """
+        Map IDs of a collection to their objects
+        
+        IDs resolved within the last metadata_ttl seconds are answered from an
+        LRU cache; the rest are fetched together with ``filter=id in (...)``.
+        IDs that cannot be resolved are left out of the result.
+        
+        Args:
+            collection: Collection endpoint (e.g. "/siem/source_addresses")
+            ids: Object IDs (duplicates are ignored)
+            errors: If given, receives ID -> message for IDs whose lookup
+                failed (e.g. QRadar errors), as opposed to IDs that do not exist
+            
+        Returns:
+            ID -> object (shared with the cache, do not modify)
+        """
+        resolved: Dict[int, Any] = {}
+        missing: List[int] = []
+        now = time.monotonic()
+        with self._resolved_lock:
+            for object_id in dict.fromkeys(int(i) for i in ids):
+                entry = self._resolved.get((collection, object_id))
+                if entry is not None and now - entry[0] < self.metadata_ttl:
+                    self._resolved.move_to_end((collection, object_id))
+                    resolved[object_id] = entry[1]
+                else:
+                    missing.append(object_id)
+        if resolved:
+            metrics.CACHE_REQUESTS.inc(len(resolved), cache="resolver", result="hit")
+        if not missing:
+            return resolved
+        
+        metrics.CACHE_REQUESTS.inc(len(missing), cache="resolver", result="miss")
+        fetched = self._get_by_ids(collection, missing)
+        if errors is not None:
+            errors.update(
+                (int(key), message) for key, message in fetched["errors"].items()
+                if message != "Not found"
+            )
+        now = time.monotonic()
+        with self._resolved_lock:
+            for key, item in fetched["results"].items():
+                object_id = int(key)
+                resolved[object_id] = item
+                self._resolved[(collection, object_id)] = (now, item)
+                self._resolved.move_to_end((collection, object_id))
+            while len(self._resolved) > self.resolver_max_entries:
+                self._resolved.popitem(last=False)
+        return resolved
+    
+    def resolve_source_addresses(
+        self,
+        address_ids: List[int],
+        errors: Optional[Dict[int, str]] = None
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        Resolve offense source address IDs
+        
+        Args:
+            address_ids: Source address IDs (an offense's source_address_ids)
+            errors: If given, receives ID -> message for failed lookups
+            
+        Returns:
+            ID -> source address (source_ip, magnitude, network, ...)
+        """
+        return self._resolve("/siem/source_addresses", address_ids, errors)
+    
+    def resolve_local_destination_addresses(
+        self,
+        address_ids: List[int],
+        errors: Optional[Dict[int, str]] = None
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        Resolve offense local destination address IDs
+        
+        Args:
+            address_ids: Local destination address IDs (an offense's
+                local_destination_address_ids)
+            errors: If given, receives ID -> message for failed lookups
+            
+        Returns:
+            ID -> local destination address (local_destination_ip, magnitude, network, ...)
+        """
+        return self._resolve("/siem/local_destination_addresses", address_ids, errors)
+    
+    def resolve_offense_types(
+        self,
+        type_ids: List[int],
+        errors: Optional[Dict[int, str]] = None
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        Resolve offense type IDs
+        
+        Args:
+            type_ids: Offense type IDs (an offense's offense_type)
+            errors: If given, receives ID -> message for failed lookups
+            
+        Returns:
+            ID -> offense type (name, property_name, ...)
+        """
+        return self._resolve("/siem/offense_types", type_ids, errors)
+    
+    def resolve_log_sources(
+        self,
+        log_source_ids: List[int],
+        errors: Optional[Dict[int, str]] = None
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        Resolve log source IDs
+        
+        Args:
+            log_source_ids: Log source IDs
+            errors: If given, receives ID -> message for failed lookups
+            
+        Returns:
+            ID -> log source
+        """
+        return self._resolve(
+            "/config/event_sources/log_source_management/log_sources", log_source_ids, errors
+        )
+    
+    def enrich_offenses(self, offenses: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Resolve the IDs offenses reference, with one lookup per kind for the whole list
+        
+        Adds source_addresses and local_destination_addresses (IPs),
+        offense_type_name, and fills in log source names. Lookups for the four
+        kinds run concurrently and are served from the resolver cache when
+        possible. IDs that do not exist are left as they are; IDs whose lookup
+        failed are also listed per offense under "unresolved" (field -> IDs),
+        so a QRadar error is not mistaken for a missing object.
+        
+        Args:
+            offenses: Offenses as returned by get_offenses
+            
+        Returns:
+            Enriched copies of the offenses
+        """
+        source_ids, destination_ids, type_ids, log_source_ids = [], [], [], []
+        for offense in offenses:
+            source_ids.extend(offense.get("source_address_ids") or [])
+            destination_ids.extend(offense.get("local_destination_address_ids") or [])
+            if offense.get("offense_type") is not None:
+                type_ids.append(offense["offense_type"])
+            log_source_ids.extend(
+                s["id"] for s in offense.get("log_sources") or []
+                if isinstance(s, dict) and s.get("id") is not None and "name" not in s
+            )
+        
+        failures: List[Dict[int, str]] = [{}, {}, {}, {}]
+        calls = [
+            (self.resolve_source_addresses, (source_ids, failures[0])),
+            (self.resolve_local_destination_addresses, (destination_ids, failures[1])),
+            (self.resolve_offense_types, (type_ids, failures[2])),
+            (self.resolve_log_sources, (log_source_ids, failures[3])),
+        ]
+        # A failed lookup leaves its IDs unresolved rather than failing the list
+        resolved = []
+        for (_, (ids, failed)), (ok, value) in zip(calls, self._fan_out(calls)):
+            if not ok:
+                failed.update((int(i), str(value)) for i in ids)
+            resolved.append(value if ok else {})
+        sources, destinations, types, log_sources = resolved
+        source_failed, destination_failed, type_failed, log_source_failed = failures
+        
+        enriched = []
+        for offense in offenses:
+            offense = dict(offense)
+            unresolved = {
+                "source_address_ids": [
+                    i for i in offense.get("source_address_ids") or [] if i in source_failed
+                ],
+                "local_destination_address_ids": [
+                    i for i in offense.get("local_destination_address_ids") or []
+                    if i in destination_failed
+                ],
+                "offense_type": [
+                    i for i in [offense.get("offense_type")] if i in type_failed
+                ],
+                "log_sources": [
+                    s["id"] for s in offense.get("log_sources") or []
+                    if isinstance(s, dict) and s.get("id") in log_source_failed
+                ],
+            }
+            if "source_address_ids" in offense:
+                offense["source_addresses"] = [
+                    sources[i].get("source_ip") for i in offense["source_address_ids"] or []
+                    if i in sources
+                ]
+            if "local_destination_address_ids" in offense:
+                offense["local_destination_addresses"] = [
+                    destinations[i].get("local_destination_ip")
+                    for i in offense["local_destination_address_ids"] or [] if i in destinations
+                ]
+            if offense.get("offense_type") in types:
+                offense["offense_type_name"] = types[offense["offense_type"]].get("name")
+            if offense.get("log_sources"):
+                offense["log_sources"] = [
+                    {**s, "name": log_sources[s["id"]].get("name")}
+                    if isinstance(s, dict) and s.get("id") in log_sources else s
+                    for s in offense["log_sources"]
+                ]
+            unresolved = {field: ids for field, ids in unresolved.items() if ids}
+            if unresolved:
+                offense["unresolved"] = unresolved
+            enriched.append(offense)
+        return enriched
+    
+    # ==================== Offense Investigation ====================
+    
+    def investigate_offense(self, offense_id: int, max_asset_ips: int = 20) -> Dict[str, Any]:
+        """
+        Gather everything needed to triage an offense in one call
+        
+        Lookups run concurrently in three rounds, each waiting only for the
+        data it depends on:
+        
+        1. the offense, its notes and the closing reason / log source type catalogs
+        2. source and destination addresses, log sources, rules and the assets
+           of the offense source IP
+        3. assets of the remaining address IPs
+        
+        IDs and IPs shared between parts are looked up once; catalogs come from
+        the metadata cache and addresses and log sources from the resolver
+        cache. A failed part is reported under "errors" instead of failing the
+        bundle; only the offense itself is required. IDs that do not exist are
+        reported as "Not found", IDs whose lookup failed as "Unresolved:
+        upstream error (...)".
+        
+        Args:
+            offense_id: Offense ID
+            max_asset_ips: Most distinct IPs to look up assets for
+            
+        Returns:
+            Bundle with offense, notes, addresses, log_sources, rules, assets and errors
+        """
+        errors: Dict[str, str] = {}
+        
+        def collect(part: str, outcome: Tuple[bool, Any], default: Any) -> Any:
+            ok, value = outcome
+            if ok:
+                return value
+            errors[part] = str(value)
+            return default
+        
+        offense_outcome, notes, reasons, source_types = self._fan_out([
+            (self.get_offense_by_id, (offense_id,)),
+            (self.get_offense_notes, (offense_id,)),
+            (self.get_closing_reasons, ()),
+            (self.get_log_source_types, ()),
+        ])
+        ok, offense = offense_outcome
+        if not ok:
+            raise offense
+        notes = collect("notes", notes, [])
+        reasons = collect("closing_reasons", reasons, [])
+        source_types = collect("log_source_types", source_types, [])
+        
+        # IP -> asset IDs, with each asset kept once however many IPs it answers for
+        assets: Dict[str, Dict[str, Any]] = {}
+        assets_by_ip: Dict[str, List[Any]] = {}
+        
+        def lookup_assets(ip: str) -> None:
+            found = self.search_assets(ip)
+            for asset in found:
+                assets[str(asset.get("id"))] = asset
+            assets_by_ip[ip] = [asset.get("id") for asset in found]
+        
+        def ids_of(items: Any) -> List[int]:
+            ids = []
+            for item in items or []:
+                value = item.get("id") if isinstance(item, dict) else item
+                if value is not None:
+                    ids.append(int(value))
+            return ids
+        
+        source_ip = _as_ip(offense.get("offense_source"))
+        def resolve(resolver: Any, ids: List[int]) -> Dict[str, Any]:
+            failed: Dict[int, str] = {}
+            found = resolver(ids, failed)
+            return {
+                "results": {str(k): v for k, v in found.items()},
+                "errors": {
+                    str(i): (
+                        f"Unresolved: upstream error ({failed[i]})" if i in failed
+                        else "Not found"
+                    )
+                    for i in ids if i not in found
+                },
+            }
+        
+        # Addresses and log sources go through the resolver cache shared with enrich_offenses
+        parts = {
+            "source_addresses": (resolve, (
+                self.resolve_source_addresses, ids_of(offense.get("source_address_ids"))
+            )),
+            "local_destination_addresses": (resolve, (
+                self.resolve_local_destination_addresses,
+                ids_of(offense.get("local_destination_address_ids"))
+            )),
+            "log_sources": (resolve, (
+                self.resolve_log_sources, ids_of(offense.get("log_sources"))
+            )),
+            "rules": (self.get_rules_by_ids, (ids_of(offense.get("rules")),)),
+        }
+        # Parts whose ID list is empty need no request
+        calls = {name: call for name, call in parts.items() if call[1][-1]}
+        if source_ip and max_asset_ips > 0:
+            calls[f"assets:{source_ip}"] = (lookup_assets, (source_ip,))
+        
+        fetched: Dict[str, Dict[str, Any]] = {}
+        for name, outcome in zip(calls, self._fan_out(list(calls.values()))):
+            value = collect(name, outcome, None)
+            if name in parts and value is not None:
+                fetched[name] = value["results"]
+                if value["errors"]:
+                    errors[name] = "; ".join(f"{k}: {v}" for k, v in value["errors"].items())
+        
+        ips = [source_ip] if source_ip else []
+        for item in fetched.get("source_addresses", {}).values():
+            ips.append(_as_ip(item.get("source_ip")))
+        for item in fetched.get("local_destination_addresses", {}).values():
+            ips.append(_as_ip(item.get("local_destination_ip")))
+        ips = [ip for ip in dict.fromkeys(ips) if ip][:max_asset_ips]
+        pending = [ip for ip in ips if ip != source_ip]
+        for ip, outcome in zip(pending, self._fan_out([(lookup_assets, (ip,)) for ip in pending])):
+            collect(f"assets:{ip}", outcome, None)
+        
+        type_names = {t.get("id"): t.get("name") for t in source_types}
+        log_sources = [
+            {"type_name": type_names.get(log_source.get("type_id")), **log_source}
+            for log_source in fetched.get("log_sources", {}).values()
+        ]
+        
+        closing_reason = None
+        if offense.get("closing_reason_id") is not None:
+            closing_reason = next(
+                (r for r in reasons if r.get("id") == offense["closing_reason_id"]), None
+            )
+        
+        return {
+            "offense": offense,
+            "closing_reason": closing_reason,
+            "notes": notes,
+            "source_addresses": list(fetched.get("source_addresses", {}).values()),
+            "local_destination_addresses": list(
+                fetched.get("local_destination_addresses", {}).values()
+            ),
+            "log_sources": log_sources,
+            "rules": list(fetched.get("rules", {}).values()),
+            "assets": list(assets.values()),
+            "assets_by_ip": assets_by_ip,
+            "errors": errors,
+        }
+
+
+def _as_ip(value: Any) -> Optional[str]:
+    """Return value if it is an IP address, else None"""
+    try:
+        return str(ipaddress.ip_address(str(value).strip()))
+    except ValueError:
+        return None
@@ -0,0 +1,238 @@
+"""Client-side rate limiting and adaptive concurrency for QRadar API calls
+
+Every request passes two gates before it is sent:
+
+- a token bucket shared by the client caps the overall request rate
+  (off unless ``QRADAR_RATE_LIMIT`` is set);
+- an AIMD concurrency limit per endpoint class (the first path segment:
+  ``siem``, ``ariel``, ``config``, ...). The limit grows by one after a full
+  window of successful requests and is halved when the console pushes back
+  (429, 503 or a timeout). A ``Retry-After`` pauses the whole class until it
+  expires instead of letting every caller retry on its own schedule.
+
+Separately, the number of Ariel searches running at once (from create to
+results) is capped, since QRadar limits concurrent searches per user.
+
+Limits, in-flight counts, waits and throttles are exported through
+``src.metrics``.
+
+    QRADAR_RATE_LIMIT           Requests per second across the client (default: unlimited)
+    QRADAR_RATE_BURST           Token bucket size (default: one second of QRADAR_RATE_LIMIT)
+    QRADAR_CONCURRENCY          Starting concurrency per endpoint class (default: 8)
+    QRADAR_MAX_CONCURRENCY      Upper bound per endpoint class (default: 32)
+    QRADAR_ARIEL_MAX_SEARCHES   Ariel searches running at once (default: 5)
+
+Author: Ram Krishna Katakwar
+Version: 0.2.0
+License: MIT
+"""
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+from . import metrics
+
+# Statuses that mean "slow down" rather than "this request is wrong"
+THROTTLE_STATUSES = frozenset({429, 503})
+
+
+def endpoint_class(endpoint: str) -> str:
+    """
+    Group an API path by its first segment
+
+    Args:
+        endpoint: API endpoint path (e.g. "/siem/offenses/42")
+
+    Returns:
+        Endpoint class (e.g. "siem")
+    """
+    return endpoint.split("?", 1)[0].strip("/").split("/", 1)[0] or "root"
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header (delta-seconds or HTTP date)
+
+    Returns:
+        Seconds to wait, or None if the header is missing or malformed
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Thread-safe token bucket; callers reserve a token and sleep until it is due"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst if burst else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one token, blocking until it is available. Returns seconds waited"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class AdaptiveLimit:
+    """Additive-increase/multiplicative-decrease concurrency limit for one endpoint class"""
+
+    def __init__(
+        self,
+        name: str,
+        initial: int = 8,
+        minimum: int = 1,
+        maximum: int = 32,
+        decrease_factor: float = 0.5,
+        cooldown: float = 1.0
+    ):
+        self.name = name
+        self.minimum = minimum
+        self.maximum = max(minimum, maximum)
+        self.limit = float(min(max(initial, minimum), self.maximum))
+        self.decrease_factor = decrease_factor
+        # Requests already in flight when the console pushes back share one decrease
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+        self._publish()
+
+    def acquire(self) -> float:
+        """Wait for a free slot (and for any Retry-After pause). Returns seconds waited"""
+        start = time.monotonic()
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    self._cond.wait(self.paused_until - now)
+                elif self.in_flight >= int(self.limit):
+                    self._cond.wait()
+                else:
+                    break
+            self.in_flight += 1
+            self._publish()
+        return time.monotonic() - start
+
+    def release(self, outcome: str, retry_after: Optional[float] = None) -> None:
+        """
+        Return a slot and adjust the limit
+
+        Args:
+            outcome: "ok", "throttled" (429/503/timeout) or "error" (no adjustment)
+            retry_after: Seconds the console asked us to wait, if any
+        """
+        with self._cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if outcome == "ok":
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            elif outcome == "throttled":
+                if now - self._last_decrease >= self.cooldown:
+                    self.limit = max(self.minimum, self.limit * self.decrease_factor)
+                    self._last_decrease = now
+                if retry_after:
+                    self.paused_until = max(self.paused_until, now + retry_after)
+            self._publish()
+            self._cond.notify_all()
+
+    def _publish(self) -> None:
+        metrics.RATE_LIMIT_CONCURRENCY.set(int(self.limit), endpoint_class=self.name)
+        metrics.RATE_LIMIT_IN_FLIGHT.set(self.in_flight, endpoint_class=self.name)
+
+
+class RateLimiter:
+    """Token bucket plus one AdaptiveLimit per endpoint class"""
+
+    def __init__(
+        self,
+        rate: Optional[float] = None,
+        burst: Optional[float] = None,
+        initial_concurrency: int = 8,
+        max_concurrency: int = 32,
+        max_retries: int = 3,
+        backoff_factor: float = 1.0,
+        max_retry_after: float = 60.0
+    ):
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.initial_concurrency = initial_concurrency
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_retry_after = max_retry_after
+        self._limits: Dict[str, AdaptiveLimit] = {}
+        self._lock = threading.Lock()
+
+    def limit_for(self, klass: str) -> AdaptiveLimit:
+        with self._lock:
+            limit = self._limits.get(klass)
+            if limit is None:
+                limit = self._limits[klass] = AdaptiveLimit(
+                    klass, self.initial_concurrency, maximum=self.max_concurrency
+                )
+            return limit
+
+    def acquire(self, klass: str) -> None:
+        """Block until a request in this endpoint class may be sent"""
+        waited = self.limit_for(klass).acquire()
+        if self.bucket is not None:
+            waited += self.bucket.acquire()
+        metrics.RATE_LIMIT_WAIT.observe(waited, endpoint_class=klass)
+
+    def release(
+        self,
+        klass: str,
+        outcome: str,
+        reason: str = "",
+        retry_after: Optional[float] = None
+    ) -> None:
+        """Report how a request ended (see AdaptiveLimit.release)"""
+        if retry_after is not None:
+            retry_after = min(retry_after, self.max_retry_after)
+        if outcome == "throttled":
+            metrics.RATE_LIMIT_THROTTLED.inc(endpoint_class=klass, reason=reason)
+        self.limit_for(klass).release(outcome, retry_after)
+
+    def backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        """
+        Seconds a throttled request should sleep before its next attempt
+
+        A Retry-After already pauses the endpoint class, so no extra sleep is needed.
+        """
+        if retry_after is not None:
+            return 0.0
+        return self.backoff_factor * (2 ** attempt)
+
+
+def settings_from_env() -> Dict[str, Any]:
+    """Read QRADAR_RATE_LIMIT / QRADAR_*CONCURRENCY into QRadarClient keyword arguments"""
+    rate = os.getenv("QRADAR_RATE_LIMIT")
+    burst = os.getenv("QRADAR_RATE_BURST")
+    return {
+        "rate_limit": float(rate) if rate else None,
+        "rate_burst": float(burst) if burst else None,
+        "initial_concurrency": int(os.getenv("QRADAR_CONCURRENCY", "8")),
+        "max_concurrency": int(os.getenv("QRADAR_MAX_CONCURRENCY", "32")),
+        "ariel_max_searches": int(os.getenv("QRADAR_ARIEL_MAX_SEARCHES", "5")),
+    }
@@ -0,0 +1,367 @@
+"""Local membership index for reference sets
+
+Checking whether a few IOCs are in a threat-intel reference set used to mean
+downloading the whole set. This module keeps one index per reference set and
+answers membership from memory:
+
+- sets up to ``QRADAR_REFSET_EXACT_MAX`` elements are held as an exact hash
+  set;
+- larger sets are held as a bloom filter (about 2 bytes per element at the
+  default 0.1% false-positive rate, including room to grow). A "no" is final; a "maybe" is confirmed
+  with one filtered request per set (``value in (...)``) for all candidates.
+
+An index is downloaded once in pages, then kept current by fetching only
+elements whose ``last_seen`` is at or after the newest one already indexed.
+Deltas cannot see removals, so a set is downloaded again when its element
+count goes down and at least every ``QRADAR_REFSET_FULL_REFRESH`` seconds.
+Each sync builds a new index and swaps it in, so a check running at the same
+time keeps using the previous one.
+
+    QRADAR_REFSET_REFRESH               Seconds between delta syncs of a set (default: 300)
+    QRADAR_REFSET_FULL_REFRESH          Seconds between full downloads of a set (default: 86400)
+    QRADAR_REFSET_EXACT_MAX             Largest set indexed exactly (default: 200000)
+    QRADAR_REFSET_FALSE_POSITIVE_RATE   Bloom filter false-positive rate (default: 0.001)
+
+Author: Ram Krishna Katakwar
+Version: 0.2.0
+License: MIT
+"""
+import hashlib
+import json
+import logging
+import math
+import os
+import socket
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from . import tracing
+
+logger = logging.getLogger("qradar-mcp.refset_index")
+
+# Values per confirmation request for bloom filter hits
+CONFIRM_CHUNK = 50
+
+
+def normalize(value: Any, element_type: str) -> str:
+    """
+    Canonical form of a reference set value for comparison
+
+    IPs are compared by address (so "10.0.0.01" style variants do not matter)
+    and ALNIC ("alphanumeric ignore case") values case-insensitively.
+    """
+    text = str(value).strip()
+    if element_type == "IP":
+        for family in (socket.AF_INET, socket.AF_INET6):
+            try:
+                return socket.inet_ntop(family, socket.inet_pton(family, text))
+            except OSError:
+                pass
+        return text
+    if element_type == "ALNIC":
+        return text.lower()
+    return text
+
+
+class BloomFilter:
+    """Fixed-size bloom filter over strings (double hashing of one blake2b digest)"""
+
+    def __init__(self, capacity: int, false_positive_rate: float = 0.001):
+        self.capacity = max(1, capacity)
+        self.bits = max(64, int(-self.capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / self.capacity * math.log(2)))
+        self.count = 0
+        self._array = bytearray((self.bits + 7) // 8)
+
+    def _positions(self, value: str) -> Iterator[int]:
+        digest = hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.bits
+
+    def add(self, value: str) -> None:
+        for position in self._positions(value):
+            self._array[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value: str) -> bool:
+        return all(
+            self._array[position >> 3] & (1 << (position & 7))
+            for position in self._positions(value)
+        )
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self._array)
+
+    def copy(self) -> "BloomFilter":
+        clone = BloomFilter.__new__(BloomFilter)
+        clone.capacity, clone.bits, clone.hashes = self.capacity, self.bits, self.hashes
+        clone.count = self.count
+        clone._array = bytearray(self._array)
+        return clone
+
+
+class SetIndex:
+    """Immutable snapshot of one reference set's index"""
+
+    def __init__(
+        self,
+        name: str,
+        element_type: str,
+        members: Any,
+        number_of_elements: int,
+        max_last_seen: int,
+        built_at: float,
+        synced_at: float
+    ):
+        self.name = name
+        self.element_type = element_type
+        self.members = members  # Set[str] or BloomFilter
+        self.number_of_elements = number_of_elements
+        self.max_last_seen = max_last_seen
+        self.built_at = built_at
+        self.synced_at = synced_at
+
+    @property
+    def exact(self) -> bool:
+        return isinstance(self.members, set)
+
+    def describe(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        summary = {
+            "mode": "exact" if self.exact else "bloom",
+            "elements": self.number_of_elements,
+            "synced_seconds_ago": round(now - self.synced_at, 1),
+            "full_download_seconds_ago": round(now - self.built_at, 1),
+        }
+        if not self.exact:
+            summary["bloom_bytes"] = self.members.size_bytes
+        return summary
+
+
+class ReferenceSetIndex:
+    """Membership indexes for the reference sets of a QRadarClient"""
+
+    def __init__(
+        self,
+        client: Any,
+        refresh_seconds: float = 300.0,
+        full_refresh_seconds: float = 86400.0,
+        exact_max_elements: int = 200000,
+        false_positive_rate: float = 0.001,
+        page_size: int = 10000
+    ):
+        self.client = client
+        self.refresh_seconds = refresh_seconds
+        self.full_refresh_seconds = full_refresh_seconds
+        self.exact_max_elements = exact_max_elements
+        self.false_positive_rate = false_positive_rate
+        self.page_size = page_size
+        self._sets: Dict[str, SetIndex] = {}
+        # One sync at a time per set; checks only read the current snapshot
+        self._sync_locks: Dict[str, threading.Lock] = {}
+        self._invalidated: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def _sync_lock(self, name: str) -> threading.Lock:
+        with self._lock:
+            lock = self._sync_locks.get(name)
+            if lock is None:
+                lock = self._sync_locks[name] = threading.Lock()
+            return lock
+
+    def _pages(
+        self,
+        name: str,
+        filter_query: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Reference set responses, one per page of data elements"""
+        return self.client.iter_reference_set_pages(
+            name,
+            filter_query,
+            fields="name,element_type,number_of_elements,data(value,last_seen)",
+            page_size=self.page_size
+        )
+
+    def _full_sync(self, name: str) -> SetIndex:
+        """Download a whole set into a new index"""
+        with tracing.span("refset.full_sync", reference_set=name) as span:
+            members: Any = None
+            element_type, number_of_elements, max_last_seen = "ALNIC", 0, 0
+            for page in self._pages(name):
+                if members is None:
+                    element_type = page.get("element_type", "ALNIC")
+                    number_of_elements = page.get("number_of_elements") or 0
+                    if number_of_elements <= self.exact_max_elements:
+                        members = set()
+                    else:
+                        # Headroom for growth between full downloads
+                        members = BloomFilter(
+                            int(number_of_elements * 1.25), self.false_positive_rate
+                        )
+                for element in page.get("data") or []:
+                    members.add(normalize(element.get("value"), element_type))
+                    max_last_seen = max(max_last_seen, element.get("last_seen") or 0)
+            now = time.monotonic()
+            index = SetIndex(
+                name, element_type, members if members is not None else set(),
+                number_of_elements, max_last_seen, now, now
+            )
+            span.set_attribute("elements", index.number_of_elements)
+        logger.info(
+            f"Indexed reference set '{name}': {index.number_of_elements} elements "
+            f"({'exact' if index.exact else 'bloom filter'})"
+        )
+        return index
+
+    def _delta_sync(self, index: SetIndex) -> Optional[SetIndex]:
+        """
+        A copy of index with the elements seen since its last sync
+
+        Returns:
+            The new index, or None if a full download is needed
+        """
+        with tracing.span("refset.delta_sync", reference_set=index.name) as span:
+            added = 0
+            members = set(index.members) if index.exact else index.members.copy()
+            number_of_elements = index.number_of_elements
+            max_last_seen = index.max_last_seen
+            pages = self._pages(index.name, f"last_seen >= {index.max_last_seen}")
+            for number, page in enumerate(pages):
+                count = page.get("number_of_elements") or 0
+                if number == 0 and count < index.number_of_elements:
+                    # Elements were removed or expired; deltas cannot see that
+                    return None
+                number_of_elements = count
+                for element in page.get("data") or []:
+                    members.add(normalize(element.get("value"), index.element_type))
+                    max_last_seen = max(max_last_seen, element.get("last_seen") or 0)
+                    added += 1
+            if not index.exact and members.count > members.capacity:
+                return None
+            span.set_attribute("elements_added", added)
+        return SetIndex(
+            index.name, index.element_type, members, number_of_elements, max_last_seen,
+            index.built_at, time.monotonic()
+        )
+
+    def _sync(self, name: str) -> SetIndex:
+        """Bring one set's index up to date (downloading it on first use)"""
+        with self._sync_lock(name):
+            with self._lock:
+                index = self._sets.get(name)
+                invalidated = name in self._invalidated
+                # Values added from here on are picked up by the next sync
+                self._invalidated.discard(name)
+            now = time.monotonic()
+            try:
+                if index is None or now - index.built_at >= self.full_refresh_seconds:
+                    index = self._full_sync(name)
+                elif invalidated or now - index.synced_at >= self.refresh_seconds:
+                    index = self._delta_sync(index) or self._full_sync(name)
+                else:
+                    return index
+            except Exception:
+                if invalidated:
+                    with self._lock:
+                        self._invalidated.add(name)
+                raise
+            with self._lock:
+                self._sets[name] = index
+        return index
+
+    def invalidate(self, name: str) -> None:
+        """Make the next check delta-sync a set (e.g. after values were added to it)"""
+        with self._lock:
+            if name in self._sets:
+                self._invalidated.add(name)
+
+    def _confirm(self, index: SetIndex, candidates: List[str]) -> Set[str]:
+        """Ask QRadar which bloom filter hits are really in the set"""
+        found: Set[str] = set()
+        for i in range(0, len(candidates), CONFIRM_CHUNK):
+            chunk = candidates[i:i + CONFIRM_CHUNK]
+            quoted = ",".join(json.dumps(value) for value in chunk)
+            page = self.client.get_reference_set_data(
+                index.name, filter_query=f"value in ({quoted})", fields="data(value)"
+            )
+            found.update(
+                normalize(element.get("value"), index.element_type)
+                for element in page.get("data") or []
+            )
+        return found
+
+    def check(self, values: List[str], set_names: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """
+        Check many values against many reference sets
+
+        Sets are synced and bloom filter hits confirmed concurrently; the
+        membership tests themselves are local.
+
+        Args:
+            values: Values to look for (IPs, domains, hashes, ...)
+            set_names: Reference sets to check (default: all)
+
+        Returns:
+            {"matches": {value: [set names]}, "sets": {name: index summary},
+             "errors": {name: message}}
+        """
+        if set_names is None:
+            set_names = [s.get("name") for s in self.client.get_reference_sets()]
+        names = list(dict.fromkeys(n for n in set_names if n))
+        values = list(dict.fromkeys(values))
+
+        hits: Dict[str, List[str]] = {}
+        sets: Dict[str, Any] = {}
+        errors: Dict[str, str] = {}
+        # Sets of the same element type share one normalization of the values
+        keys_by_type: Dict[str, Dict[str, List[str]]] = {}
+        indexes: Dict[str, SetIndex] = {}
+        outcomes = self.client._fan_out([(self._sync, (n,)) for n in names])
+        for name, (ok, value) in zip(names, outcomes):
+            if not ok:
+                errors[name] = str(value)
+                continue
+            index = indexes[name] = value
+            if index.element_type not in keys_by_type:
+                by_key: Dict[str, List[str]] = {}
+                for item in values:
+                    by_key.setdefault(normalize(item, index.element_type), []).append(item)
+                keys_by_type[index.element_type] = by_key
+            hits[name] = [key for key in keys_by_type[index.element_type] if key in index.members]
+            sets[name] = index.describe()
+
+        unconfirmed = [name for name in hits if not indexes[name].exact and hits[name]]
+        outcomes = self.client._fan_out([
+            (self._confirm, (indexes[name], hits[name])) for name in unconfirmed
+        ])
+        for name, (ok, value) in zip(unconfirmed, outcomes):
+            sets[name]["bloom_candidates"] = len(hits[name])
+            if ok:
+                hits[name] = [key for key in hits[name] if key in value]
+            else:
+                errors[name] = f"Could not confirm bloom filter matches: {value}"
+                del hits[name]
+
+        matches: Dict[str, List[str]] = {}
+        for name, keys in hits.items():
+            by_key = keys_by_type[indexes[name].element_type]
+            for key in keys:
+                for item in by_key[key]:
+                    matches.setdefault(item, []).append(name)
+        return {"matches": matches, "sets": sets, "errors": errors}
+
+
+def settings_from_env() -> Dict[str, Any]:
+    """Read QRADAR_REFSET_* into QRadarClient keyword arguments"""
+    return {
+        "refset_refresh": float(os.getenv("QRADAR_REFSET_REFRESH", "300")),
+        "refset_full_refresh": float(os.getenv("QRADAR_REFSET_FULL_REFRESH", "86400")),
+        "refset_exact_max": int(os.getenv("QRADAR_REFSET_EXACT_MAX", "200000")),
+        "refset_false_positive_rate": float(
+            os.getenv("QRADAR_REFSET_FALSE_POSITIVE_RATE", "0.001")
+        ),
+    }
@@ -0,0 +1,539 @@
+"""Local dependency graph of rules and building blocks
+
+``get_rules`` and ``get_building_blocks`` return flat lists without rule
+tests, so "which rules use this building block" used to mean asking QRadar
+about each rule in turn. This module keeps a graph of rules and building
+blocks and answers dependency, reverse-dependency and search queries from
+memory:
+
+- nodes are the rules and building blocks (name, type, enabled, origin,
+  owner, modification date); an OVERRIDE rule is linked to the rule it
+  overrides through ``linked_rule_identifier``;
+- edges come from QRadar's dependents tasks
+  (``/analytics/rules/{id}/dependents``), which list what uses a rule or
+  building block in its tests. One task runs per node, a few at a time.
+
+The first build runs in the background; until it finishes, queries answer
+with a "building" status and no results.
+
+Every ``QRADAR_RULE_GRAPH_REFRESH`` seconds the IDs and ``modification_date``
+of all rules and building blocks are listed in the background. Only new or
+modified nodes are downloaded again and deleted ones are dropped. Checking an
+unchanged rule base costs two small requests, but any added or modified rule
+costs a full rescan (one dependents task per node), because a changed rule
+may have started using any other rule. Checks never overlap and run at most
+once per interval, so a burst of edits costs one rescan, not one per edit.
+
+A node whose dependents task failed keeps its previous results, if any, and
+is listed as unscanned: nothing can be said about what uses it, so it is
+left out of searches for unused nodes, and its task is retried on the next
+check even when nothing changed.
+
+The graph is saved to ``QRADAR_RULE_GRAPH_PATH`` after every change and
+loaded from there on the next start, so a restart only rescans a rule base
+that changed in the meantime.
+
+Rule tests themselves (QIDs, categories, properties) are not exposed by the
+REST API, so the graph cannot say which rules match a particular QID.
+
+    QRADAR_RULE_GRAPH_REFRESH       Seconds between change checks (default: 600)
+    QRADAR_RULE_GRAPH_CONCURRENCY   Dependents tasks run at once (default: 4)
+    QRADAR_RULE_GRAPH_PATH          Saved graph (default: ~/.cache/qradar-mcp/rule-graph.json.gz)
+
+Author: Ram Krishna Katakwar
+Version: 0.2.0
+License: MIT
+"""
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from . import tracing
+
+logger = logging.getLogger("qradar-mcp.rule_graph")
+
+# Node kind -> collection endpoint
+COLLECTIONS = {"rule": "/analytics/rules", "building_block": "/analytics/building_blocks"}
+# Fields kept for each node
+NODE_FIELDS = (
+    "id,name,type,enabled,origin,owner,identifier,linked_rule_identifier,modification_date"
+)
+# Wait before retrying a check that failed
+RETRY_SECONDS = 60.0
+# Saved graph layout; files with another version are ignored
+FORMAT_VERSION = 1
+# Deepest walk through dependencies
+MAX_DEPTH = 10
+# Unscanned node IDs listed in a query's graph status (the rest are only counted)
+MAX_REPORTED_UNSCANNED = 100
+
+
+def default_path() -> str:
+    base = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "qradar-mcp", "rule-graph.json.gz")
+
+
+def _as_int(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def compact(item: Dict[str, Any], kind: str) -> Dict[str, Any]:
+    """The graph node for a rule or building block as returned by the API"""
+    return {
+        "id": item.get("id"),
+        "kind": kind,
+        "name": item.get("name") or "",
+        "type": item.get("type"),
+        "enabled": item.get("enabled"),
+        "origin": item.get("origin"),
+        "owner": item.get("owner"),
+        "identifier": item.get("identifier"),
+        "linked_rule_identifier": item.get("linked_rule_identifier"),
+        "modification_date": item.get("modification_date") or 0,
+    }
+
+
+class RuleGraph:
+    """Immutable snapshot of the rules, building blocks and who uses what"""
+
+    def __init__(
+        self,
+        nodes: Dict[int, Dict[str, Any]],
+        dependents: Dict[int, List[Dict[str, Any]]],
+        scanned_at: float,
+        unscanned: Iterable[int] = ()
+    ):
+        self.nodes = nodes
+        self.dependents = dependents  # node -> its dependents task results
+        self.scanned_at = scanned_at
+        # Nodes whose latest dependents task failed
+        self.unscanned = frozenset(unscanned)
+
+        self.used_by: Dict[int, List[int]] = {}
+        self.uses: Dict[int, List[int]] = {}
+        # Dependents that are not rules, e.g. saved searches
+        self.other_dependents: Dict[int, List[Dict[str, Any]]] = {}
+        for node_id, entries in dependents.items():
+            for entry in entries:
+                user = _as_int(entry.get("id"))
+                is_rule = entry.get("dependent_type") in ("RULE", "BUILDING_BLOCK", None)
+                if is_rule and user in nodes:
+                    self.used_by.setdefault(node_id, []).append(user)
+                    self.uses.setdefault(user, []).append(node_id)
+                else:
+                    self.other_dependents.setdefault(node_id, []).append(entry)
+
+        by_identifier = {n["identifier"]: i for i, n in nodes.items() if n.get("identifier")}
+        self.overrides: Dict[int, int] = {}
+        self.overridden_by: Dict[int, List[int]] = {}
+        for node_id, node in nodes.items():
+            target = by_identifier.get(node.get("linked_rule_identifier"))
+            if target is not None and target != node_id:
+                self.overrides[node_id] = target
+                self.overridden_by.setdefault(target, []).append(node_id)
+
+    @property
+    def size(self) -> int:
+        return len(self.nodes)
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "nodes": list(self.nodes.values()),
+            "dependents": {str(k): v for k, v in self.dependents.items()},
+            "scanned_at": self.scanned_at,
+            "unscanned": sorted(self.unscanned),
+        }
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "RuleGraph":
+        return cls(
+            {node["id"]: node for node in data["nodes"]},
+            {int(k): v for k, v in data["dependents"].items()},
+            data["scanned_at"],
+            data.get("unscanned", ())
+        )
+
+    def describe(self, node_id: int) -> Dict[str, Any]:
+        node = self.nodes[node_id]
+        summary = {
+            k: v for k, v in node.items() if k not in ("identifier", "linked_rule_identifier")
+        }
+        summary["uses"] = len(self.uses.get(node_id, ()))
+        summary["used_by"] = len(self.used_by.get(node_id, ()))
+        if node_id in self.overrides:
+            summary["overrides"] = self.overrides[node_id]
+        if node_id in self.overridden_by:
+            summary["overridden_by"] = self.overridden_by[node_id]
+        if node_id in self.unscanned:
+            summary["unscanned"] = True
+        return summary
+
+    def _walk(
+        self,
+        start: int,
+        edges: Dict[int, List[int]],
+        max_depth: int
+    ) -> List[Dict[str, Any]]:
+        """Nodes reachable from start, breadth first, each with its distance"""
+        seen = {start}
+        frontier = [start]
+        found: List[Dict[str, Any]] = []
+        for depth in range(1, max_depth + 1):
+            following = []
+            for node_id in frontier:
+                for neighbour in edges.get(node_id, ()):
+                    if neighbour not in seen:
+                        seen.add(neighbour)
+                        following.append(neighbour)
+                        found.append({**self.describe(neighbour), "depth": depth})
+            if not following:
+                break
+            frontier = following
+        return found
+
+    def dependencies(
+        self,
+        node_id: int,
+        direction: str = "both",
+        max_depth: int = 1
+    ) -> Dict[str, Any]:
+        """
+        What a rule or building block uses and what uses it
+
+        Args:
+            node_id: Rule or building block ID
+            direction: "uses", "used_by" or "both"
+            max_depth: Levels to follow (1: direct neighbours only)
+
+        Returns:
+            {"node": ..., "uses": [...], "used_by": [...], "other_dependents": [...]}
+            with each listed node's depth
+        """
+        if node_id not in self.nodes:
+            raise ValueError(f"Rule or building block {node_id} not found")
+        result: Dict[str, Any] = {"node": self.describe(node_id)}
+        if direction in ("uses", "both"):
+            result["uses"] = self._walk(node_id, self.uses, max_depth)
+        if direction in ("used_by", "both"):
+            used_by = self._walk(node_id, self.used_by, max_depth)
+            result["used_by"] = used_by
+            result["enabled_rules_affected"] = sum(
+                1 for n in used_by if n["kind"] == "rule" and n["enabled"]
+            )
+            result["other_dependents"] = self.other_dependents.get(node_id, [])
+        return result
+
+    def search(
+        self,
+        query: Optional[str] = None,
+        kind: Optional[str] = None,
+        rule_type: Optional[str] = None,
+        enabled: Optional[bool] = None,
+        origin: Optional[str] = None,
+        unused: Optional[bool] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Rules and building blocks matching all given criteria, by name
+
+        Args:
+            query: Case-insensitive substring of the name, or an exact ID
+            kind: "rule" or "building_block"
+            rule_type: EVENT, FLOW, COMMON or OFFENSE
+            enabled: Enabled state
+            origin: SYSTEM, OVERRIDE or USER
+            unused: True for nodes nothing uses, False for nodes something uses
+                (unscanned nodes match neither)
+        """
+        text = (query or "").strip().lower()
+        matches = []
+        for node_id, node in self.nodes.items():
+            if text and text not in node["name"].lower() and text != str(node_id):
+                continue
+            if kind is not None and node["kind"] != kind:
+                continue
+            if rule_type is not None and node["type"] != rule_type:
+                continue
+            if enabled is not None and node["enabled"] != enabled:
+                continue
+            if origin is not None and node["origin"] != origin:
+                continue
+            if unused is not None:
+                if node_id in self.unscanned:
+                    continue
+                used = node_id in self.used_by or node_id in self.other_dependents
+                if used == unused:
+                    continue
+            matches.append(node_id)
+        matches.sort(key=lambda i: (self.nodes[i]["name"].lower(), i))
+        return [self.describe(i) for i in matches]
+
+
+class RuleGraphIndex:
+    """Rule dependency graph for a QRadarClient"""
+
+    def __init__(
+        self,
+        client: Any,
+        refresh_seconds: float = 600.0,
+        concurrency: int = 4,
+        path: Optional[str] = None
+    ):
+        self.client = client
+        self.refresh_seconds = refresh_seconds
+        self.concurrency = max(1, concurrency)
+        self.path = os.path.expanduser(path or default_path())
+        self._graph: Optional[RuleGraph] = None
+        self._loaded = False
+        self._checked_at: Optional[float] = None
+        self._error: Optional[str] = None
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    def _list(self, kind: str, fields: str) -> List[Dict[str, Any]]:
+        if kind == "rule":
+            return self.client.get_rules(fields=fields)
+        return self.client.get_building_blocks(fields=fields)
+
+    def _load(self) -> Optional[RuleGraph]:
+        """The saved graph of this console, if there is one"""
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable rule graph {self.path}: {e}")
+            return None
+        if data.get("version") != FORMAT_VERSION or data.get("host") != self.client.host:
+            return None
+        return RuleGraph.from_json(data)
+
+    def _save(self, graph: RuleGraph) -> None:
+        data = {"version": FORMAT_VERSION, "host": self.client.host, **graph.to_json()}
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            temp = f"{self.path}.{os.getpid()}.tmp"
+            with gzip.open(temp, "wt", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(temp, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save rule graph to {self.path}: {e}")
+
+    def _scan(
+        self,
+        nodes: Dict[int, Dict[str, Any]],
+        previous: Dict[int, List[Dict[str, Any]]]
+    ) -> Tuple[Dict[int, List[Dict[str, Any]]], Set[int]]:
+        """
+        Run the dependents tasks of nodes
+
+        Returns:
+            (dependents of each node, IDs of nodes whose task failed); a
+            failed node keeps its results from previous, if it had any
+        """
+        items = list(nodes.values())
+        with tracing.span("rule_graph.scan", nodes=len(items)) as span:
+            outcomes = self.client._map_bounded(
+                lambda node: self.client.find_rule_dependents(
+                    node["id"], node["kind"] == "building_block"
+                ),
+                items,
+                self.concurrency
+            )
+            dependents: Dict[int, List[Dict[str, Any]]] = {}
+            failed: Set[int] = set()
+            for node, (ok, value) in zip(items, outcomes):
+                if ok:
+                    dependents[node["id"]] = value
+                else:
+                    failed.add(node["id"])
+                    if node["id"] in previous:
+                        dependents[node["id"]] = previous[node["id"]]
+            span.set_attribute("failed", len(failed))
+        if failed:
+            logger.warning(
+                f"Dependents of {len(failed)} of {len(items)} rules could not be read; "
+                f"retrying them on the next check"
+            )
+        return dependents, failed
+
+    def _sync(self) -> RuleGraph:
+        """Bring the graph up to date, rescanning dependents only after changes"""
+        graph = self._graph
+        start = time.perf_counter()
+        with tracing.span("rule_graph.sync") as span:
+            # A first build lists everything; later checks only IDs and dates
+            listed = {
+                kind: self._list(kind, NODE_FIELDS if graph is None else "id,modification_date")
+                for kind in COLLECTIONS
+            }
+            listing: Dict[int, Tuple[str, int]] = {}
+            for kind, items in listed.items():
+                for item in items:
+                    listing[item["id"]] = (kind, item.get("modification_date") or 0)
+
+            old = graph.nodes if graph is not None else {}
+            changed: Dict[str, List[int]] = {kind: [] for kind in COLLECTIONS}
+            for node_id, (kind, modified) in listing.items():
+                node = old.get(node_id)
+                if node is None or node["kind"] != kind or node["modification_date"] != modified:
+                    changed[kind].append(node_id)
+            removed = {node_id for node_id in old if node_id not in listing}
+            changed_count = sum(len(ids) for ids in changed.values())
+            retry = graph.unscanned - removed if graph is not None else frozenset()
+            span.set_attribute("changed", changed_count)
+            span.set_attribute("removed", len(removed))
+            span.set_attribute("retried", len(retry))
+            if graph is not None and not changed_count and not removed and not retry:
+                return graph
+
+            nodes = {node_id: node for node_id, node in old.items() if node_id not in removed}
+            for kind, ids in changed.items():
+                if not ids:
+                    continue
+                if graph is None:
+                    items = listed[kind]
+                else:
+                    # Nodes that vanished in between are picked up by the next check
+                    fetched = self.client._get_by_ids(COLLECTIONS[kind], ids, NODE_FIELDS)
+                    items = list(fetched["results"].values())
+                for item in items:
+                    nodes[item["id"]] = compact(item, kind)
+
+            previous = graph.dependents if graph is not None else {}
+            if changed_count:
+                dependents, unscanned = self._scan(nodes, previous)
+                scanned_at = time.time()
+            else:
+                dependents = {
+                    node_id: [e for e in entries if _as_int(e.get("id")) not in removed]
+                    for node_id, entries in previous.items() if node_id in nodes
+                }
+                unscanned = set()
+                if retry:
+                    # Nothing else changed, so only the failed tasks need to run again
+                    retried, unscanned = self._scan(
+                        {node_id: nodes[node_id] for node_id in retry}, dependents
+                    )
+                    dependents.update(retried)
+                scanned_at = graph.scanned_at
+            graph = RuleGraph(nodes, dependents, scanned_at, unscanned)
+            span.set_attribute("nodes", graph.size)
+        self._save(graph)
+        logger.info(
+            f"Updated rule graph: {graph.size} rules and building blocks, "
+            f"{changed_count} changed, {len(removed)} removed, {len(retry)} retried, "
+            f"{len(unscanned)} unscanned ({time.perf_counter() - start:.1f}s)"
+        )
+        return graph
+
+    def _refresh(self) -> None:
+        try:
+            graph = self._sync()
+            with self._lock:
+                self._graph, self._checked_at, self._error = graph, time.monotonic(), None
+        except Exception as e:
+            logger.warning(f"Rule graph refresh failed, keeping previous graph: {e}")
+            with self._lock:
+                self._error = str(e)
+                # Try again after RETRY_SECONDS rather than on every query
+                self._checked_at = time.monotonic() - self.refresh_seconds + RETRY_SECONDS
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _start_refresh(self) -> None:
+        """Check for changes in the background unless that is running (hold _lock)"""
+        if not self._refreshing:
+            self._refreshing = True
+            threading.Thread(target=self._refresh, name="qradar-rule-graph", daemon=True).start()
+
+    def graph(self) -> Tuple[Optional[RuleGraph], Optional[float]]:
+        """
+        The current graph and seconds since it was last checked
+
+        Returns:
+            (graph, age); the graph is None while the first one is built and
+            the age is None until the graph has been checked against QRadar
+        """
+        if not self._loaded:
+            # First use: load the saved graph once, however many callers are waiting
+            with self._build_lock:
+                if not self._loaded:
+                    graph = self._load()
+                    if graph is not None:
+                        logger.info(f"Loaded rule graph with {graph.size} nodes from {self.path}")
+                    with self._lock:
+                        self._graph, self._loaded = graph, True
+        with self._lock:
+            graph, checked_at = self._graph, self._checked_at
+            # A loaded graph is served while it is checked; without one, the
+            # first build starts here and queries say so until it is done
+            if checked_at is None or time.monotonic() - checked_at >= self.refresh_seconds:
+                self._start_refresh()
+        return graph, time.monotonic() - checked_at if checked_at is not None else None
+
+    def _status(self, graph: Optional[RuleGraph], age: Optional[float]) -> Dict[str, Any]:
+        if graph is None:
+            with self._lock:
+                error = self._error
+            status: Dict[str, Any] = {
+                "status": "building",
+                "message": "The rule graph is being built for the first time; try again shortly",
+            }
+            if error:
+                status["last_error"] = error
+            return status
+        return {
+            "status": "ready",
+            "nodes": graph.size,
+            "checked_seconds_ago": round(age, 1) if age is not None else None,
+            "scanned_seconds_ago": round(time.time() - graph.scanned_at, 1),
+            "unscanned_count": len(graph.unscanned),
+            "unscanned": sorted(graph.unscanned)[:MAX_REPORTED_UNSCANNED],
+        }
+
+    def dependencies(
+        self,
+        node_id: int,
+        direction: str = "both",
+        max_depth: int = 1
+    ) -> Dict[str, Any]:
+        """See RuleGraph.dependencies; adds the graph's age"""
+        if direction not in ("uses", "used_by", "both"):
+            raise ValueError("direction must be 'uses', 'used_by' or 'both'")
+        if not 1 <= max_depth <= MAX_DEPTH:
+            raise ValueError(f"max_depth must be between 1 and {MAX_DEPTH}")
+        graph, age = self.graph()
+        if graph is None:
+            return {"node": None, "graph": self._status(graph, age)}
+        result = graph.dependencies(node_id, direction, max_depth)
+        result["graph"] = self._status(graph, age)
+        return result
+
+    def search(self, limit: int = 100, **criteria: Any) -> Dict[str, Any]:
+        """See RuleGraph.search; returns at most limit matches and the total"""
+        graph, age = self.graph()
+        matches = graph.search(**criteria) if graph is not None else []
+        return {
+            "total": len(matches),
+            "results": matches[:max(0, limit)],
+            "graph": self._status(graph, age),
+        }
+
+
+def settings_from_env() -> Dict[str, Any]:
+    """Read QRADAR_RULE_GRAPH_* into QRadarClient keyword arguments"""
+    return {
+        "rule_graph_refresh": float(os.getenv("QRADAR_RULE_GRAPH_REFRESH", "600")),
+        "rule_graph_concurrency": int(os.getenv("QRADAR_RULE_GRAPH_CONCURRENCY", "4")),
+        "rule_graph_path": os.getenv("QRADAR_RULE_GRAPH_PATH") or None,
+    }
@@ -0,0 +1,479 @@
+"""Materialized saved-search and AQL results refreshed on a cron schedule
+
+The same heavy saved searches get run by every analyst several times a day.
+Jobs listed in ``QRADAR_SCHEDULE_FILE`` are run in the background on a
+cron cadence and their latest results are kept in a SQLite database (WAL
+mode, shared by every server process on the host):
+
+    [
+      {"name": "failed-logins", "saved_search_id": "12", "cron": "*/15 * * * *"},
+      {"name": "top-talkers", "database": "flows", "cron": "0 * * * *",
+       "aql": "SELECT sourceip, SUM(bytes) FROM flows GROUP BY sourceip LAST 1 HOURS"}
+    ]
+
+Cron expressions have five fields (minute hour day-of-month month
+day-of-week, local time) with ``*``, lists, ranges and ``/step``, or one of
+``@hourly``, ``@daily``, ``@weekly``, ``@monthly``. Each process runs the
+scheduler, but a run is claimed per job and cron slot in the database, so
+only one process queries QRadar for it. Jobs without a stored result run
+at startup.
+
+``execute_saved_search`` serves a scheduled saved search from its stored
+result while that is younger than ``QRADAR_MATERIALIZED_MAX_AGE``. Results
+are stored per console and per hash of the API token, so processes talking
+to another console, or with a token of different scope, never share them.
+
+    QRADAR_SCHEDULE_FILE           JSON list of jobs (default: unset, scheduler off)
+    QRADAR_SCHEDULE_DB             Results database
+                                   (default: ~/.cache/qradar-mcp/materialized.sqlite3)
+    QRADAR_MATERIALIZED_MAX_AGE    Oldest stored result used for saved searches, in
+                                   seconds (default: 900)
+
+Author: Ram Krishna Katakwar
+Version: 0.2.0
+License: MIT
+"""
+import hashlib
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, FrozenSet, List, Optional
+
+from . import tracing
+
+logger = logging.getLogger("qradar-mcp.scheduler")
+
+# Longest the scheduler thread sleeps before re-checking its jobs
+MAX_SLEEP_SECONDS = 60
+# Wait before retrying a scheduler pass that failed (e.g. database locked or unreadable)
+RETRY_SECONDS = 30.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS materialized (
+    name TEXT NOT NULL,
+    console TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    saved_search_id TEXT,
+    slot REAL NOT NULL DEFAULT 0,
+    claimed_by TEXT,
+    result BLOB,
+    record_count INTEGER,
+    started_at REAL,
+    finished_at REAL,
+    error TEXT,
+    failed_at REAL,
+    PRIMARY KEY (name, console, scope)
+)
+"""
+
+
+def default_path() -> str:
+    base = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "qradar-mcp", "materialized.sqlite3")
+
+
+def _iso(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp).isoformat(timespec="seconds") if timestamp else None
+
+
+class CronSchedule:
+    """Five-field cron expression (minute hour day-of-month month day-of-week)"""
+
+    ALIASES = {
+        "@hourly": "0 * * * *",
+        "@daily": "0 0 * * *",
+        "@weekly": "0 0 * * 0",
+        "@monthly": "0 0 1 * *",
+    }
+    FIELDS = (("minute", 0, 59), ("hour", 0, 23), ("day-of-month", 1, 31),
+              ("month", 1, 12), ("day-of-week", 0, 7))
+
+    def __init__(self, expression: str):
+        self.expression = expression.strip()
+        parts = self.ALIASES.get(self.expression, self.expression).split()
+        if len(parts) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression!r}")
+        minutes, hours, days, months, weekdays = (
+            self._parse(part, *field) for part, field in zip(parts, self.FIELDS)
+        )
+        self.minutes, self.hours, self.days, self.months = minutes, hours, days, months
+        self.weekdays = frozenset(d % 7 for d in weekdays)  # 0 and 7 are both Sunday
+        # As in cron: when both day fields are restricted, either may match
+        self.either_day = parts[2] != "*" and parts[4] != "*"
+
+    @staticmethod
+    def _parse(field: str, name: str, low: int, high: int) -> FrozenSet[int]:
+        values = set()
+        try:
+            for item in field.split(","):
+                body, _, step = item.partition("/")
+                every = int(step) if step else 1
+                if body == "*":
+                    start, end = low, high
+                elif "-" in body:
+                    start, end = (int(v) for v in body.split("-", 1))
+                else:
+                    start = int(body)
+                    end = high if step else start
+                if every < 1 or start < low or end > high or start > end:
+                    raise ValueError
+                values.update(range(start, end + 1, every))
+        except ValueError:
+            raise ValueError(f"Invalid cron {name} field: {field!r}") from None
+        return frozenset(values)
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day = moment.day in self.days
+        weekday = moment.isoweekday() % 7 in self.weekdays
+        return (day or weekday) if self.either_day else (day and weekday)
+
+    def next_after(self, moment: datetime) -> datetime:
+        """First matching minute strictly after moment"""
+        t = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = t + timedelta(days=5 * 366)
+        while t <= limit:
+            if t.month not in self.months:
+                t = (t.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(t):
+                t = t.replace(hour=0, minute=0) + timedelta(days=1)
+            elif t.hour not in self.hours:
+                t = t.replace(minute=0) + timedelta(hours=1)
+            elif t.minute not in self.minutes:
+                t += timedelta(minutes=1)
+            else:
+                return t
+        raise ValueError(f"Cron expression never fires: {self.expression!r}")
+
+
+class Job:
+    """One scheduled saved search or AQL query"""
+
+    def __init__(self, spec: Dict[str, Any]):
+        self.name = str(spec.get("name") or "").strip()
+        if not self.name:
+            raise ValueError(f"Scheduled job needs a name: {spec}")
+        saved_search_id = spec.get("saved_search_id")
+        self.saved_search_id = str(saved_search_id) if saved_search_id is not None else None
+        self.aql = spec.get("aql")
+        if bool(self.saved_search_id) == bool(self.aql):
+            raise ValueError(f"Job '{self.name}' needs exactly one of saved_search_id or aql")
+        self.database = str(spec.get("database", "events")).lower()
+        self.max_wait = int(spec.get("max_wait", 300))
+        self.schedule = CronSchedule(spec.get("cron", ""))
+
+    def describe(self) -> Dict[str, Any]:
+        summary = {"name": self.name, "cron": self.schedule.expression}
+        if self.saved_search_id:
+            summary["saved_search_id"] = self.saved_search_id
+        else:
+            summary["aql"] = self.aql
+            summary["database"] = self.database
+        return summary
+
+
+def load_jobs(path: str) -> List[Job]:
+    """Jobs from a JSON file holding a list (or {"jobs": [...]})"""
+    with open(os.path.expanduser(path), encoding="utf-8") as f:
+        specs = json.load(f)
+    if isinstance(specs, dict):
+        specs = specs.get("jobs", [])
+    jobs = [Job(spec) for spec in specs]
+    names = [job.name for job in jobs]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate scheduled job names: {', '.join(duplicates)}")
+    return jobs
+
+
+class ResultStore:
+    """Latest result per job, console and API token, in SQLite shared between processes"""
+
+    def __init__(self, path: str, console: str, api_token: str):
+        self.path = path
+        self.console = console
+        self.scope = hashlib.sha256(api_token.encode("utf-8")).hexdigest()[:16]
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connect()
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(materialized)")}
+        if columns and "console" not in columns:
+            # Results from before they were scoped cannot be attributed; rerun the jobs
+            conn.execute("DROP TABLE materialized")
+        conn.execute(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    def register(self, job: Job) -> None:
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR IGNORE INTO materialized (name, console, scope) VALUES (?, ?, ?)",
+            (job.name, self.console, self.scope),
+        )
+        conn.execute(
+            "UPDATE materialized SET saved_search_id = ? WHERE name = ? AND console = ? "
+            "AND scope = ?",
+            (job.saved_search_id, job.name, self.console, self.scope),
+        )
+
+    def claim(self, name: str, slot: float, owner: str) -> bool:
+        """Take the run for a cron slot unless another process already has it"""
+        cursor = self._connect().execute(
+            "UPDATE materialized SET slot = ?, claimed_by = ? WHERE name = ? AND console = ? "
+            "AND scope = ? AND slot < ?",
+            (slot, owner, name, self.console, self.scope, slot),
+        )
+        return cursor.rowcount == 1
+
+    def save(self, name: str, result: Any, started_at: float, finished_at: float) -> None:
+        blob = zlib.compress(json.dumps(result, default=str).encode("utf-8"))
+        count = result.get("record_count") if isinstance(result, dict) else None
+        self._connect().execute(
+            "UPDATE materialized SET result = ?, record_count = ?, started_at = ?, "
+            "finished_at = ?, error = NULL, failed_at = NULL WHERE name = ? AND console = ? "
+            "AND scope = ?",
+            (blob, count, started_at, finished_at, name, self.console, self.scope),
+        )
+
+    def fail(self, name: str, error: str, failed_at: float) -> None:
+        self._connect().execute(
+            "UPDATE materialized SET error = ?, failed_at = ? WHERE name = ? AND console = ? "
+            "AND scope = ?",
+            (error, failed_at, name, self.console, self.scope),
+        )
+
+    def status(self, name: str) -> Optional[Dict[str, Any]]:
+        """Run bookkeeping for a job, without its result"""
+        row = self._connect().execute(
+            "SELECT record_count, started_at, finished_at, error, failed_at "
+            "FROM materialized WHERE name = ? AND console = ? AND scope = ?",
+            (name, self.console, self.scope),
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("record_count", "started_at", "finished_at", "error", "failed_at"), row))
+
+    def result(self, name: str) -> Optional[Any]:
+        row = self._connect().execute(
+            "SELECT result FROM materialized WHERE name = ? AND console = ? AND scope = ?",
+            (name, self.console, self.scope),
+        ).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return json.loads(zlib.decompress(row[0]))
+
+    def job_for_saved_search(self, saved_search_id: str) -> Optional[str]:
+        """Job whose stored result for a saved search is newest"""
+        row = self._connect().execute(
+            "SELECT name FROM materialized WHERE saved_search_id = ? AND console = ? "
+            "AND scope = ? AND result IS NOT NULL ORDER BY finished_at DESC LIMIT 1",
+            (saved_search_id, self.console, self.scope),
+        ).fetchone()
+        return row[0] if row else None
+
+
+class Scheduler:
+    """Runs jobs on their cron schedule and serves their stored results"""
+
+    def __init__(self, client: Any, jobs: List[Job], store: ResultStore):
+        self.client = client
+        self.jobs = {job.name: job for job in jobs}
+        self.store = store
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._next_runs: Dict[str, datetime] = {}
+        self._running: set = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        for job in jobs:
+            store.register(job)
+
+    def start(self) -> None:
+        """Start the scheduler thread (once)"""
+        with self._lock:
+            if self._thread is not None or not self.jobs:
+                return
+            self._thread = threading.Thread(target=self._loop, name="qradar-scheduler", daemon=True)
+            self._thread.start()
+        logger.info(f"Scheduler started with {len(self.jobs)} jobs")
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _start_jobs(self) -> None:
+        """Schedule every job, running the ones without a stored result now"""
+        now = datetime.now()
+        for job in self.jobs.values():
+            status = self.store.status(job.name)
+            if not status or not status["finished_at"]:
+                # Nothing stored yet; the minute is the slot so processes starting together agree
+                self._dispatch(job, now.replace(second=0, microsecond=0))
+            self._next_runs[job.name] = job.schedule.next_after(now)
+
+    def _tick(self) -> float:
+        """Dispatch the jobs that are due. Returns the seconds to sleep"""
+        now = datetime.now()
+        for job in self.jobs.values():
+            slot = self._next_runs[job.name]
+            if slot <= now:
+                self._dispatch(job, slot)
+                # Missed slots (e.g. after a suspend) are skipped, not replayed
+                self._next_runs[job.name] = job.schedule.next_after(now)
+        wake = min(self._next_runs.values())
+        return max(0.5, min((wake - datetime.now()).total_seconds(), MAX_SLEEP_SECONDS))
+
+    def _loop(self) -> None:
+        started = False
+        while not self._stop.is_set():
+            try:
+                if not started:
+                    self._start_jobs()
+                    started = True
+                delay = self._tick()
+            except Exception as e:
+                # A failing pass (e.g. a locked database) must not end the thread
+                logger.warning(f"Scheduler pass failed, retrying in {RETRY_SECONDS:.0f}s: {e}")
+                delay = RETRY_SECONDS
+            self._stop.wait(delay)
+
+    def _dispatch(self, job: Job, slot: datetime) -> None:
+        """Run a job for a slot in its own thread, unless it runs or another process took it"""
+        with self._lock:
+            if job.name in self._running:
+                logger.warning(f"Skipping scheduled run of '{job.name}': previous run still going")
+                return
+            if not self.store.claim(job.name, time.mktime(slot.timetuple()), self.owner):
+                return
+            self._running.add(job.name)
+        threading.Thread(
+            target=self._run, args=(job,), name=f"qradar-scheduler-{job.name}", daemon=True
+        ).start()
+
+    def _run(self, job: Job) -> None:
+        started = time.time()
+        try:
+            with tracing.span("scheduler.run", job=job.name):
+                if job.saved_search_id:
+                    result = self.client.execute_saved_search(
+                        job.saved_search_id, job.max_wait, max_age=0
+                    )
+                elif job.database == "flows":
+                    result = self.client.search_flows(job.aql, max_wait=job.max_wait)
+                else:
+                    result = self.client.search_events(job.aql, max_wait=job.max_wait)
+            self.store.save(job.name, result, started, time.time())
+            logger.info(f"Refreshed '{job.name}' in {time.time() - started:.1f}s")
+        except Exception as e:
+            logger.warning(f"Scheduled run of '{job.name}' failed: {str(e)}")
+            self.store.fail(job.name, str(e), time.time())
+        finally:
+            with self._lock:
+                self._running.discard(job.name)
+
+    def _metadata(self, job: Job, status: Dict[str, Any]) -> Dict[str, Any]:
+        summary = job.describe()
+        finished_at = status.get("finished_at")
+        next_run = self._next_runs.get(job.name) or job.schedule.next_after(datetime.now())
+        summary.update({
+            "finished_at": _iso(finished_at),
+            "age_seconds": round(time.time() - finished_at, 1) if finished_at else None,
+            "run_seconds": (
+                round(finished_at - status["started_at"], 1) if finished_at else None
+            ),
+            "record_count": status.get("record_count"),
+            "next_run": next_run.isoformat(),
+        })
+        if status.get("error"):
+            summary["last_error"] = status["error"]
+            summary["last_failed_at"] = _iso(status.get("failed_at"))
+        return summary
+
+    def describe(self) -> List[Dict[str, Any]]:
+        """Every job with its schedule and the state of its stored result"""
+        return [
+            self._metadata(job, self.store.status(name) or {})
+            for name, job in self.jobs.items()
+        ]
+
+    def materialized(self, name: str) -> Dict[str, Any]:
+        """
+        Stored result of a job
+
+        Returns:
+            The search result with a "materialized" entry describing its age
+
+        Raises:
+            ValueError: unknown job or nothing stored yet
+        """
+        job = self.jobs.get(name)
+        if job is None:
+            raise ValueError(
+                f"No scheduled job named '{name}' (configured: {', '.join(self.jobs) or 'none'})"
+            )
+        result = self.store.result(name)
+        if result is None:
+            raise ValueError(f"Job '{name}' has no stored result yet; it is still running")
+        result["materialized"] = self._metadata(job, self.store.status(name) or {})
+        return result
+
+    def fresh_saved_search(
+        self,
+        saved_search_id: str,
+        max_age: float
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Stored result of a scheduled saved search if it is younger than max_age seconds
+
+        Only results this store's console and API token produced are considered.
+        """
+        name = self.store.job_for_saved_search(str(saved_search_id))
+        if name is None or name not in self.jobs:
+            return None
+        status = self.store.status(name) or {}
+        if not status.get("finished_at") or time.time() - status["finished_at"] > max_age:
+            return None
+        return self.materialized(name)
+
+
+def create(
+    client: Any,
+    console: str,
+    api_token: str,
+    schedule_file: str,
+    schedule_db: Optional[str] = None
+) -> Optional[Scheduler]:
+    """
+    The scheduler for a client's jobs, or None when they cannot be set up
+
+    Stored results are scoped to ``console`` and a hash of ``api_token``.
+    A broken schedule file or an unusable results database is logged and
+    leaves the client running without scheduled searches.
+    """
+    try:
+        store = ResultStore(schedule_db or default_path(), console, api_token)
+        return Scheduler(client, load_jobs(schedule_file), store)
+    except Exception as e:
+        logger.warning(f"Scheduled searches disabled: {e}")
+        return None
+
+
+def settings_from_env() -> Dict[str, Any]:
+    """Read QRADAR_SCHEDULE_* / QRADAR_MATERIALIZED_MAX_AGE into QRadarClient keyword arguments"""
+    return {
+        "schedule_file": os.getenv("QRADAR_SCHEDULE_FILE") or None,
+        "schedule_db": os.getenv("QRADAR_SCHEDULE_DB") or default_path(),
+        "materialized_max_age": float(os.getenv("QRADAR_MATERIALIZED_MAX_AGE", "900")),
+    }
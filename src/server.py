@@ -8,9 +8,13 @@ License: MIT
 """
 import os
 import json
+import asyncio
+import base64
+import contextvars
 import logging
-from typing import Any, Sequence
-from dotenv import load_dotenv
+import threading
+import time
+from typing import Any, Callable, Optional, Sequence, Tuple, TYPE_CHECKING
 
 from mcp.server import Server
 from mcp.types import (
@@ -18,29 +22,149 @@ from mcp.types import (
     TextContent,
     ImageContent,
     EmbeddedResource,
+    InitializedNotification,
 )
 
-from .qradar_client import QRadarClient
+from . import circuit, metrics, profiling, tracing
 
-# Load environment variables
-load_dotenv()
+if TYPE_CHECKING:
+    from .qradar_client import QRadarClient
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("qradar-mcp")
 
-# Initialize QRadar client
-qradar_host = os.getenv("QRADAR_HOST")
-qradar_token = os.getenv("QRADAR_API_TOKEN")
-verify_ssl = os.getenv("QRADAR_VERIFY_SSL", "true").lower() == "true"
+# The QRadar client (and the requests/urllib3 stack behind it) is built on
+# first tool use so the stdio handshake is not held up by configuration or
+# network setup. See get_client().
+_qradar_client: Optional["QRadarClient"] = None
+_client_lock = threading.Lock()
 
-if not qradar_host or not qradar_token:
-    raise ValueError("QRADAR_HOST and QRADAR_API_TOKEN must be set in environment variables")
+# Event loop serving the current tool call (copied into the dispatch worker thread)
+_tool_loop: contextvars.ContextVar[Optional[asyncio.AbstractEventLoop]] = contextvars.ContextVar(
+    "qradar_tool_loop", default=None
+)
+
+
+def get_client() -> "QRadarClient":
+    """Return the shared QRadar client, creating it on first use"""
+    global _qradar_client
+    if _qradar_client is None:
+        with _client_lock:
+            if _qradar_client is None:
+                from dotenv import load_dotenv
+                from . import (
+                    bulk_load, cassette, disk_cache, hedging, ip_index, log_source_health,
+                    ratelimit, refset_index, rule_graph, scheduler
+                )
+                from .qradar_client import QRadarClient
+
+                # Load environment variables
+                load_dotenv()
+
+                qradar_host = os.getenv("QRADAR_HOST")
+                qradar_token = os.getenv("QRADAR_API_TOKEN")
+                verify_ssl = os.getenv("QRADAR_VERIFY_SSL", "true").lower() == "true"
+                cassette_settings = cassette.settings_from_env()
+
+                # Replaying a cassette needs no console or credentials
+                if cassette_settings["cassette_mode"] == "replay":
+                    qradar_host = qradar_host or "qradar.replay"
+                    qradar_token = qradar_token or "replay"
+
+                if not qradar_host or not qradar_token:
+                    raise ValueError(
+                        "QRADAR_HOST and QRADAR_API_TOKEN must be set in environment variables"
+                    )
+
+                _qradar_client = QRadarClient(
+                    qradar_host,
+                    qradar_token,
+                    verify_ssl,
+                    **cassette_settings,
+                    **ratelimit.settings_from_env(),
+                    **hedging.settings_from_env(),
+                    **circuit.settings_from_env(),
+                    **disk_cache.settings_from_env(),
+                    **ip_index.settings_from_env(),
+                    **log_source_health.settings_from_env(),
+                    **refset_index.settings_from_env(),
+                    **bulk_load.settings_from_env(),
+                    **rule_graph.settings_from_env(),
+                    **scheduler.settings_from_env()
+                )
+    return _qradar_client
+
+
+def _warm_up() -> None:
+    """Prime the client's metadata caches in the background"""
+    try:
+        client = get_client()
+        client.get_system_info()
+        client.get_ariel_fields("events")
+        client.get_ariel_fields("flows")
+        logger.info("Metadata warm-up complete")
+    except Exception as e:
+        logger.warning(f"Metadata warm-up skipped: {str(e)}")
+
+
+def _start_scheduler() -> None:
+    """Start refreshing scheduled searches in the background"""
+    try:
+        scheduler = get_client().scheduler
+        if scheduler is not None:
+            scheduler.start()
+    except Exception as e:
+        logger.warning(f"Search scheduler not started: {str(e)}")
+
+
+async def _on_initialized(notification: InitializedNotification) -> None:
+    """Start metadata warm-up and the search scheduler once the handshake has completed"""
+    if os.getenv("QRADAR_SCHEDULE_FILE"):
+        threading.Thread(
+            target=_start_scheduler, name="qradar-scheduler-start", daemon=True
+        ).start()
+    if os.getenv("QRADAR_WARMUP", "true").lower() != "true":
+        return
+    threading.Thread(target=_warm_up, name="qradar-warmup", daemon=True).start()
 
-qradar_client = QRadarClient(qradar_host, qradar_token, verify_ssl)
 
 # Initialize MCP server
 app = Server("ibm-qradar-mcp")
+app.notification_handlers[InitializedNotification] = _on_initialized
+
+
+# Batch tool -> (ID argument, noun, QRadarClient method)
+BATCH_LOOKUPS = {
+    "qradar_get_offenses_by_ids": ("offense_ids", "offenses", "get_offenses_by_ids"),
+    "qradar_get_log_sources_by_ids": ("log_source_ids", "log sources", "get_log_sources_by_ids"),
+    "qradar_get_rules_by_ids": ("rule_ids", "rules", "get_rules_by_ids"),
+    "qradar_get_users_by_ids": ("user_ids", "users", "get_users_by_ids"),
+}
+MAX_BATCH_IDS = 500
+MAX_LOOKUP_IPS = 10000
+MAX_REFERENCE_VALUES = 10000
+MAX_PAGE_SIZE = 10000
+MAX_TRIAGE_OFFENSES = 1000
+MAX_SAVED_SEARCHES = 50
+MAX_QUIET_SOURCES = 1000
+MAX_RULE_SEARCH_RESULTS = 1000
+
+
+def encode_cursor(state: dict) -> str:
+    """Opaque cursor for the next page of a paged tool"""
+    return base64.urlsafe_b64encode(json.dumps(state, separators=(",", ":")).encode()).decode()
+
+
+def decode_cursor(cursor: str, required: Tuple[str, ...] = ()) -> dict:
+    """Inverse of encode_cursor; required lists the keys the state must have"""
+    try:
+        state = json.loads(base64.urlsafe_b64decode(str(cursor).encode()))
+    except ValueError:
+        state = None
+    if not isinstance(state, dict) or any(key not in state for key in required):
+        raise ValueError("Invalid cursor; pass the next_cursor value from the previous page")
+    return state
 
 
 def format_response(data: Any, success: bool = True, message: str = "") -> list[TextContent]:
@@ -50,12 +174,45 @@ def format_response(data: Any, success: bool = True, message: str = "") -> list[
         "message": message,
         "data": data
     }
+    stale = circuit.stale_results()
+    if stale:
+        # QRadar could not answer; part of this data is a cached copy
+        response["stale"] = {
+            "max_age_seconds": max(s["age_seconds"] for s in stale),
+            "sources": stale
+        }
+    with tracing.span("format_response") as span:
+        text = json.dumps(response, indent=2, default=str)
+        span.set_attribute("bytes", len(text))
     return [TextContent(
         type="text",
-        text=json.dumps(response, indent=2, default=str)
+        text=text
     )]
 
 
+def progress_reporter() -> Optional[Callable[[float, Optional[float], str], None]]:
+    """
+    Callback sending MCP progress notifications for the current tool call
+
+    Returns None when the caller did not pass a progressToken. The callback
+    may be called from any thread; notifications are sent without waiting.
+    """
+    loop = _tool_loop.get()
+    try:
+        ctx = app.request_context
+    except LookupError:
+        return None
+    token = ctx.meta.progressToken if ctx.meta else None
+    if loop is None or token is None:
+        return None
+
+    def report(progress: float, total: Optional[float], message: str) -> None:
+        asyncio.run_coroutine_threadsafe(
+            ctx.session.send_progress_notification(token, progress, total, message), loop
+        )
+    return report
+
+
 @app.list_tools()
 async def list_tools() -> list[Tool]:
     """List available QRadar tools"""
@@ -84,6 +241,15 @@ async def list_tools() -> list[Tool]:
                         "type": "integer",
                         "description": "Maximum time to wait for results in seconds (default: 300)",
                         "default": 300
+                    },
+                    "classify_ips": {
+                        "type": "boolean",
+                        "description": (
+                            "Add <field>_network, <field>_network_group and <field>_local "
+                            "(inside the network hierarchy) for sourceip/destinationip "
+                            "(default: false)"
+                        ),
+                        "default": False
                     }
                 },
                 "required": ["query"]
@@ -134,6 +300,15 @@ async def list_tools() -> list[Tool]:
                         "type": "integer",
                         "description": "Maximum time to wait for results in seconds (default: 300)",
                         "default": 300
+                    },
+                    "classify_ips": {
+                        "type": "boolean",
+                        "description": (
+                            "Add <field>_network, <field>_network_group and <field>_local "
+                            "(inside the network hierarchy) for sourceip/destinationip "
+                            "(default: false)"
+                        ),
+                        "default": False
                     }
                 },
                 "required": ["query"]
@@ -162,6 +337,14 @@ async def list_tools() -> list[Tool]:
                     "range": {
                         "type": "string",
                         "description": "Range of results to return (e.g., '0-49' for first 50 results)"
+                    },
+                    "resolve": {
+                        "type": "boolean",
+                        "description": (
+                            "Add source/destination IPs and offense type names in place of "
+                            "their IDs (default: false)"
+                        ),
+                        "default": False
                     }
                 },
                 "required": []
@@ -181,6 +364,30 @@ async def list_tools() -> list[Tool]:
                 "required": ["offense_id"]
             }
         ),
+        Tool(
+            name="qradar_investigate_offense",
+            description=(
+                "Get everything needed to triage an offense in one call: the offense, its notes, "
+                "source and destination addresses, contributing log sources and rules, the assets "
+                "behind the involved IPs and the closing reason. Lookups run concurrently; parts "
+                "that fail are listed under 'errors'."
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "offense_id": {
+                        "type": "integer",
+                        "description": "The offense ID to investigate"
+                    },
+                    "max_asset_ips": {
+                        "type": "integer",
+                        "description": "Maximum number of distinct IPs to look up assets for (default: 20)",
+                        "default": 20
+                    }
+                },
+                "required": ["offense_id"]
+            }
+        ),
         
         # ==================== Log Source (Agent) Tools ====================
         Tool(
@@ -230,6 +437,55 @@ async def list_tools() -> list[Tool]:
                 "required": []
             }
         ),
+        Tool(
+            name="qradar_get_quiet_log_sources",
+            description=(
+                "Find log sources that stopped sending events: quiet for at least N hours, "
+                "optionally only those that went quiet within the last M hours. Answered in "
+                "milliseconds from a compact log source table kept in sync in the background. "
+                "Sources are listed stalest first, with quiet counts ranked per log source "
+                "type and per domain."
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "quiet_for_hours": {
+                        "type": "number",
+                        "description": "Minimum hours since a source's last event (default: 1)",
+                        "default": 1
+                    },
+                    "within_hours": {
+                        "type": "number",
+                        "description": (
+                            "Only sources whose last event is at most this many hours old, "
+                            "i.e. that went quiet recently (default: no limit)"
+                        )
+                    },
+                    "type_id": {
+                        "type": "integer",
+                        "description": "Only sources of this log source type"
+                    },
+                    "domain_id": {
+                        "type": "integer",
+                        "description": "Only sources in this domain"
+                    },
+                    "include_disabled": {
+                        "type": "boolean",
+                        "description": "Also report disabled sources (default: false)",
+                        "default": False
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": (
+                            f"Most sources listed, max {MAX_QUIET_SOURCES}; counts cover all "
+                            "(default: 100)"
+                        ),
+                        "default": 100
+                    }
+                },
+                "required": []
+            }
+        ),
         
         # ==================== Asset Tools ====================
         Tool(
@@ -295,6 +551,110 @@ async def list_tools() -> list[Tool]:
                 "required": ["ref_set_name"]
             }
         ),
+        Tool(
+            name="qradar_get_reference_set_page",
+            description=(
+                "Read a reference set one page at a time, optionally only values with a given "
+                "prefix or last seen in a time window. Returns one page of elements and a "
+                "next_cursor; call again with the cursor for the next page. Use this instead "
+                "of qradar_get_reference_set_data for large sets."
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "ref_set_name": {
+                        "type": "string",
+                        "description": "Name of the reference set (not needed with cursor)"
+                    },
+                    "value_prefix": {
+                        "type": "string",
+                        "description": (
+                            "Only values starting with this (case-insensitive, taken "
+                            "literally: % and _ are not wildcards)"
+                        )
+                    },
+                    "last_seen_after": {
+                        "type": "integer",
+                        "description": "Only elements last seen at or after this time (epoch milliseconds)"
+                    },
+                    "last_seen_before": {
+                        "type": "integer",
+                        "description": "Only elements last seen before this time (epoch milliseconds)"
+                    },
+                    "page_size": {
+                        "type": "integer",
+                        "description": "Elements per page (default: 1000)",
+                        "default": 1000,
+                        "minimum": 1,
+                        "maximum": MAX_PAGE_SIZE
+                    },
+                    "cursor": {
+                        "type": "string",
+                        "description": "next_cursor from the previous page"
+                    }
+                },
+                "required": []
+            }
+        ),
+        Tool(
+            name="qradar_check_reference_sets",
+            description=(
+                "Check which reference sets contain each of many values (IPs, domains, hashes, "
+                "users). Answered from a local index of each set that is synced incrementally, "
+                "so large threat-intel sets are not downloaded per question. Returns only the "
+                "values that matched, with the sets they were found in."
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "values": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "minItems": 1,
+                        "maxItems": MAX_REFERENCE_VALUES,
+                        "description": "Values to look for"
+                    },
+                    "ref_set_names": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Reference sets to check (default: all reference sets)"
+                    }
+                },
+                "required": ["values"]
+            }
+        ),
+        Tool(
+            name="qradar_bulk_load_reference_set",
+            description=(
+                "Add many values (e.g. an IOC feed) to an existing reference set. Values come "
+                "from a list or a text file on the server with one value per line; they are "
+                "de-duplicated, validated for IP sets and sent in parallel chunks, with failed "
+                "chunks retried. Returns counts, failed chunks and throughput."
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "ref_set_name": {
+                        "type": "string",
+                        "description": "Name of the reference set"
+                    },
+                    "values": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Values to add"
+                    },
+                    "file_path": {
+                        "type": "string",
+                        "description": (
+                            "Text file with one value per line (blank lines and # comments "
+                            "are skipped), relative to the server's QRADAR_BULK_LOAD_DIR; "
+                            "files outside it are refused, and without it only values work"
+                        )
+                    }
+                },
+                "required": ["ref_set_name"]
+            }
+        ),
         
         # ==================== System Information Tools ====================
         Tool(
@@ -352,6 +712,88 @@ async def list_tools() -> list[Tool]:
                 "required": ["rule_id"]
             }
         ),
+        Tool(
+            name="qradar_get_rule_dependencies",
+            description=(
+                "Show what a rule or building block uses in its tests and which rules and "
+                "building blocks use it (e.g. what is affected if a building block is changed "
+                "or disabled). Answered from a local rule graph without querying QRadar; "
+                "set max_depth to follow dependencies transitively. The graph is built in "
+                "the background on first use (status 'building' until then) and every "
+                "added or modified rule triggers a full rescan, so results can lag rule "
+                "edits by the refresh interval plus the rescan."
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "rule_id": {
+                        "type": "integer",
+                        "description": "Rule or building block ID"
+                    },
+                    "direction": {
+                        "type": "string",
+                        "enum": ["uses", "used_by", "both"],
+                        "description": "Dependencies, dependents or both (default: both)",
+                        "default": "both"
+                    },
+                    "max_depth": {
+                        "type": "integer",
+                        "description": "Levels to follow, 1-10 (default: 1, direct only)",
+                        "default": 1
+                    }
+                },
+                "required": ["rule_id"]
+            }
+        ),
+        Tool(
+            name="qradar_search_rule_graph",
+            description=(
+                "Search rules and building blocks in the local rule graph by name, kind, "
+                "type, enabled state and origin, without querying QRadar. Each result says "
+                "how many rules it uses and is used by; unused=true finds building blocks "
+                "and rules nothing depends on. The graph is built in the background on "
+                "first use (status 'building' until then) and rescanned in full after "
+                "rule changes."
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "query": {
+                        "type": "string",
+                        "description": "Case-insensitive part of the name, or an exact ID"
+                    },
+                    "kind": {
+                        "type": "string",
+                        "enum": ["rule", "building_block"],
+                        "description": "Only rules or only building blocks"
+                    },
+                    "type": {
+                        "type": "string",
+                        "enum": ["EVENT", "FLOW", "COMMON", "OFFENSE"],
+                        "description": "Rule type"
+                    },
+                    "enabled": {
+                        "type": "boolean",
+                        "description": "Only enabled (true) or disabled (false) rules"
+                    },
+                    "origin": {
+                        "type": "string",
+                        "enum": ["SYSTEM", "OVERRIDE", "USER"],
+                        "description": "Rule origin"
+                    },
+                    "unused": {
+                        "type": "boolean",
+                        "description": "Only nodes nothing uses (true) or that something uses (false)"
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": f"Maximum results, up to {MAX_RULE_SEARCH_RESULTS} (default: 100)",
+                        "default": 100
+                    }
+                },
+                "required": []
+            }
+        ),
         
         # ==================== Saved Search Tools ====================
         Tool(
@@ -397,11 +839,76 @@ async def list_tools() -> list[Tool]:
                         "type": "integer",
                         "description": "Maximum time to wait for results in seconds (default: 300)",
                         "default": 300
+                    },
+                    "max_age_seconds": {
+                        "type": "number",
+                        "description": (
+                            "If the search is scheduled, accept its stored result up to this "
+                            "old (default: QRADAR_MATERIALIZED_MAX_AGE; 0 always runs it)"
+                        )
                     }
                 },
                 "required": ["search_id"]
             }
         ),
+        Tool(
+            name="qradar_execute_saved_searches",
+            description=(
+                "Execute several saved searches at once (e.g. a morning check routine). "
+                "Searches run concurrently up to QRadar's concurrent search limit, so the "
+                "batch takes about as long as the slowest search. Each search is reported "
+                "as a progress notification as soon as it finishes; the response holds all "
+                "results in the order given."
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "search_ids": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "minItems": 1,
+                        "maxItems": MAX_SAVED_SEARCHES,
+                        "description": "Saved search IDs to execute"
+                    },
+                    "max_wait": {
+                        "type": "integer",
+                        "description": "Maximum time to wait for each search in seconds (default: 300)",
+                        "default": 300
+                    }
+                },
+                "required": ["search_ids"]
+            }
+        ),
+        Tool(
+            name="qradar_get_scheduled_searches",
+            description=(
+                "List the saved searches and AQL queries the server runs on a schedule, with "
+                "their cron cadence, when their stored result was last refreshed, row counts "
+                "and the next run."
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {},
+                "required": []
+            }
+        ),
+        Tool(
+            name="qradar_get_materialized_results",
+            description=(
+                "Get the latest stored result of a scheduled search instantly, without "
+                "querying QRadar. The result says when it was produced and how old it is."
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "name": {
+                        "type": "string",
+                        "description": "Scheduled job name (see qradar_get_scheduled_searches)"
+                    }
+                },
+                "required": ["name"]
+            }
+        ),
         
         # ==================== Offense Note Tools ====================
         Tool(
@@ -500,6 +1007,58 @@ async def list_tools() -> list[Tool]:
                 "required": ["offense_id", "assigned_to"]
             }
         ),
+        Tool(
+            name="qradar_bulk_triage_offenses",
+            description=(
+                "Add a note to, change the status of and/or assign many offenses in one call, "
+                "selected by ID list or by offense filter (e.g. close all offenses from a "
+                "tuned rule as false positives). Changes already in place are skipped. Use "
+                "dry_run first to see which offenses would change. Returns the result per "
+                "offense (updated, unchanged, failed, not_found)."
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "offense_ids": {
+                        "type": "array",
+                        "items": {"type": "integer"},
+                        "minItems": 1,
+                        "maxItems": MAX_TRIAGE_OFFENSES,
+                        "description": "Offense IDs to change"
+                    },
+                    "filter": {
+                        "type": "string",
+                        "description": (
+                            "Offense filter selecting the offenses instead of offense_ids "
+                            "(e.g., 'status=OPEN and magnitude < 3')"
+                        )
+                    },
+                    "note_text": {
+                        "type": "string",
+                        "description": "Note to add to each offense"
+                    },
+                    "status": {
+                        "type": "string",
+                        "description": "New status: OPEN, HIDDEN, or CLOSED",
+                        "enum": ["OPEN", "HIDDEN", "CLOSED"]
+                    },
+                    "closing_reason_id": {
+                        "type": "integer",
+                        "description": "Closing reason ID (required when status is CLOSED)"
+                    },
+                    "assigned_to": {
+                        "type": "string",
+                        "description": "Username to assign the offenses to"
+                    },
+                    "dry_run": {
+                        "type": "boolean",
+                        "description": "Only report what would change (default: false)",
+                        "default": False
+                    }
+                },
+                "required": []
+            }
+        ),
         
         # ==================== Custom Property Tools ====================
         Tool(
@@ -571,6 +1130,50 @@ async def list_tools() -> list[Tool]:
             }
         ),
         
+        # ==================== IP Index Tools ====================
+        Tool(
+            name="qradar_lookup_networks",
+            description=(
+                "Find the most specific network hierarchy entry (name, group, CIDR) for each IP. "
+                "Answered from a local index of the network hierarchy, so thousands of IPs can "
+                "be looked up in one call."
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "ips": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "minItems": 1,
+                        "maxItems": MAX_LOOKUP_IPS,
+                        "description": "IPv4/IPv6 addresses to look up"
+                    }
+                },
+                "required": ["ips"]
+            }
+        ),
+        Tool(
+            name="qradar_lookup_assets_by_ip",
+            description=(
+                "Find the assets that own each IP. Answered from a local index of asset "
+                "interfaces (rebuilt periodically), so thousands of IPs can be looked up in "
+                "one call; use qradar_search_assets_by_ip for full, live asset details."
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "ips": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "minItems": 1,
+                        "maxItems": MAX_LOOKUP_IPS,
+                        "description": "IPv4/IPv6 addresses to look up"
+                    }
+                },
+                "required": ["ips"]
+            }
+        ),
+        
         # ==================== Ariel Database Tools ====================
         Tool(
             name="qradar_get_ariel_databases",
@@ -708,319 +1311,762 @@ async def list_tools() -> list[Tool]:
                 "required": []
             }
         ),
+        
+        # ==================== Batch Lookup Tools ====================
+        Tool(
+            name="qradar_get_offenses_by_ids",
+            description=(
+                "Get several offenses by ID in one call. Results are keyed by ID; IDs that could "
+                "not be fetched are listed under 'errors'. Use this instead of repeated "
+                "qradar_get_offense_by_id calls."
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "offense_ids": {
+                        "type": "array",
+                        "items": {"type": "integer"},
+                        "minItems": 1,
+                        "maxItems": MAX_BATCH_IDS,
+                        "description": "Offense IDs to fetch"
+                    },
+                    "fields": {
+                        "type": "string",
+                        "description": "Comma-separated list of fields to return"
+                    }
+                },
+                "required": ["offense_ids"]
+            }
+        ),
+        Tool(
+            name="qradar_get_log_sources_by_ids",
+            description=(
+                "Get several log sources by ID in one call. Results are keyed by ID with per-ID errors."
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "log_source_ids": {
+                        "type": "array",
+                        "items": {"type": "integer"},
+                        "minItems": 1,
+                        "maxItems": MAX_BATCH_IDS,
+                        "description": "Log source IDs to fetch"
+                    },
+                    "fields": {
+                        "type": "string",
+                        "description": "Comma-separated list of fields to return"
+                    }
+                },
+                "required": ["log_source_ids"]
+            }
+        ),
+        Tool(
+            name="qradar_get_rules_by_ids",
+            description=(
+                "Get several analytics rules by ID in one call. Results are keyed by ID with per-ID errors."
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "rule_ids": {
+                        "type": "array",
+                        "items": {"type": "integer"},
+                        "minItems": 1,
+                        "maxItems": MAX_BATCH_IDS,
+                        "description": "Rule IDs to fetch"
+                    },
+                    "fields": {
+                        "type": "string",
+                        "description": "Comma-separated list of fields to return"
+                    }
+                },
+                "required": ["rule_ids"]
+            }
+        ),
+        Tool(
+            name="qradar_get_users_by_ids",
+            description=(
+                "Get several users by ID in one call. Results are keyed by ID with per-ID errors."
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "user_ids": {
+                        "type": "array",
+                        "items": {"type": "integer"},
+                        "minItems": 1,
+                        "maxItems": MAX_BATCH_IDS,
+                        "description": "User IDs to fetch"
+                    },
+                    "fields": {
+                        "type": "string",
+                        "description": "Comma-separated list of fields to return"
+                    }
+                },
+                "required": ["user_ids"]
+            }
+        ),
+        
+        # ==================== Server Tools ====================
+        Tool(
+            name="qradar_server_metrics",
+            description=(
+                "Get performance metrics for this MCP server: tool latency, QRadar API latency "
+                "by endpoint, Ariel search phase times, cache hit counts, bytes transferred and "
+                "error counts by status code. Use 'prometheus' format for the raw text exposition."
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "format": {
+                        "type": "string",
+                        "enum": ["summary", "prometheus"],
+                        "description": "Output format (default: summary)",
+                        "default": "summary"
+                    }
+                },
+                "required": []
+            }
+        ),
     ]
 
 
-@app.call_tool()
-async def call_tool(name: str, arguments: Any) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
-    """Handle tool execution"""
+def _dispatch_tool(name: str, arguments: Any) -> list[TextContent]:
+    """Run a tool and format its result (raises on failure)"""
     
-    try:
-        # ==================== Event and Log Query Tools ====================
-        
-        if name == "qradar_search_events":
-            query = arguments.get("query")
-            timeout = arguments.get("timeout", 60)
-            max_wait = arguments.get("max_wait", 300)
-            
-            logger.info(f"Searching events with query: {query}")
-            result = qradar_client.search_events(query, timeout, max_wait)
-            return format_response(result, message=f"Found {result.get('record_count', 0)} events")
-        
-        elif name == "qradar_get_recent_events":
-            limit = arguments.get("limit", 50)
-            fields = arguments.get("fields")
-            
-            logger.info(f"Getting {limit} recent events")
-            result = qradar_client.get_recent_events(limit, fields)
-            return format_response(result, message=f"Retrieved {result.get('record_count', 0)} events")
-        
-        elif name == "qradar_search_flows":
-            query = arguments.get("query")
-            timeout = arguments.get("timeout", 60)
-            max_wait = arguments.get("max_wait", 300)
-            
-            logger.info(f"Searching flows with query: {query}")
-            result = qradar_client.search_flows(query, timeout, max_wait)
-            return format_response(result, message=f"Found {result.get('record_count', 0)} flows")
-        
-        # ==================== Offense Tools ====================
-        
-        elif name == "qradar_get_offenses":
-            filter_query = arguments.get("filter")
-            fields = arguments.get("fields")
-            range_header = arguments.get("range")
-            
-            logger.info("Getting offenses")
-            result = qradar_client.get_offenses(filter_query, fields, range_header)
-            return format_response(result, message=f"Retrieved {len(result)} offenses")
-        
-        elif name == "qradar_get_offense_by_id":
-            offense_id = arguments.get("offense_id")
-            
-            logger.info(f"Getting offense {offense_id}")
-            result = qradar_client.get_offense_by_id(offense_id)
-            return format_response(result, message=f"Retrieved offense {offense_id}")
-        
-        # ==================== Log Source (Agent) Tools ====================
-        
-        elif name == "qradar_get_log_sources":
-            filter_query = arguments.get("filter")
-            fields = arguments.get("fields")
-            
-            logger.info("Getting log sources")
-            result = qradar_client.get_log_sources(filter_query, fields)
-            return format_response(result, message=f"Retrieved {len(result)} log sources")
-        
-        elif name == "qradar_get_log_source_by_id":
-            log_source_id = arguments.get("log_source_id")
-            
-            logger.info(f"Getting log source {log_source_id}")
-            result = qradar_client.get_log_source_by_id(log_source_id)
-            return format_response(result, message=f"Retrieved log source {log_source_id}")
-        
-        elif name == "qradar_get_log_source_types":
-            logger.info("Getting log source types")
-            result = qradar_client.get_log_source_types()
-            return format_response(result, message=f"Retrieved {len(result)} log source types")
-        
-        # ==================== Asset Tools ====================
-        
-        elif name == "qradar_get_assets":
-            filter_query = arguments.get("filter")
-            fields = arguments.get("fields")
-            
-            logger.info("Getting assets")
-            result = qradar_client.get_assets(filter_query, fields)
-            return format_response(result, message=f"Retrieved {len(result)} assets")
-        
-        elif name == "qradar_search_assets_by_ip":
-            ip_address = arguments.get("ip_address")
-            
-            logger.info(f"Searching assets by IP: {ip_address}")
-            result = qradar_client.search_assets(ip_address)
-            return format_response(result, message=f"Found {len(result)} assets with IP {ip_address}")
-        
-        # ==================== Reference Data Tools ====================
-        
-        elif name == "qradar_get_reference_sets":
-            logger.info("Getting reference sets")
-            result = qradar_client.get_reference_sets()
-            return format_response(result, message=f"Retrieved {len(result)} reference sets")
-        
-        elif name == "qradar_get_reference_set_data":
-            ref_set_name = arguments.get("ref_set_name")
-            
-            logger.info(f"Getting reference set data: {ref_set_name}")
-            result = qradar_client.get_reference_set_data(ref_set_name)
-            return format_response(result, message=f"Retrieved data for reference set '{ref_set_name}'")
-        
-        # ==================== System Information Tools ====================
-        
-        elif name == "qradar_get_system_info":
-            logger.info("Getting system info")
-            result = qradar_client.get_system_info()
-            return format_response(result, message="Retrieved system information")
-        
-        elif name == "qradar_get_servers":
-            logger.info("Getting servers")
-            result = qradar_client.get_servers()
-            return format_response(result, message=f"Retrieved {len(result)} servers")
-        
-        # ==================== Rules Tools ====================
-        
-        elif name == "qradar_get_rules":
-            filter_query = arguments.get("filter")
-            fields = arguments.get("fields")
-            
-            logger.info("Getting rules")
-            result = qradar_client.get_rules(filter_query, fields)
-            return format_response(result, message=f"Retrieved {len(result)} rules")
-        
-        elif name == "qradar_get_rule_by_id":
-            rule_id = arguments.get("rule_id")
-            
-            logger.info(f"Getting rule {rule_id}")
-            result = qradar_client.get_rule_by_id(rule_id)
-            return format_response(result, message=f"Retrieved rule {rule_id}")
-        
-        # ==================== Saved Search Tools ====================
-        
-        elif name == "qradar_get_saved_searches":
-            logger.info("Getting saved searches")
-            result = qradar_client.get_saved_searches()
-            return format_response(result, message=f"Retrieved {len(result)} saved searches")
-        
-        elif name == "qradar_get_saved_search_by_id":
-            search_id = arguments.get("search_id")
-            
-            logger.info(f"Getting saved search {search_id}")
-            result = qradar_client.get_saved_search_by_id(search_id)
-            return format_response(result, message=f"Retrieved saved search {search_id}")
-        
-        elif name == "qradar_execute_saved_search":
-            search_id = arguments.get("search_id")
-            max_wait = arguments.get("max_wait", 300)
-            
-            logger.info(f"Executing saved search {search_id}")
-            result = qradar_client.execute_saved_search(search_id, max_wait)
-            return format_response(result, message=f"Executed saved search {search_id}")
-        
-        # ==================== Offense Note Tools ====================
-        
-        elif name == "qradar_get_offense_notes":
-            offense_id = arguments.get("offense_id")
-            
-            logger.info(f"Getting notes for offense {offense_id}")
-            result = qradar_client.get_offense_notes(offense_id)
-            return format_response(result, message=f"Retrieved {len(result)} notes for offense {offense_id}")
-        
-        elif name == "qradar_add_offense_note":
-            offense_id = arguments.get("offense_id")
-            note_text = arguments.get("note_text")
-            
-            logger.info(f"Adding note to offense {offense_id}")
-            result = qradar_client.add_offense_note(offense_id, note_text)
-            return format_response(result, message=f"Added note to offense {offense_id}")
-        
-        elif name == "qradar_update_offense_status":
-            offense_id = arguments.get("offense_id")
-            status = arguments.get("status")
-            closing_reason_id = arguments.get("closing_reason_id")
-            
-            logger.info(f"Updating offense {offense_id} status to {status}")
-            result = qradar_client.update_offense_status(offense_id, status, closing_reason_id)
-            return format_response(result, message=f"Updated offense {offense_id} status to {status}")
-        
-        elif name == "qradar_get_closing_reasons":
-            logger.info("Getting closing reasons")
-            result = qradar_client.get_closing_reasons()
-            return format_response(result, message=f"Retrieved {len(result)} closing reasons")
-        
-        elif name == "qradar_assign_offense":
-            offense_id = arguments.get("offense_id")
-            assigned_to = arguments.get("assigned_to")
-            
-            logger.info(f"Assigning offense {offense_id} to {assigned_to}")
-            result = qradar_client.assign_offense(offense_id, assigned_to)
-            return format_response(result, message=f"Assigned offense {offense_id} to {assigned_to}")
+    # ==================== Server Tools ====================
+    
+    if name == "qradar_server_metrics":
+        output_format = arguments.get("format", "summary")
+        
+        if output_format == "prometheus":
+            return format_response(metrics.REGISTRY.render(), message="Prometheus text exposition")
+        summary = metrics.REGISTRY.summary()
+        summary["cache_hit_ratio"] = metrics.cache_hit_ratios()
+        return format_response(summary, message="Server metrics summary")
+    
+    qradar_client = get_client()
+    
+    # ==================== Event and Log Query Tools ====================
+    
+    if name == "qradar_search_events":
+        query = arguments.get("query")
+        timeout = arguments.get("timeout", 60)
+        max_wait = arguments.get("max_wait", 300)
+        classify_ips = arguments.get("classify_ips", False)
+        
+        logger.info(f"Searching events with query: {query}")
+        result = qradar_client.search_events(query, timeout, max_wait, classify_ips)
+        return format_response(result, message=f"Found {result.get('record_count', 0)} events")
+    
+    elif name == "qradar_get_recent_events":
+        limit = arguments.get("limit", 50)
+        fields = arguments.get("fields")
         
-        # ==================== Custom Property Tools ====================
+        logger.info(f"Getting {limit} recent events")
+        result = qradar_client.get_recent_events(limit, fields)
+        return format_response(result, message=f"Retrieved {result.get('record_count', 0)} events")
+    
+    elif name == "qradar_search_flows":
+        query = arguments.get("query")
+        timeout = arguments.get("timeout", 60)
+        max_wait = arguments.get("max_wait", 300)
+        classify_ips = arguments.get("classify_ips", False)
+        
+        logger.info(f"Searching flows with query: {query}")
+        result = qradar_client.search_flows(query, timeout, max_wait, classify_ips)
+        return format_response(result, message=f"Found {result.get('record_count', 0)} flows")
+    
+    # ==================== Offense Tools ====================
+    
+    elif name == "qradar_get_offenses":
+        filter_query = arguments.get("filter")
+        fields = arguments.get("fields")
+        range_header = arguments.get("range")
+        
+        logger.info("Getting offenses")
+        result = qradar_client.get_offenses(filter_query, fields, range_header)
+        if arguments.get("resolve", False):
+            result = qradar_client.enrich_offenses(result)
+        return format_response(result, message=f"Retrieved {len(result)} offenses")
+    
+    elif name == "qradar_get_offense_by_id":
+        offense_id = arguments.get("offense_id")
         
-        elif name == "qradar_get_custom_properties":
-            logger.info("Getting custom properties")
-            result = qradar_client.get_custom_properties()
-            return format_response(result, message=f"Retrieved {len(result)} custom properties")
+        logger.info(f"Getting offense {offense_id}")
+        result = qradar_client.get_offense_by_id(offense_id)
+        return format_response(result, message=f"Retrieved offense {offense_id}")
+    
+    elif name == "qradar_investigate_offense":
+        offense_id = arguments.get("offense_id")
+        max_asset_ips = arguments.get("max_asset_ips", 20)
+        
+        logger.info(f"Investigating offense {offense_id}")
+        result = qradar_client.investigate_offense(offense_id, max_asset_ips)
+        message = f"Assembled investigation bundle for offense {offense_id}"
+        if result["errors"]:
+            message += f" ({len(result['errors'])} parts failed)"
+        return format_response(result, message=message)
+    
+    # ==================== Log Source (Agent) Tools ====================
+    
+    elif name == "qradar_get_log_sources":
+        filter_query = arguments.get("filter")
+        fields = arguments.get("fields")
         
-        elif name == "qradar_get_custom_property_by_id":
-            property_id = arguments.get("property_id")
-            
-            logger.info(f"Getting custom property {property_id}")
-            result = qradar_client.get_custom_property_by_id(property_id)
-            return format_response(result, message=f"Retrieved custom property {property_id}")
+        logger.info("Getting log sources")
+        result = qradar_client.get_log_sources(filter_query, fields)
+        return format_response(result, message=f"Retrieved {len(result)} log sources")
+    
+    elif name == "qradar_get_log_source_by_id":
+        log_source_id = arguments.get("log_source_id")
         
-        # ==================== Domain Management Tools ====================
+        logger.info(f"Getting log source {log_source_id}")
+        result = qradar_client.get_log_source_by_id(log_source_id)
+        return format_response(result, message=f"Retrieved log source {log_source_id}")
+    
+    elif name == "qradar_get_log_source_types":
+        logger.info("Getting log source types")
+        result = qradar_client.get_log_source_types()
+        return format_response(result, message=f"Retrieved {len(result)} log source types")
+    
+    elif name == "qradar_get_quiet_log_sources":
+        quiet_for_hours = arguments.get("quiet_for_hours", 1)
+        within_hours = arguments.get("within_hours")
+        limit = arguments.get("limit", 100)
+        if not 1 <= limit <= MAX_QUIET_SOURCES:
+            raise ValueError(f"limit must be between 1 and {MAX_QUIET_SOURCES}")
+        
+        logger.info(f"Finding log sources quiet for {quiet_for_hours}h or more")
+        result = qradar_client.log_source_health.quiet_sources(
+            quiet_for_hours,
+            within_hours,
+            arguments.get("type_id"),
+            arguments.get("domain_id"),
+            arguments.get("include_disabled", False),
+            limit
+        )
+        return format_response(
+            result,
+            message=(
+                f"{result['quiet_count']} of {result['sources_considered']} log sources "
+                f"quiet for {quiet_for_hours}h or more"
+            )
+        )
+    
+    # ==================== Asset Tools ====================
+    
+    elif name == "qradar_get_assets":
+        filter_query = arguments.get("filter")
+        fields = arguments.get("fields")
         
-        elif name == "qradar_get_domains":
-            logger.info("Getting domains")
-            result = qradar_client.get_domains()
-            return format_response(result, message=f"Retrieved {len(result)} domains")
+        logger.info("Getting assets")
+        result = qradar_client.get_assets(filter_query, fields)
+        return format_response(result, message=f"Retrieved {len(result)} assets")
+    
+    elif name == "qradar_search_assets_by_ip":
+        ip_address = arguments.get("ip_address")
         
-        elif name == "qradar_get_domain_by_id":
-            domain_id = arguments.get("domain_id")
-            
-            logger.info(f"Getting domain {domain_id}")
-            result = qradar_client.get_domain_by_id(domain_id)
-            return format_response(result, message=f"Retrieved domain {domain_id}")
+        logger.info(f"Searching assets by IP: {ip_address}")
+        result = qradar_client.search_assets(ip_address)
+        return format_response(result, message=f"Found {len(result)} assets with IP {ip_address}")
+    
+    # ==================== Reference Data Tools ====================
+    
+    elif name == "qradar_get_reference_sets":
+        logger.info("Getting reference sets")
+        result = qradar_client.get_reference_sets()
+        return format_response(result, message=f"Retrieved {len(result)} reference sets")
+    
+    elif name == "qradar_get_reference_set_data":
+        ref_set_name = arguments.get("ref_set_name")
         
-        # ==================== Network Hierarchy Tools ====================
+        logger.info(f"Getting reference set data: {ref_set_name}")
+        result = qradar_client.get_reference_set_data(ref_set_name)
+        return format_response(result, message=f"Retrieved data for reference set '{ref_set_name}'")
+    
+    elif name == "qradar_get_reference_set_page":
+        cursor = arguments.get("cursor")
+        if cursor:
+            state = decode_cursor(cursor, ("set", "filter", "offset"))
+            if not isinstance(state["offset"], int) or state["offset"] < 0:
+                raise ValueError(
+                    "Invalid cursor; pass the next_cursor value from the previous page"
+                )
+        else:
+            if not arguments.get("ref_set_name"):
+                raise ValueError("ref_set_name is required unless a cursor is given")
+            state = {
+                "set": arguments["ref_set_name"],
+                "filter": qradar_client.reference_set_filter(
+                    arguments.get("value_prefix"),
+                    arguments.get("last_seen_after"),
+                    arguments.get("last_seen_before")
+                ),
+                "offset": 0,
+            }
+        page_size = int(arguments.get("page_size", state.get("page_size", 1000)))
+        page_size = min(max(page_size, 1), MAX_PAGE_SIZE)
+        
+        logger.info(f"Reading reference set '{state['set']}' from element {state['offset']}")
+        page = next(qradar_client.iter_reference_set_pages(
+            state["set"], state["filter"], page_size=page_size, start=state["offset"]
+        ))
+        data = page.get("data") or []
+        result = {key: value for key, value in page.items() if key != "data"}
+        result["offset"] = state["offset"]
+        result["data"] = data
+        result["next_cursor"] = None
+        if len(data) == page_size:
+            result["next_cursor"] = encode_cursor(
+                dict(state, offset=state["offset"] + len(data), page_size=page_size)
+            )
+        return format_response(
+            result,
+            message=(
+                f"Retrieved elements {state['offset']}-{state['offset'] + len(data) - 1} "
+                f"of reference set '{state['set']}'"
+                if data else f"No more elements in reference set '{state['set']}'"
+            )
+        )
+    
+    elif name == "qradar_check_reference_sets":
+        values = [str(v) for v in arguments.get("values") or []]
+        ref_set_names = arguments.get("ref_set_names")
+        if not values:
+            raise ValueError("values must contain at least one value")
+        if len(values) > MAX_REFERENCE_VALUES:
+            raise ValueError(f"At most {MAX_REFERENCE_VALUES} values can be checked per call")
+        
+        logger.info(f"Checking {len(values)} values against reference sets")
+        result = qradar_client.refset_index.check(values, ref_set_names)
+        return format_response(
+            result,
+            message=(
+                f"{len(result['matches'])} of {len(set(values))} values found "
+                f"in {len(result['sets'])} reference sets"
+            )
+        )
+    
+    elif name == "qradar_bulk_load_reference_set":
+        ref_set_name = arguments.get("ref_set_name")
+        values = arguments.get("values")
+        file_path = arguments.get("file_path")
+        if bool(values) == bool(file_path):
+            raise ValueError("Pass exactly one of values or file_path")
+        
+        logger.info(f"Bulk loading values into reference set '{ref_set_name}'")
+        if file_path:
+            result = qradar_client.bulk_loader.load_file(ref_set_name, file_path)
+        else:
+            result = qradar_client.bulk_loader.load(ref_set_name, values)
+        message = (
+            f"Loaded {result['loaded']} values into '{ref_set_name}' in {result['seconds']}s "
+            f"({result['values_per_second']} values/s)"
+        )
+        if result["failed_chunks"]:
+            message += f"; {len(result['failed_chunks'])} chunks failed"
+        return format_response(result, message=message)
+    
+    # ==================== System Information Tools ====================
+    
+    elif name == "qradar_get_system_info":
+        logger.info("Getting system info")
+        result = qradar_client.get_system_info()
+        return format_response(result, message="Retrieved system information")
+    
+    elif name == "qradar_get_servers":
+        logger.info("Getting servers")
+        result = qradar_client.get_servers()
+        return format_response(result, message=f"Retrieved {len(result)} servers")
+    
+    # ==================== Rules Tools ====================
+    
+    elif name == "qradar_get_rules":
+        filter_query = arguments.get("filter")
+        fields = arguments.get("fields")
         
-        elif name == "qradar_get_network_hierarchy":
-            logger.info("Getting network hierarchy")
-            result = qradar_client.get_network_hierarchy()
-            return format_response(result, message=f"Retrieved {len(result)} network objects")
+        logger.info("Getting rules")
+        result = qradar_client.get_rules(filter_query, fields)
+        return format_response(result, message=f"Retrieved {len(result)} rules")
+    
+    elif name == "qradar_get_rule_by_id":
+        rule_id = arguments.get("rule_id")
         
-        # ==================== Ariel Database Tools ====================
+        logger.info(f"Getting rule {rule_id}")
+        result = qradar_client.get_rule_by_id(rule_id)
+        return format_response(result, message=f"Retrieved rule {rule_id}")
+    
+    elif name == "qradar_get_rule_dependencies":
+        rule_id = arguments.get("rule_id")
         
-        elif name == "qradar_get_ariel_databases":
-            logger.info("Getting Ariel databases")
-            result = qradar_client.get_ariel_databases()
-            return format_response(result, message=f"Retrieved {len(result)} databases")
+        logger.info(f"Getting dependencies of rule {rule_id}")
+        result = qradar_client.rule_graph.dependencies(
+            rule_id, arguments.get("direction", "both"), arguments.get("max_depth", 1)
+        )
+        if result["graph"]["status"] == "building":
+            return format_response(result, message=result["graph"]["message"])
+        counts = [
+            f"{label} {len(result[key])}"
+            for key, label in (("uses", "uses"), ("used_by", "is used by")) if key in result
+        ]
+        return format_response(
+            result,
+            message=f"Rule {rule_id} {' and '.join(counts)} rules and building blocks"
+        )
+    
+    elif name == "qradar_search_rule_graph":
+        limit = arguments.get("limit", 100)
+        if not 1 <= limit <= MAX_RULE_SEARCH_RESULTS:
+            raise ValueError(f"limit must be between 1 and {MAX_RULE_SEARCH_RESULTS}")
+        
+        logger.info("Searching the rule graph")
+        result = qradar_client.rule_graph.search(
+            limit,
+            query=arguments.get("query"),
+            kind=arguments.get("kind"),
+            rule_type=arguments.get("type"),
+            enabled=arguments.get("enabled"),
+            origin=arguments.get("origin"),
+            unused=arguments.get("unused")
+        )
+        if result["graph"]["status"] == "building":
+            return format_response(result, message=result["graph"]["message"])
+        return format_response(
+            result,
+            message=f"Found {result['total']} rules and building blocks"
+        )
+    
+    # ==================== Saved Search Tools ====================
+    
+    elif name == "qradar_get_saved_searches":
+        logger.info("Getting saved searches")
+        result = qradar_client.get_saved_searches()
+        return format_response(result, message=f"Retrieved {len(result)} saved searches")
+    
+    elif name == "qradar_get_saved_search_by_id":
+        search_id = arguments.get("search_id")
         
-        elif name == "qradar_get_ariel_fields":
-            database_name = arguments.get("database_name", "events")
-            
-            logger.info(f"Getting Ariel fields for {database_name}")
-            result = qradar_client.get_ariel_fields(database_name)
-            return format_response(result, message=f"Retrieved {len(result)} fields for {database_name}")
+        logger.info(f"Getting saved search {search_id}")
+        result = qradar_client.get_saved_search_by_id(search_id)
+        return format_response(result, message=f"Retrieved saved search {search_id}")
+    
+    elif name == "qradar_execute_saved_search":
+        search_id = arguments.get("search_id")
+        max_wait = arguments.get("max_wait", 300)
+        max_age = arguments.get("max_age_seconds")
+        
+        logger.info(f"Executing saved search {search_id}")
+        result = qradar_client.execute_saved_search(search_id, max_wait, max_age)
+        if "materialized" in result:
+            message = (
+                f"Served saved search {search_id} from its scheduled result "
+                f"({result['materialized']['age_seconds']}s old)"
+            )
+        else:
+            message = f"Executed saved search {search_id}"
+        return format_response(result, message=message)
+    
+    elif name == "qradar_execute_saved_searches":
+        search_ids = [str(i) for i in arguments.get("search_ids") or []]
+        max_wait = arguments.get("max_wait", 300)
+        if not search_ids:
+            raise ValueError("search_ids must contain at least one saved search ID")
+        if len(search_ids) > MAX_SAVED_SEARCHES:
+            raise ValueError(f"At most {MAX_SAVED_SEARCHES} saved searches per call")
+        
+        report = progress_reporter()
+        total = len(set(search_ids))
+        finished = [0]
+        finished_lock = threading.Lock()
+        
+        def on_result(entry: dict) -> None:
+            if report is None:
+                return
+            with finished_lock:
+                finished[0] += 1
+                done = finished[0]
+            label = entry.get("name") or f"Saved search {entry['saved_search_id']}"
+            if entry.get("status") == "ERROR":
+                summary = f"{label} failed: {entry['error']}"
+            else:
+                summary = f"{label}: {entry.get('record_count', 0)} rows"
+            try:
+                report(done, total, summary)
+            except Exception as e:
+                logger.warning(f"Could not send progress notification: {str(e)}")
+        
+        logger.info(f"Executing {total} saved searches")
+        result = qradar_client.execute_saved_searches(search_ids, max_wait, on_result)
+        failed = sum(1 for entry in result if entry.get("status") == "ERROR")
+        message = f"Executed {len(result)} saved searches"
+        if failed:
+            message += f" ({failed} failed)"
+        return format_response(result, message=message)
+    
+    elif name == "qradar_get_scheduled_searches":
+        if qradar_client.scheduler is None:
+            return format_response([], message="No scheduled searches (set QRADAR_SCHEDULE_FILE)")
         
-        # ==================== Event Category Tools ====================
+        logger.info("Getting scheduled searches")
+        result = qradar_client.scheduler.describe()
+        return format_response(result, message=f"Retrieved {len(result)} scheduled searches")
+    
+    elif name == "qradar_get_materialized_results":
+        job_name = arguments.get("name")
+        if qradar_client.scheduler is None:
+            raise ValueError("No scheduled searches are configured (set QRADAR_SCHEDULE_FILE)")
         
-        elif name == "qradar_get_event_categories":
-            logger.info("Getting event categories")
-            result = qradar_client.get_event_categories()
-            return format_response(result, message=f"Retrieved {len(result)} event categories")
+        logger.info(f"Getting materialized results of '{job_name}'")
+        result = qradar_client.scheduler.materialized(job_name)
+        return format_response(
+            result,
+            message=(
+                f"Retrieved stored result of '{job_name}' "
+                f"({result['materialized']['age_seconds']}s old)"
+            )
+        )
+    
+    # ==================== Offense Note Tools ====================
+    
+    elif name == "qradar_get_offense_notes":
+        offense_id = arguments.get("offense_id")
         
-        elif name == "qradar_search_event_categories":
-            search_term = arguments.get("search_term")
-            
-            logger.info(f"Searching event categories for: {search_term}")
-            result = qradar_client.search_event_categories(search_term)
-            return format_response(result, message=f"Found {len(result)} matching categories")
+        logger.info(f"Getting notes for offense {offense_id}")
+        result = qradar_client.get_offense_notes(offense_id)
+        return format_response(result, message=f"Retrieved {len(result)} notes for offense {offense_id}")
+    
+    elif name == "qradar_add_offense_note":
+        offense_id = arguments.get("offense_id")
+        note_text = arguments.get("note_text")
         
-        # ==================== Building Block Tools ====================
+        logger.info(f"Adding note to offense {offense_id}")
+        result = qradar_client.add_offense_note(offense_id, note_text)
+        return format_response(result, message=f"Added note to offense {offense_id}")
+    
+    elif name == "qradar_update_offense_status":
+        offense_id = arguments.get("offense_id")
+        status = arguments.get("status")
+        closing_reason_id = arguments.get("closing_reason_id")
+        
+        logger.info(f"Updating offense {offense_id} status to {status}")
+        result = qradar_client.update_offense_status(offense_id, status, closing_reason_id)
+        return format_response(result, message=f"Updated offense {offense_id} status to {status}")
+    
+    elif name == "qradar_get_closing_reasons":
+        logger.info("Getting closing reasons")
+        result = qradar_client.get_closing_reasons()
+        return format_response(result, message=f"Retrieved {len(result)} closing reasons")
+    
+    elif name == "qradar_assign_offense":
+        offense_id = arguments.get("offense_id")
+        assigned_to = arguments.get("assigned_to")
         
-        elif name == "qradar_get_building_blocks":
-            filter_query = arguments.get("filter")
-            
-            logger.info("Getting building blocks")
-            result = qradar_client.get_building_blocks(filter_query)
-            return format_response(result, message=f"Retrieved {len(result)} building blocks")
+        logger.info(f"Assigning offense {offense_id} to {assigned_to}")
+        result = qradar_client.assign_offense(offense_id, assigned_to)
+        return format_response(result, message=f"Assigned offense {offense_id} to {assigned_to}")
+    
+    elif name == "qradar_bulk_triage_offenses":
+        dry_run = arguments.get("dry_run", False)
+        
+        logger.info(f"Triaging offenses{' (dry run)' if dry_run else ''}")
+        result = qradar_client.triage_offenses(
+            offense_ids=arguments.get("offense_ids"),
+            filter_query=arguments.get("filter"),
+            note_text=arguments.get("note_text"),
+            status=arguments.get("status"),
+            closing_reason_id=arguments.get("closing_reason_id"),
+            assigned_to=arguments.get("assigned_to"),
+            dry_run=dry_run,
+            max_offenses=MAX_TRIAGE_OFFENSES
+        )
+        counts = ", ".join(f"{n} {result_name}" for result_name, n in result["counts"].items())
+        return format_response(
+            result,
+            message=f"{'Dry run: ' if dry_run else ''}{result['matched']} offenses matched ({counts})"
+        )
+    
+    # ==================== Custom Property Tools ====================
+    
+    elif name == "qradar_get_custom_properties":
+        logger.info("Getting custom properties")
+        result = qradar_client.get_custom_properties()
+        return format_response(result, message=f"Retrieved {len(result)} custom properties")
+    
+    elif name == "qradar_get_custom_property_by_id":
+        property_id = arguments.get("property_id")
         
-        elif name == "qradar_get_building_block_by_id":
-            block_id = arguments.get("block_id")
-            
-            logger.info(f"Getting building block {block_id}")
-            result = qradar_client.get_building_block_by_id(block_id)
-            return format_response(result, message=f"Retrieved building block {block_id}")
+        logger.info(f"Getting custom property {property_id}")
+        result = qradar_client.get_custom_property_by_id(property_id)
+        return format_response(result, message=f"Retrieved custom property {property_id}")
+    
+    # ==================== Domain Management Tools ====================
+    
+    elif name == "qradar_get_domains":
+        logger.info("Getting domains")
+        result = qradar_client.get_domains()
+        return format_response(result, message=f"Retrieved {len(result)} domains")
+    
+    elif name == "qradar_get_domain_by_id":
+        domain_id = arguments.get("domain_id")
         
-        # ==================== User Management Tools ====================
+        logger.info(f"Getting domain {domain_id}")
+        result = qradar_client.get_domain_by_id(domain_id)
+        return format_response(result, message=f"Retrieved domain {domain_id}")
+    
+    # ==================== Network Hierarchy Tools ====================
+    
+    elif name == "qradar_get_network_hierarchy":
+        logger.info("Getting network hierarchy")
+        result = qradar_client.get_network_hierarchy()
+        return format_response(result, message=f"Retrieved {len(result)} network objects")
+    
+    # ==================== IP Index Tools ====================
+    
+    elif name in ("qradar_lookup_networks", "qradar_lookup_assets_by_ip"):
+        ips = arguments.get("ips") or []
+        if not ips:
+            raise ValueError("ips must contain at least one IP address")
+        if len(ips) > MAX_LOOKUP_IPS:
+            raise ValueError(f"At most {MAX_LOOKUP_IPS} IPs can be looked up per call")
+        
+        if name == "qradar_lookup_networks":
+            logger.info(f"Looking up networks for {len(ips)} IPs")
+            result = qradar_client.ip_index.lookup_networks(ips)
+            found = sum(1 for network in result["results"].values() if network)
+        else:
+            logger.info(f"Looking up assets for {len(ips)} IPs")
+            result = qradar_client.ip_index.lookup_assets(ips)
+            found = sum(1 for assets in result["results"].values() if assets)
+        return format_response(result, message=f"Matched {found} of {len(ips)} IPs")
+    
+    # ==================== Ariel Database Tools ====================
+    
+    elif name == "qradar_get_ariel_databases":
+        logger.info("Getting Ariel databases")
+        result = qradar_client.get_ariel_databases()
+        return format_response(result, message=f"Retrieved {len(result)} databases")
+    
+    elif name == "qradar_get_ariel_fields":
+        database_name = arguments.get("database_name", "events")
         
-        elif name == "qradar_get_users":
-            logger.info("Getting users")
-            result = qradar_client.get_users()
-            return format_response(result, message=f"Retrieved {len(result)} users")
+        logger.info(f"Getting Ariel fields for {database_name}")
+        result = qradar_client.get_ariel_fields(database_name)
+        return format_response(result, message=f"Retrieved {len(result)} fields for {database_name}")
+    
+    # ==================== Event Category Tools ====================
+    
+    elif name == "qradar_get_event_categories":
+        logger.info("Getting event categories")
+        result = qradar_client.get_event_categories()
+        return format_response(result, message=f"Retrieved {len(result)} event categories")
+    
+    elif name == "qradar_search_event_categories":
+        search_term = arguments.get("search_term")
         
-        elif name == "qradar_get_user_by_id":
-            user_id = arguments.get("user_id")
-            
-            logger.info(f"Getting user {user_id}")
-            result = qradar_client.get_user_by_id(user_id)
-            return format_response(result, message=f"Retrieved user {user_id}")
+        logger.info(f"Searching event categories for: {search_term}")
+        result = qradar_client.search_event_categories(search_term)
+        return format_response(result, message=f"Found {len(result)} matching categories")
+    
+    # ==================== Building Block Tools ====================
+    
+    elif name == "qradar_get_building_blocks":
+        filter_query = arguments.get("filter")
         
-        # ==================== Reports Tools ====================
+        logger.info("Getting building blocks")
+        result = qradar_client.get_building_blocks(filter_query)
+        return format_response(result, message=f"Retrieved {len(result)} building blocks")
+    
+    elif name == "qradar_get_building_block_by_id":
+        block_id = arguments.get("block_id")
         
-        elif name == "qradar_get_reports":
-            logger.info("Getting reports")
-            result = qradar_client.get_reports()
-            return format_response(result, message=f"Retrieved {len(result)} reports")
+        logger.info(f"Getting building block {block_id}")
+        result = qradar_client.get_building_block_by_id(block_id)
+        return format_response(result, message=f"Retrieved building block {block_id}")
+    
+    # ==================== User Management Tools ====================
+    
+    elif name == "qradar_get_users":
+        logger.info("Getting users")
+        result = qradar_client.get_users()
+        return format_response(result, message=f"Retrieved {len(result)} users")
+    
+    elif name == "qradar_get_user_by_id":
+        user_id = arguments.get("user_id")
         
-        else:
-            raise ValueError(f"Unknown tool: {name}")
-            
-    except Exception as e:
-        logger.error(f"Error executing tool {name}: {str(e)}")
+        logger.info(f"Getting user {user_id}")
+        result = qradar_client.get_user_by_id(user_id)
+        return format_response(result, message=f"Retrieved user {user_id}")
+    
+    # ==================== Reports Tools ====================
+    
+    elif name == "qradar_get_reports":
+        logger.info("Getting reports")
+        result = qradar_client.get_reports()
+        return format_response(result, message=f"Retrieved {len(result)} reports")
+    
+    # ==================== Batch Lookup Tools ====================
+    
+    elif name in BATCH_LOOKUPS:
+        id_argument, noun, method_name = BATCH_LOOKUPS[name]
+        ids = arguments.get(id_argument)
+        if not isinstance(ids, list) or not ids:
+            raise ValueError(f"{id_argument} must be a non-empty list of IDs")
+        if len(ids) > MAX_BATCH_IDS:
+            raise ValueError(f"At most {MAX_BATCH_IDS} IDs per call")
+        
+        logger.info(f"Getting {len(ids)} {noun}")
+        result = getattr(qradar_client, method_name)(ids, arguments.get("fields"))
         return format_response(
-            {"error": str(e)},
-            success=False,
-            message=f"Error executing {name}: {str(e)}"
+            result,
+            message=f"Retrieved {len(result['results'])} of {len(set(ids))} {noun}"
         )
+    
+    else:
+        raise ValueError(f"Unknown tool: {name}")
+
+
+@app.call_tool()
+async def call_tool(name: str, arguments: Any) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+    """Handle tool execution"""
+    start = time.perf_counter()
+    
+    with tracing.span("call_tool", tool=name) as span:
+        try:
+            # The client is synchronous; run it on a worker thread so concurrent
+            # requests (and other sessions sharing this process) are not serialized
+            _tool_loop.set(asyncio.get_running_loop())
+            circuit.reset_stale_results()
+            result = await asyncio.to_thread(profiling.run, name, arguments or {}, _dispatch_tool)
+            metrics.TOOL_LATENCY.observe(time.perf_counter() - start, tool=name, status="success")
+            return result
+        
+        except Exception as e:
+            metrics.TOOL_LATENCY.observe(time.perf_counter() - start, tool=name, status="error")
+            span.set_attribute("error", str(e))
+            logger.error(f"Error executing tool {name}: {str(e)}")
+            return format_response(
+                {"error": str(e)},
+                success=False,
+                message=f"Error executing {name}: {str(e)}"
+            )
 
 
 async def main():
     """Main entry point for the MCP server"""
+    from dotenv import load_dotenv
     from mcp.server.stdio import stdio_server
     
+    load_dotenv()
+    tracing.configure_from_env()
+    profiling.configure_from_env()
+    
+    metrics_port = os.getenv("QRADAR_METRICS_PORT")
+    if metrics_port:
+        metrics.start_http_server(int(metrics_port), os.getenv("QRADAR_METRICS_HOST", "127.0.0.1"))
+        logger.info(f"Serving Prometheus metrics on port {metrics_port}")
+    
     async with stdio_server() as (read_stream, write_stream):
         logger.info("IBM QRadar MCP Server starting...")
         await app.run(
@@ -1031,6 +2077,5 @@ async def main():
 
 
 if __name__ == "__main__":
-    import asyncio
     asyncio.run(main())
 
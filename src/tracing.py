@@ -0,0 +1,310 @@
+"""Lightweight span tracing for the IBM QRadar MCP server
+
+A tool call opens a root span in ``call_tool``; HTTP requests, Ariel polling,
+response decoding and serialization open child spans beneath it. When the
+root span finishes the whole trace is exported to a JSON-lines file and/or an
+OTLP/HTTP (JSON) collector, and slow calls are logged as a text waterfall.
+
+Tracing is off unless one of these is set:
+
+    QRADAR_TRACE_FILE            Append spans as JSON lines to this file
+    QRADAR_TRACE_OTLP_ENDPOINT   Collector base URL, e.g. http://127.0.0.1:4318
+    QRADAR_TRACE_SLOW_MS         Log a waterfall for calls slower than this
+
+Author: Ram Krishna Katakwar
+Version: 0.2.0
+License: MIT
+"""
+import contextvars
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger("qradar-mcp.tracing")
+
+SERVICE_NAME = "ibm-qradar-mcp"
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "qradar_current_span", default=None
+)
+
+
+class Span:
+    """A timed operation within a trace"""
+
+    __slots__ = (
+        "name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns",
+        "attributes", "status", "error", "_trace",
+    )
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.status = "ok"
+        self.error: Optional[str] = None
+        # All spans of a trace share one list owned by the root span
+        self._trace: List["Span"] = parent._trace if parent else []
+        self._trace.append(self)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    """Stand-in yielded when tracing is disabled"""
+
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+# ==================== Exporters ====================
+
+class JsonLinesExporter:
+    """Append finished spans to a file, one JSON object per line"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        lines = "".join(json.dumps(s.to_dict(), default=str) + "\n" for s in spans)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+
+
+class OTLPHttpExporter:
+    """Send traces to an OTLP/HTTP collector using the JSON encoding"""
+
+    def __init__(self, endpoint: str, timeout: float = 5.0):
+        endpoint = endpoint.rstrip("/")
+        if not endpoint.endswith("/v1/traces"):
+            endpoint += "/v1/traces"
+        self.endpoint = endpoint
+        self.timeout = timeout
+        # Export from a background thread so tool calls never wait on the collector
+        self._queue: "queue.Queue[List[Span]]" = queue.Queue(maxsize=1000)
+        self._thread = threading.Thread(target=self._worker, name="qradar-otlp", daemon=True)
+        self._thread.start()
+
+    def export(self, spans: List[Span]) -> None:
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            logger.warning("OTLP export queue full, dropping trace")
+
+    def _worker(self) -> None:
+        while True:
+            spans = self._queue.get()
+            try:
+                body = json.dumps(self._encode(spans), default=str).encode("utf-8")
+                req = urllib.request.Request(
+                    self.endpoint,
+                    data=body,
+                    headers={"Content-Type": "application/json"},
+                    method="POST",
+                )
+                urllib.request.urlopen(req, timeout=self.timeout).close()
+            except Exception as e:
+                logger.warning(f"OTLP export failed: {str(e)}")
+
+    @staticmethod
+    def _attribute(key: str, value: Any) -> Dict[str, Any]:
+        if isinstance(value, bool):
+            return {"key": key, "value": {"boolValue": value}}
+        if isinstance(value, int):
+            return {"key": key, "value": {"intValue": str(value)}}
+        if isinstance(value, float):
+            return {"key": key, "value": {"doubleValue": value}}
+        return {"key": key, "value": {"stringValue": str(value)}}
+
+    def _encode(self, spans: List[Span]) -> Dict[str, Any]:
+        otlp_spans = []
+        for span in spans:
+            otlp_span = {
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": 1,  # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": [self._attribute(k, v) for k, v in span.attributes.items()],
+                "status": {"code": 2, "message": span.error or ""}
+                if span.status == "error" else {"code": 1},
+            }
+            if span.parent_id:
+                otlp_span["parentSpanId"] = span.parent_id
+            otlp_spans.append(otlp_span)
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [self._attribute("service.name", SERVICE_NAME)]},
+                "scopeSpans": [{"scope": {"name": "qradar-mcp"}, "spans": otlp_spans}],
+            }]
+        }
+
+
+# ==================== Tracer ====================
+
+class Tracer:
+    """Creates spans and hands finished traces to the exporters"""
+
+    def __init__(self, exporters: Optional[List[Any]] = None, slow_ms: Optional[float] = None):
+        self.exporters = exporters or []
+        self.slow_ms = slow_ms
+        self.enabled = bool(self.exporters) or slow_ms is not None
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Any]:
+        if not self.enabled:
+            yield _NOOP_SPAN
+            return
+
+        parent = _current_span.get()
+        current = Span(name, parent, attributes)
+        token = _current_span.set(current)
+        try:
+            yield current
+        except BaseException as e:
+            current.status = "error"
+            current.error = str(e)
+            raise
+        finally:
+            current.end_ns = time.time_ns()
+            _current_span.reset(token)
+            if parent is None:
+                self._finish_trace(current)
+
+    def _finish_trace(self, root: Span) -> None:
+        spans = list(root._trace)
+        for exporter in self.exporters:
+            try:
+                exporter.export(spans)
+            except Exception as e:
+                logger.warning(f"Trace export failed: {str(e)}")
+        if self.slow_ms is not None and root.duration_ms >= self.slow_ms:
+            logger.warning(
+                f"Slow call {root.name} ({root.duration_ms:.1f} ms):\n{format_waterfall(spans)}"
+            )
+
+
+def format_waterfall(spans: List[Span], width: int = 40) -> str:
+    """
+    Render a trace as a text waterfall
+
+    Args:
+        spans: Spans of a single trace (root first)
+        width: Width of the timing bar in characters
+
+    Returns:
+        One line per span: offset, duration, bar and indented name
+    """
+    if not spans:
+        return ""
+    root = spans[0]
+    total = max(root.duration_ms, 0.001)
+    children: Dict[Optional[str], List[Span]] = {}
+    for span in spans:
+        children.setdefault(span.parent_id, []).append(span)
+
+    lines = []
+
+    def walk(span: Span, depth: int) -> None:
+        offset = (span.start_ns - root.start_ns) / 1e6
+        start_col = min(width - 1, int(offset / total * width))
+        bar_len = max(1, int(span.duration_ms / total * width))
+        bar = " " * start_col + "█" * min(bar_len, width - start_col)
+        attrs = " ".join(f"{k}={v}" for k, v in span.attributes.items())
+        marker = " !" if span.status == "error" else ""
+        lines.append(
+            f"{offset:9.1f}ms {span.duration_ms:9.1f}ms |{bar:<{width}}| "
+            f"{'  ' * depth}{span.name}{marker} {attrs}".rstrip()
+        )
+        for child in sorted(children.get(span.span_id, []), key=lambda s: s.start_ns):
+            walk(child, depth + 1)
+
+    walk(root, 0)
+    return "\n".join(lines)
+
+
+_tracer = Tracer()
+
+
+def configure(
+    trace_file: Optional[str] = None,
+    otlp_endpoint: Optional[str] = None,
+    slow_ms: Optional[float] = None
+) -> Tracer:
+    """
+    Replace the global tracer
+
+    Args:
+        trace_file: JSON-lines output file
+        otlp_endpoint: OTLP/HTTP collector base URL
+        slow_ms: Log a waterfall for root spans at least this slow
+
+    Returns:
+        The new tracer
+    """
+    global _tracer
+    exporters: List[Any] = []
+    if trace_file:
+        exporters.append(JsonLinesExporter(trace_file))
+    if otlp_endpoint:
+        exporters.append(OTLPHttpExporter(otlp_endpoint))
+    _tracer = Tracer(exporters, slow_ms)
+    return _tracer
+
+
+def configure_from_env() -> Tracer:
+    """Configure the global tracer from QRADAR_TRACE_* environment variables"""
+    slow_ms = os.getenv("QRADAR_TRACE_SLOW_MS")
+    return configure(
+        trace_file=os.getenv("QRADAR_TRACE_FILE"),
+        otlp_endpoint=os.getenv("QRADAR_TRACE_OTLP_ENDPOINT"),
+        slow_ms=float(slow_ms) if slow_ms else None,
+    )
+
+
+def span(name: str, **attributes: Any):
+    """Open a span under the current one (no-op when tracing is disabled)"""
+    return _tracer.span(name, **attributes)
+
+
+def current_span() -> Optional[Span]:
+    """The innermost active span in this context, if any"""
+    return _current_span.get()
@@ -0,0 +1,29 @@
+"""Bulk load files are confined to QRADAR_BULK_LOAD_DIR"""
+import os
+
+import pytest
+
+from src.bulk_load import BulkLoader
+
+
+def test_file_loading_is_off_without_a_directory(tmp_path):
+    (tmp_path / "iocs.txt").write_text("10.0.0.1\n")
+    with pytest.raises(ValueError, match="disabled"):
+        BulkLoader(None).resolve_file(str(tmp_path / "iocs.txt"))
+
+
+def test_only_files_inside_the_directory_are_resolved(tmp_path):
+    feeds = tmp_path / "feeds"
+    feeds.mkdir()
+    (feeds / "iocs.txt").write_text("10.0.0.1\n")
+    (tmp_path / "secret.txt").write_text("hunter2\n")
+    os.symlink(tmp_path / "secret.txt", feeds / "link.txt")
+    loader = BulkLoader(None, file_dir=str(feeds))
+
+    assert loader.resolve_file("iocs.txt") == str(feeds / "iocs.txt")
+    assert loader.resolve_file(str(feeds / "iocs.txt")) == str(feeds / "iocs.txt")
+    for path in ("../secret.txt", str(tmp_path / "secret.txt"), "link.txt", "/etc/passwd"):
+        with pytest.raises(ValueError, match="outside"):
+            loader.resolve_file(path)
+    with pytest.raises(ValueError, match="not found"):
+        loader.resolve_file("missing.txt")
@@ -0,0 +1,22 @@
+"""Replayed responses behave like fully read responses"""
+import requests
+
+from benchmarks.mock_qradar import MockConfig, MockQRadarServer
+from src import cassette
+
+
+def test_replayed_response_can_be_closed_and_streamed(tmp_path):
+    path = str(tmp_path / "cassette.jsonl.gz")
+    with MockQRadarServer(MockConfig(offenses=3)) as mock:
+        recorder = cassette.RecordingAdapter(path, "token")
+        session = requests.Session()
+        session.mount("http://", recorder)
+        recorded = session.get(f"{mock.url}/api/siem/offenses", headers={"SEC": "token"})
+        recorder.close()
+
+    session = requests.Session()
+    session.mount("http://", cassette.ReplayAdapter(path, latency_scale=0))
+    url = f"{mock.url}/api/siem/offenses"
+    assert b"".join(session.get(url, stream=True).iter_content(64)) == recorded.content
+    session.get(url, stream=True).close()
+    assert session.get(url).json() == recorded.json()
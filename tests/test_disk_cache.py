@@ -0,0 +1,115 @@
+"""Disk cache revalidation probes and an unusable cache file"""
+import requests
+from requests.adapters import BaseAdapter
+
+from src import disk_cache
+from src.disk_cache import CachingAdapter, DiskCache
+
+URL = "https://qradar.example/api/analytics/rules"
+
+
+class FakeAdapter(BaseAdapter):
+    """Answers every request with the next queued (status, headers, body)"""
+
+    def __init__(self, answers):
+        super().__init__()
+        self.answers = list(answers)
+        self.sent = []
+        self.closed = []
+
+    def send(self, request, **kwargs):
+        status, headers, body = self.answers.pop(0)
+        response = requests.Response()
+        response.status_code = status
+        response.headers.update(headers)
+        response._content = body
+        response.request = request
+        response.close = lambda: self.closed.append(status)
+        self.sent.append(request)
+        return response
+
+    def close(self):
+        pass
+
+
+def _get(adapter):
+    session = requests.Session()
+    session.mount("https://", adapter)
+    return session.get(URL)
+
+
+def _adapter(tmp_path, answers):
+    inner = FakeAdapter(answers)
+    cache = DiskCache(str(tmp_path / "cache.sqlite3"))
+    # fresh_seconds=0 makes every later request revalidate
+    return inner, CachingAdapter(inner, cache, "token", fresh_seconds=0)
+
+
+def test_matching_probe_is_closed_and_cache_served(tmp_path):
+    inner, adapter = _adapter(tmp_path, [
+        (200, {}, b"[1, 2, 3]"),
+        (206, {"Content-Range": "items 0-0/3"}, b"[1]"),
+    ])
+    _get(adapter)
+    response = _get(adapter)
+    assert response.json() == [1, 2, 3]
+    assert response.headers[disk_cache.CACHE_HEADER] == "revalidated"
+    assert inner.sent[1].headers["Range"] == "items=0-0"
+    assert inner.closed == [206]
+
+
+def test_changed_total_closes_probe_and_downloads_again(tmp_path):
+    inner, adapter = _adapter(tmp_path, [
+        (200, {}, b"[1, 2, 3]"),
+        (206, {"Content-Range": "items 0-0/4"}, b"[1]"),
+        (200, {}, b"[1, 2, 3, 4]"),
+    ])
+    _get(adapter)
+    assert _get(adapter).json() == [1, 2, 3, 4]
+    assert inner.closed == [206]
+    assert len(inner.sent) == 3
+
+
+def test_probe_answered_with_full_list_is_used_directly(tmp_path):
+    inner, adapter = _adapter(tmp_path, [
+        (200, {}, b"[1, 2, 3]"),
+        (200, {}, b"[1, 2, 3, 4]"),
+    ])
+    _get(adapter)
+    assert _get(adapter).json() == [1, 2, 3, 4]
+    assert len(inner.sent) == 2
+    assert inner.closed == []
+
+
+def test_ranged_probe_answered_with_200_is_not_stored_as_the_list(tmp_path):
+    # QRadar honours Range with a 200 and a partial Content-Range
+    inner, adapter = _adapter(tmp_path, [
+        (200, {}, b"[1, 2, 3]"),
+        (200, {"Content-Range": "items 0-0/3"}, b"[1]"),
+        (200, {"Content-Range": "items 0-0/4"}, b"[1]"),
+        (200, {}, b"[1, 2, 3, 4]"),
+    ])
+    _get(adapter)
+    response = _get(adapter)
+    assert response.json() == [1, 2, 3]
+    assert response.headers[disk_cache.CACHE_HEADER] == "revalidated"
+
+    assert _get(adapter).json() == [1, 2, 3, 4]
+    assert "Range" not in inner.sent[3].headers
+    assert inner.closed == [200, 200]
+
+
+def test_unwritable_path_disables_the_cache(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    assert disk_cache.open_cache(str(blocker / "cache.sqlite3"), 1024) is None
+
+
+def test_cached_response_can_be_closed_and_streamed(tmp_path):
+    inner = FakeAdapter([(200, {}, b"[1, 2, 3]")])
+    adapter = CachingAdapter(inner, DiskCache(str(tmp_path / "cache.sqlite3")), "token")
+    _get(adapter)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    assert b"".join(session.get(URL, stream=True).iter_content(2)) == b"[1, 2, 3]"
+    session.get(URL, stream=True).close()
@@ -0,0 +1,57 @@
+"""A hedged GET does not let an error answer beat a slower success"""
+import time
+
+import requests
+
+from src.qradar_client import QRadarClient
+
+
+def _response(status):
+    response = requests.Response()
+    response.status_code = status
+    response._content = b"{}"
+    response._content_consumed = True
+    return response
+
+
+def _client(monkeypatch, answers):
+    """A client whose _send answers in order with (delay, status or exception)"""
+    client = QRadarClient("https://qradar.example", "token", hedge_endpoints=["*"])
+    monkeypatch.setattr(client.hedge_policy, "delay_for", lambda template: 0.01)
+    monkeypatch.setattr(client.hedge_policy, "try_spend", lambda: True)
+    queue = list(answers)
+
+    def send(method, endpoint, **kwargs):
+        delay, outcome = queue.pop(0)
+        time.sleep(delay)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return _response(outcome)
+
+    monkeypatch.setattr(client, "_send", send)
+    return client
+
+
+class _Span:
+    def set_attribute(self, key, value):
+        pass
+
+
+def _hedged(client):
+    return client._hedged_send("GET", "/siem/offenses", "/siem/offenses", _Span())
+
+
+def test_fast_5xx_waits_for_slower_success(monkeypatch):
+    # Primary answers 503 after the hedge was sent; the hedge succeeds later
+    client = _client(monkeypatch, [(0.05, 503), (0.2, 200)])
+    assert _hedged(client).status_code == 200
+
+
+def test_fast_429_waits_for_slower_success(monkeypatch):
+    client = _client(monkeypatch, [(0.2, 200), (0.0, 429)])
+    assert _hedged(client).status_code == 200
+
+
+def test_error_answer_returned_when_both_fail(monkeypatch):
+    client = _client(monkeypatch, [(0.05, 502), (0.1, requests.ConnectionError("reset"))])
+    assert _hedged(client).status_code == 502
@@ -0,0 +1,88 @@
+"""Network hierarchy CIDR flattening and longest-prefix lookups"""
+import ipaddress
+import random
+
+import pytest
+
+from src.ip_index import NetworkIndex, parse_ip
+
+
+def _networks(*cidrs):
+    return [{"id": i, "name": cidr, "cidr": cidr} for i, cidr in enumerate(cidrs)]
+
+
+def _interval(cidr, name):
+    network = ipaddress.ip_network(cidr)
+    return int(network.network_address), int(network.broadcast_address), {"name": name}
+
+
+def test_flatten_gives_nested_ranges_to_the_innermost_network():
+    starts, ends, owners = NetworkIndex._flatten([
+        _interval("10.0.0.0/8", "outer"),
+        _interval("10.1.0.0/16", "middle"),
+        _interval("10.1.2.0/24", "inner"),
+        _interval("10.2.0.0/16", "sibling"),
+    ])
+    flattened = [
+        (str(ipaddress.ip_address(s)), str(ipaddress.ip_address(e)), o["name"])
+        for s, e, o in zip(starts, ends, owners)
+    ]
+    assert flattened == [
+        ("10.0.0.0", "10.0.255.255", "outer"),
+        ("10.1.0.0", "10.1.1.255", "middle"),
+        ("10.1.2.0", "10.1.2.255", "inner"),
+        ("10.1.3.0", "10.1.255.255", "middle"),
+        ("10.2.0.0", "10.2.255.255", "sibling"),
+        ("10.3.0.0", "10.255.255.255", "outer"),
+    ]
+
+
+def test_flatten_ranges_are_disjoint_and_sorted_with_shared_edges():
+    starts, ends, owners = NetworkIndex._flatten([
+        _interval("192.168.0.0/16", "outer"),
+        _interval("192.168.0.0/24", "first"),     # shares the start
+        _interval("192.168.255.0/24", "last"),    # shares the end
+        _interval("192.168.0.0/24", "duplicate"),
+    ])
+    assert all(s <= e for s, e in zip(starts, ends))
+    assert all(e < s for e, s in zip(ends, starts[1:]))
+    assert starts[0] == int(ipaddress.ip_address("192.168.0.0"))
+    assert ends[-1] == int(ipaddress.ip_address("192.168.255.255"))
+    assert owners[-1]["name"] == "last"
+
+
+@pytest.mark.parametrize("ip, expected", [
+    ("10.1.2.3", "10.1.2.0/24"),
+    ("10.1.9.9", "10.1.0.0/16"),
+    ("10.200.0.1", "10.0.0.0/8"),
+    ("11.0.0.1", None),
+    ("2001:db8::1", "2001:db8::/32"),
+    ("2001:db8:1::1", "2001:db8:1::/48"),
+])
+def test_lookup_returns_most_specific_network(ip, expected):
+    index = NetworkIndex(_networks(
+        "10.0.0.0/8", "10.1.0.0/16", "10.1.2.0/24", "2001:db8::/32", "2001:db8:1::/48",
+        "not a cidr",
+    ))
+    found = index.lookup(parse_ip(ip))
+    assert (found["name"] if found else None) == expected
+    assert index.size == 5
+
+
+def test_lookup_matches_brute_force_on_random_hierarchy():
+    rng = random.Random(41)
+    cidrs = {"0.0.0.0/0"}
+    while len(cidrs) < 300:
+        prefix = rng.randint(8, 30)
+        address = ipaddress.ip_address(rng.getrandbits(32))
+        cidrs.add(str(ipaddress.ip_network(f"{address}/{prefix}", strict=False)))
+    index = NetworkIndex(_networks(*cidrs))
+    networks = [ipaddress.ip_network(c) for c in cidrs]
+    samples = [ipaddress.ip_address(rng.getrandbits(32)) for _ in range(500)]
+    samples += [n.network_address for n in networks] + [n.broadcast_address for n in networks]
+    for ip in samples:
+        best = max((n for n in networks if ip in n), key=lambda n: n.prefixlen)
+        assert index.lookup(ip)["name"] == str(best)
+    assert [n["name"] if n else None for n in index.classify([str(ip) for ip in samples])] == [
+        index.lookup(ip)["name"] for ip in samples
+    ]
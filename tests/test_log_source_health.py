@@ -0,0 +1,41 @@
+"""Log source health delta syncs overlap the previous sync"""
+from src.log_source_health import LogSourceHealth
+
+
+class FakeClient:
+    def __init__(self, sources):
+        self.sources = sources
+        self.filters = []
+
+    def get_log_sources(self, filter_query=None, fields=None, range_header=None):
+        self.filters.append(filter_query)
+        start, end = (int(v) for v in range_header.split("-"))
+        return self.sources[start:end + 1]
+
+    def get_log_source_types(self):
+        return []
+
+
+def _source(source_id, last_event, modified=1000):
+    return {"id": source_id, "name": f"s{source_id}", "type_id": 1, "domain_id": 0,
+            "enabled": True, "last_event_time": last_event, "modified_date": modified}
+
+
+def test_delta_filter_starts_a_safety_margin_before_the_newest_values():
+    client = FakeClient([_source(1, 500_000, 200_000), _source(2, 900_000, 300_000)])
+    health = LogSourceHealth(client, refresh_seconds=60)
+    health._sync()
+    health._sync_seconds = 2.5
+    health._sync()
+    margin = (60 + 2.5) * 1000
+    assert client.filters[-1] == (
+        f"last_event_time >= {int(900_000 - margin)} or modified_date >= {int(300_000 - margin)}"
+    )
+
+
+def test_margin_never_goes_below_zero():
+    client = FakeClient([_source(1, 10, 10)])
+    health = LogSourceHealth(client, refresh_seconds=60)
+    health._sync()
+    health._sync()
+    assert client.filters[-1] == "last_event_time >= 0 or modified_date >= 0"
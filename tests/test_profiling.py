@@ -0,0 +1,35 @@
+"""Overlapping profiled calls do not break each other"""
+import os
+import threading
+
+from src.profiling import Profiler
+
+
+def test_overlapping_call_runs_unprofiled(tmp_path):
+    profiler = Profiler(tools=frozenset({"*"}), modes=frozenset({"cpu", "memory"}),
+                        output_dir=str(tmp_path))
+    inside = threading.Event()
+    release = threading.Event()
+    results = {}
+
+    def slow(name, arguments):
+        inside.set()
+        release.wait(5)
+        return "slow"
+
+    worker = threading.Thread(
+        target=lambda: results.setdefault("slow", profiler.run("slow_tool", {}, slow))
+    )
+    worker.start()
+    assert inside.wait(5)
+    assert profiler.run("fast_tool", {}, lambda name, arguments: "fast") == "fast"
+    release.set()
+    worker.join(5)
+
+    assert results["slow"] == "slow"
+    names = os.listdir(tmp_path)
+    assert any("slow_tool" in n for n in names)
+    assert not any("fast_tool" in n for n in names)
+    # The lock is free again afterwards
+    assert profiler.run("fast_tool", {}, lambda name, arguments: "fast") == "fast"
+    assert any("fast_tool" in n for n in os.listdir(tmp_path))
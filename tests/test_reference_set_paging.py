@@ -0,0 +1,47 @@
+"""Reference set paging cursors and element filters"""
+import base64
+import json
+
+import pytest
+
+from benchmarks.mock_qradar import FilterParser
+from src.qradar_client import QRadarClient
+from src.server import decode_cursor, encode_cursor
+
+
+@pytest.mark.parametrize("state", [
+    {"set": "Malicious IPs", "filter": None, "offset": 0},
+    {"set": "Bad Hashes", "filter": 'value ILIKE "ab\\\\_%"', "offset": 20000, "page_size": 5000},
+    {"set": "ünïcode ✓", "filter": "last_seen >= 1700000000000", "offset": 7},
+])
+def test_cursor_round_trip(state):
+    cursor = encode_cursor(state)
+    assert decode_cursor(cursor, ("set", "filter", "offset")) == state
+    assert cursor.isascii() and "/" not in cursor and "+" not in cursor
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor",
+    base64.urlsafe_b64encode(b"not json").decode(),
+    base64.urlsafe_b64encode(json.dumps([1, 2]).encode()).decode(),
+    base64.urlsafe_b64encode(json.dumps("offset").encode()).decode(),
+    encode_cursor({"set": "x", "offset": 0}),
+])
+def test_invalid_cursor_is_rejected_clearly(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(cursor, ("set", "filter", "offset"))
+
+
+def test_value_prefix_wildcards_match_literally():
+    query = QRadarClient.reference_set_filter("50%_off")
+    matches = FilterParser(query).parse()
+    assert matches({"value": "50%_OFF.example"})
+    assert not matches({"value": "50 percent off"})
+    assert not matches({"value": "50%xoff"})
+
+
+def test_filter_combines_clauses():
+    assert QRadarClient.reference_set_filter() is None
+    assert QRadarClient.reference_set_filter("ab", 10, 20) == (
+        'value ILIKE "ab%" and last_seen >= 10 and last_seen < 20'
+    )
@@ -0,0 +1,83 @@
+"""Reference set bloom filter and index snapshots"""
+import threading
+
+from src.refset_index import BloomFilter, ReferenceSetIndex
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(10000, 0.001)
+    values = [f"ioc-{i}" for i in range(10000)]
+    for value in values:
+        bloom.add(value)
+    assert all(value in bloom for value in values)
+    assert bloom.count == 10000
+
+
+def test_bloom_filter_false_positive_rate_is_near_target():
+    bloom = BloomFilter(20000, 0.01)
+    for i in range(20000):
+        bloom.add(f"in-{i}")
+    false_positives = sum(f"out-{i}" in bloom for i in range(20000))
+    assert false_positives / 20000 < 0.02
+
+
+def test_bloom_filter_copy_is_independent():
+    bloom = BloomFilter(100)
+    bloom.add("a")
+    clone = bloom.copy()
+    clone.add("b")
+    assert "a" in clone and "b" in clone
+    assert "b" not in bloom
+    assert (bloom.count, clone.count) == (1, 2)
+
+
+class FakeClient:
+    def __init__(self, values):
+        self.values = values
+        self.filters = []
+        self.pause = None
+
+    def iter_reference_set_pages(self, name, filter_query=None, fields=None, page_size=1000):
+        self.filters.append(filter_query)
+        if self.pause is not None:
+            self.pause.wait(5)
+        yield {
+            "name": name,
+            "element_type": "ALNIC",
+            "number_of_elements": len(self.values),
+            "data": [{"value": v, "last_seen": 100 + i} for i, v in enumerate(self.values)],
+        }
+
+
+def test_check_keeps_a_consistent_snapshot_during_a_sync():
+    client = FakeClient(["Evil.example", "bad.example"])
+    index = ReferenceSetIndex(client, refresh_seconds=3600)
+    before = index._sync("iocs")
+    assert before.members == {"evil.example", "bad.example"}
+
+    # A full download in progress leaves the published snapshot untouched
+    client.values = ["other.example"]
+    client.pause = threading.Event()
+    index.full_refresh_seconds = 0
+    syncing = threading.Thread(target=index._sync, args=("iocs",))
+    syncing.start()
+    assert index._sets["iocs"] is before
+    assert before.members == {"evil.example", "bad.example"}
+    client.pause.set()
+    syncing.join(5)
+    assert index._sets["iocs"].members == {"other.example"}
+    assert before.members == {"evil.example", "bad.example"}
+
+
+def test_invalidate_makes_the_next_check_delta_sync():
+    client = FakeClient(["a", "b"])
+    index = ReferenceSetIndex(client, refresh_seconds=3600)
+    index._sync("iocs")
+    index._sync("iocs")
+    assert client.filters == [None]
+
+    index.invalidate("iocs")
+    client.values = ["a", "b", "c"]
+    snapshot = index._sync("iocs")
+    assert client.filters[-1] == "last_seen >= 101"
+    assert "c" in snapshot.members and snapshot.number_of_elements == 3
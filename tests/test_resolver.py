@@ -0,0 +1,39 @@
+"""Resolver lookups that failed upstream are told apart from missing IDs"""
+from benchmarks.mock_qradar import MockConfig, MockQRadarServer
+from src.qradar_client import QRadarClient
+
+
+def _client(mock):
+    return QRadarClient(mock.url, "token", circuit_min_requests=1000, stale_max_age=0)
+
+
+def test_resolver_reports_failed_lookups_separately_from_missing_ids():
+    with MockQRadarServer(MockConfig(offenses=5)) as mock:
+        client = _client(mock)
+        offense = client.get_offense_by_id(mock.mock.data.offenses[0]["id"])
+        source_ids = offense["source_address_ids"]
+
+        errors = {}
+        missing = max(source_ids) + 10**6
+        found = client.resolve_source_addresses(source_ids + [missing], errors)
+        assert set(found) == set(source_ids)
+        assert errors == {}
+
+        client._resolved.clear()
+        mock.config.error_rate = 1.0
+        errors = {}
+        assert client.resolve_source_addresses(source_ids, errors) == {}
+        assert set(errors) == set(source_ids)
+
+
+def test_enrich_offenses_lists_ids_whose_lookup_failed():
+    with MockQRadarServer(MockConfig(offenses=5)) as mock:
+        client = _client(mock)
+        offenses = client.get_offenses(range_header="0-4")
+        assert all("unresolved" not in o for o in client.enrich_offenses(offenses))
+
+        client._resolved.clear()
+        mock.config.error_rate = 1.0
+        enriched = client.enrich_offenses(offenses)
+        for offense, original in zip(enriched, offenses):
+            assert offense["unresolved"]["source_address_ids"] == original["source_address_ids"]
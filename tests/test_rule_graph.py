@@ -0,0 +1,69 @@
+"""Rule graph building, and nodes whose dependents task failed"""
+import time
+
+from benchmarks.mock_qradar import MockConfig, MockQRadarServer
+from src.qradar_client import QRadarClient
+
+
+def _wait_for_refresh(index):
+    time.sleep(0.1)
+    while index._refreshing:
+        time.sleep(0.02)
+
+
+def test_failed_dependents_tasks_are_reported_and_retried(tmp_path, monkeypatch):
+    config = MockConfig(rules=40, building_blocks=20, dependents_task_seconds=0)
+    with MockQRadarServer(config) as mock:
+        client = QRadarClient(
+            mock.url, "token", rule_graph_path=str(tmp_path / "graph.json.gz"),
+            rule_graph_refresh=0.2
+        )
+        index = client.rule_graph
+        unused_bbs = [b["id"] for b in mock.mock.data.building_blocks
+                      if not any(b["id"] in uses for uses in mock.mock.data.rule_uses.values())]
+        failing = {unused_bbs[0], mock.mock.data.rules[0]["id"]}
+        find = client.find_rule_dependents
+
+        def flaky(rule_id, building_block=False, max_wait=60.0):
+            if rule_id in failing:
+                raise Exception("task failed")
+            return find(rule_id, building_block, max_wait)
+
+        monkeypatch.setattr(client, "find_rule_dependents", flaky)
+        index.graph()
+        _wait_for_refresh(index)
+        result = index.search(1000, unused=True)
+        assert result["graph"]["unscanned"] == sorted(failing)
+        assert result["graph"]["unscanned_count"] == 2
+        assert unused_bbs[0] not in [n["id"] for n in result["results"]]
+        assert index.search(1000, unused=False)["total"] + result["total"] == 58
+
+        # Nothing changed in QRadar, yet the failed tasks run again
+        failing.clear()
+        time.sleep(0.25)
+        index.graph()
+        _wait_for_refresh(index)
+        result = index.search(1000, unused=True)
+        assert result["graph"]["unscanned"] == []
+        assert unused_bbs[0] in [n["id"] for n in result["results"]]
+
+
+def test_first_build_runs_in_the_background(tmp_path):
+    config = MockConfig(rules=20, building_blocks=10, dependents_task_seconds=0.2)
+    with MockQRadarServer(config) as mock:
+        client = QRadarClient(
+            mock.url, "token", rule_graph_path=str(tmp_path / "graph.json.gz")
+        )
+        index = client.rule_graph
+        start = time.perf_counter()
+        result = index.search(10)
+        assert time.perf_counter() - start < 0.2
+        assert result["graph"]["status"] == "building"
+        assert result["results"] == []
+        rule_id = mock.mock.data.rules[0]["id"]
+        assert index.dependencies(rule_id)["graph"]["status"] == "building"
+
+        _wait_for_refresh(index)
+        result = index.dependencies(rule_id)
+        assert result["graph"]["status"] == "ready"
+        assert result["node"]["id"] == rule_id
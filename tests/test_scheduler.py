@@ -0,0 +1,92 @@
+"""Cron schedules and scheduler robustness"""
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+from src import scheduler
+from src.scheduler import CronSchedule, Job, ResultStore, Scheduler
+
+
+@pytest.mark.parametrize("expression, moment, expected", [
+    ("*/15 * * * *", datetime(2026, 3, 1, 10, 7, 30), datetime(2026, 3, 1, 10, 15)),
+    ("*/15 * * * *", datetime(2026, 3, 1, 10, 45), datetime(2026, 3, 1, 11, 0)),
+    ("0 * * * *", datetime(2026, 3, 1, 23, 30), datetime(2026, 3, 2, 0, 0)),
+    ("@daily", datetime(2026, 12, 31, 12, 0), datetime(2027, 1, 1, 0, 0)),
+    ("@monthly", datetime(2026, 1, 31, 0, 0), datetime(2026, 2, 1, 0, 0)),
+    # 2026-03-01 is a Sunday; 1-5 is Monday to Friday
+    ("30 8 * * 1-5", datetime(2026, 2, 27, 9, 0), datetime(2026, 3, 2, 8, 30)),
+    ("0 0 * * 7", datetime(2026, 3, 2, 0, 0), datetime(2026, 3, 8, 0, 0)),
+    # Both day fields restricted: either may match
+    ("0 0 13 * 5", datetime(2026, 3, 1, 0, 0), datetime(2026, 3, 6, 0, 0)),
+    ("0 0 29 2 *", datetime(2026, 3, 1, 0, 0), datetime(2028, 2, 29, 0, 0)),
+    ("5,10-12 3 * * *", datetime(2026, 3, 1, 3, 10), datetime(2026, 3, 1, 3, 11)),
+])
+def test_next_after(expression, moment, expected):
+    assert CronSchedule(expression).next_after(moment) == expected
+
+
+@pytest.mark.parametrize("expression", [
+    "* * * *", "60 * * * *", "* 24 * * *", "*/0 * * * *", "5-1 * * * *", "a * * * *",
+    "* * 0 * *", "* * * 13 *", "* * * * 8",
+])
+def test_invalid_expressions_are_rejected(expression):
+    with pytest.raises(ValueError):
+        CronSchedule(expression)
+
+
+def test_expression_that_never_fires():
+    with pytest.raises(ValueError, match="never fires"):
+        CronSchedule("0 0 31 2 *").next_after(datetime(2026, 1, 1))
+
+
+def test_broken_schedule_file_disables_the_scheduler(tmp_path):
+    path = tmp_path / "jobs.json"
+    path.write_text('[{"name": "x", "aql": "SELECT 1", "cron": "not cron"}]')
+    db = str(tmp_path / "results.sqlite3")
+    assert scheduler.create(None, "console", "token", str(path), db) is None
+
+    path.write_text('[{"name": "x", "aql": "SELECT 1", "cron": "@hourly"}]')
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    db = str(blocker / "results.sqlite3")
+    assert scheduler.create(None, "console", "token", str(path), db) is None
+
+
+def test_loop_survives_a_failing_pass(tmp_path, monkeypatch):
+    monkeypatch.setattr(scheduler, "RETRY_SECONDS", 0.05)
+    store = ResultStore(str(tmp_path / "results.sqlite3"), "console", "token")
+    job = Job({"name": "x", "aql": "SELECT 1", "cron": "@hourly"})
+    sched = Scheduler(None, [job], store)
+    calls = []
+    started = threading.Event()
+
+    def flaky(name):
+        calls.append(name)
+        if len(calls) < 3:
+            raise RuntimeError("database is locked")
+        started.set()
+        return {"finished_at": 1.0}
+
+    monkeypatch.setattr(store, "status", flaky)
+    sched.start()
+    try:
+        # Two failed passes, then the thread is still there to succeed
+        assert started.wait(5)
+        assert sched._thread.is_alive()
+    finally:
+        sched.stop()
+
+
+def test_results_are_scoped_to_console_and_token(tmp_path):
+    path = str(tmp_path / "results.sqlite3")
+    job = Job({"name": "x", "saved_search_id": "12", "cron": "@hourly"})
+    owner = Scheduler(None, [job], ResultStore(path, "https://a/api", "token"))
+    owner.store.save("x", {"events": [1], "record_count": 1}, time.time(), time.time())
+    assert owner.fresh_saved_search("12", 60)["events"] == [1]
+
+    for console, token in (("https://b/api", "token"), ("https://a/api", "other")):
+        other = Scheduler(None, [job], ResultStore(path, console, token))
+        assert other.fresh_saved_search("12", 60) is None
+        assert other.store.claim("x", 1.0, "other")
@@ -0,0 +1,26 @@
+"""Stale results served on worker threads are reported in the tool response"""
+import asyncio
+import json
+
+from benchmarks.mock_qradar import MockConfig, MockQRadarServer
+from src import server
+from src.qradar_client import QRadarClient
+
+
+def test_stale_result_served_inside_fan_out_is_reported(monkeypatch):
+    with MockQRadarServer(MockConfig(offenses=120)) as mock:
+        client = QRadarClient(mock.url, "token", circuit_min_requests=1000)
+        monkeypatch.setattr(server, "_qradar_client", client)
+        # More than one chunk of 50 IDs, so the chunks run on fan-out threads
+        ids = [offense["id"] for offense in mock.mock.data.offenses[:100]]
+        client.get_offenses_by_ids(ids)
+
+        mock.config.error_rate = 1.0
+        [content] = asyncio.run(
+            server.call_tool("qradar_get_offenses_by_ids", {"offense_ids": ids})
+        )
+
+    response = json.loads(content.text)
+    assert response["success"]
+    assert len(response["data"]["results"]) == 100
+    assert [s["reason"] for s in response["stale"]["sources"]] == ["error", "error"]